@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark for Blackbox key discovery on synthetic state.vscdb files
+Usage: python benchmarks/bench_key_discovery.py [row_count ...]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blackbox_logout_en import DEFAULT_RULES, CredentialRules, SafeBlackboxCredentialRemover
+
+
+def build_database(path, row_count):
+    """Create a state.vscdb-like database with row_count filler keys"""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE ItemTable (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
+    conn.executemany(
+        "INSERT INTO ItemTable VALUES (?, ?)",
+        ((f"workbench.panel.{i:08d}.state", "{}") for i in range(row_count)),
+    )
+    conn.executemany(
+        "INSERT INTO ItemTable VALUES (?, ?)",
+        [
+            ("Blackboxapp.blackboxagent", '{"userId": "1"}'),
+            ("workbench.view.extension.blackboxai-dev-ActivityBar.state.hidden", "[]"),
+            ("blackboxai-dev.sidebar", "1"),
+            ("memento/webviewView.blackboxai-dev.chat", "{}"),
+        ],
+    )
+    conn.commit()
+    conn.close()
+
+
+# Key lists of the original implementation
+LEGACY_SPECIFIC_KEYS = [
+    "Blackboxapp.blackboxagent",
+    "workbench.view.extension.blackboxai-dev-ActivityBar.state.hidden",
+]
+LEGACY_PATTERNS = [
+    "blackboxapp.blackboxagent",
+    "blackboxai-dev.",
+    "workbench.view.extension.blackboxai-dev",
+]
+
+
+# The built-in rules with the contains patterns anchored at the key start
+PREFIX_RULES = CredentialRules(
+    {
+        "tools": [
+            dict(
+                DEFAULT_RULES["tools"][0],
+                keys=[
+                    {"prefix" if kind == "contains" else kind: pattern}
+                    for rule in DEFAULT_RULES["tools"][0]["keys"]
+                    for kind, pattern in rule.items()
+                ],
+            )
+        ]
+    }
+)
+
+
+def legacy_find_keys(remover):
+    """Original implementation: load every key and match in Python"""
+    cursor = remover.conn.cursor()
+    cursor.execute("SELECT key FROM ItemTable")
+    all_keys = [row[0] for row in cursor.fetchall()]
+
+    found = []
+    for key in all_keys:
+        if key in LEGACY_SPECIFIC_KEYS:
+            found.append(key)
+    for key in all_keys:
+        key_lower = key.lower()
+        for pattern in LEGACY_PATTERNS:
+            if pattern.lower() in key_lower and key not in found:
+                found.append(key)
+                break
+    return found
+
+
+def best_of(func, repeat=5):
+    """Return the best wall time of several runs, in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+
+    print(f"{'rows':>10} {'legacy ms':>12} {'contains ms':>12} {'prefix ms':>12} {'found':>6}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            path = os.path.join(tmp_dir, f"state_{size}.vscdb")
+            build_database(path, size)
+
+            remover = SafeBlackboxCredentialRemover(path)
+            remover.conn = sqlite3.connect(path)
+            remover.register_functions()
+            remover.tables = ["ItemTable"]
+
+            found = remover.find_safe_blackbox_keys()
+            assert sorted(legacy_find_keys(remover)) == [key for _, key in found]
+
+            legacy_ms = best_of(lambda: legacy_find_keys(remover))
+            contains_ms = best_of(remover.find_safe_blackbox_keys)
+
+            # Prefix rules read only their ranges of the key index
+            remover.rules = PREFIX_RULES
+            prefix_found = remover.find_safe_blackbox_keys()
+            assert prefix_found == [
+                (table, key) for table, key in found if PREFIX_RULES.key_matcher.match(key)
+            ]
+            prefix_ms = best_of(remover.find_safe_blackbox_keys)
+            remover.close()
+
+            print(
+                f"{size:>10,} {legacy_ms:>12.2f} {contains_ms:>12.2f} "
+                f"{prefix_ms:>12.2f} {len(found):>6}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -5,40 +5,83 @@ Versi ini lebih spesifik dan tidak menghapus data umum Cursor lainnya
 """
 
 import sqlite3
+import argparse
+import base64
+import contextlib
+import csv
+import ctypes
+import ctypes.util
+import fnmatch
+import glob
+import gzip
+import hashlib
+import io
 import json
 import os
+import re
+import select
 import shutil
+import struct
 import sys
-from datetime import datetime
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from urllib.request import pathname2url
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11: hanya file rules JSON
+    tomllib = None
 
 class SafeBlackboxCredentialRemover:
-    def __init__(self, db_path):
+    def __init__(self, db_path, backup_dir=None, keep_backups=None, keep_days=None, rules_path=None, atomic=False, renderer=None):
         self.db_path = db_path
         self.backup_path = None
+        self.backup_id = None
+        self.journal_path = None
+        self.journal_mode = None
         self.conn = None
         
-        # DAFTAR SPESIFIK key yang berkaitan dengan kredensial Blackbox SAJA
-        self.specific_blackbox_keys = [
-            "Blackboxapp.blackboxagent",  # Kredensial utama
-            "workbench.view.extension.blackboxai-dev-ActivityBar.state.hidden",  # UI extension
-            # Tambahan key spesifik lain jika ditemukan
-        ]
+        # Detik menunggu lock yang dipegang editor, dan berapa kali mencoba
+        # lagi mengambil write lock setelah itu (dengan backoff)
+        self.busy_timeout = 2.0
+        self.lock_retries = 5
         
-        # Pattern untuk nama key yang PASTI terkait Blackbox
-        self.safe_key_patterns = [
-            "blackboxapp.blackboxagent",
-            "blackboxai-dev.",
-            "workbench.view.extension.blackboxai-dev",
-        ]
+        # Terapkan penghapusan ke salinan yang di-rename menimpa database,
+        # bukan mengubah database secara langsung
+        self.atomic = atomic
+        
+        # Tabel key/value yang ditemukan saat connect, dan berapa bytes dari
+        # sebuah value yang dibaca untuk mengenali kredensial (value bisa berukuran MB)
+        self.tables = []
+        self.max_sniff_bytes = 64 * 1024
+        
+        # Penyimpanan snapshot dan kebijakan retensi yang dipakai create_backup()
+        self.backup_store = BackupStore(backup_dir or BackupStore.default_root(db_path))
+        self.keep_backups = keep_backups
+        self.keep_days = keep_days
+        
+        # Rules key dan kredensial dari setiap tool yang akan di-logout (default
+        # Blackbox), dikompilasi menjadi satu matcher yang didaftarkan saat connect
+        self.rules = load_rules(rules_path) if rules_path else CredentialRules(DEFAULT_RULES)
+        
+        # Tujuan hasil analisis dan penghapusan: HumanRenderer,
+        # JsonLinesRenderer atau SilentRenderer
+        self.renderer = renderer or HumanRenderer()
     
     def create_backup(self):
         """Buat backup file database sebelum melakukan perubahan"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.backup_path = f"{self.db_path}.safe_backup_{timestamp}"
-        
         try:
-            shutil.copy2(self.db_path, self.backup_path)
+            snapshot = self.backup_store.snapshot(self.db_path)
+            self.backup_id = snapshot["id"]
+            self.backup_path = self.backup_store.object_path(snapshot["object"])
             print(f"[BACKUP] Backup berhasil dibuat: {self.backup_path}")
+            print(f"[BACKUP] ID snapshot: {snapshot['id']} ({snapshot['compressed_size']:,} bytes terkompresi)")
+            
+            pruned = self.backup_store.prune(self.db_path, self.keep_backups, self.keep_days)
+            if pruned:
+                print(f"[BACKUP] Menghapus {pruned} backup lama (kebijakan retensi)")
             return True
         except Exception as e:
             print(f"[ERROR] Gagal membuat backup: {e}")
@@ -51,8 +94,14 @@ class SafeBlackboxCredentialRemover:
                 print(f"[ERROR] File database tidak ditemukan: {self.db_path}")
                 return False
             
-            self.conn = sqlite3.connect(self.db_path)
+            # Analisis hanya membaca, sehingga editor tetap punya akses penuh
+            self.conn = connect_read_only(self.db_path, self.busy_timeout)
+            self.register_functions()
+            self.journal_mode = self.conn.execute("PRAGMA journal_mode").fetchone()[0]
+            self.tables = self.find_key_value_tables()
             print(f"[SUCCESS] Berhasil terhubung ke database: {self.db_path}")
+            print(f"[INFO] Analisis read-only, journal mode: {self.journal_mode}")
+            print(f"[INFO] Tabel key/value: {', '.join(self.tables)}")
             return True
         except Exception as e:
             print(f"[ERROR] Gagal terhubung ke database: {e}")
@@ -63,56 +112,179 @@ class SafeBlackboxCredentialRemover:
         if self.conn:
             self.conn.close()
     
-    def find_safe_blackbox_keys(self):
-        """Cari HANYA key yang PASTI terkait dengan kredensial Blackbox"""
+    def open_write_connection(self):
+        """Buka koneksi read-write berumur pendek dengan busy timeout"""
+        return sqlite3.connect(self.db_path, timeout=self.busy_timeout)
+    
+    def begin_immediate(self, conn):
+        """Ambil write lock, ulangi dengan backoff selama editor memegangnya"""
+        delay = 0.05
+        for attempt in range(self.lock_retries + 1):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as e:
+                busy = "locked" in str(e) or "busy" in str(e)
+                if not busy or attempt == self.lock_retries:
+                    raise
+                time.sleep(delay)
+                delay = min(delay * 2, 1.0)
+    
+    def register_functions(self, conn=None):
+        """Daftarkan matcher key yang sudah dikompilasi sebagai fungsi SQL"""
+        (conn or self.conn).create_function(
+            "credential_key_match",
+            1,
+            lambda key: key is not None and self.rules.key_matcher.match(key) is not None,
+        )
+    
+    def find_key_value_tables(self):
+        """Daftar tabel yang punya kolom key dan value (ItemTable, cursorDiskKV, ...)"""
         cursor = self.conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name")
+        tables = []
+        for (name,) in cursor.fetchall():
+            cursor.execute(f"PRAGMA table_info({quote_identifier(name)})")
+            columns = {row[1].lower() for row in cursor.fetchall()}
+            if {"key", "value"} <= columns:
+                tables.append(name)
+        return tables
+    
+    def find_safe_blackbox_keys(self):
+        """Cari HANYA key yang PASTI terkait kredensial tool
         
-        # Cari di tabel ItemTable
-        cursor.execute("SELECT key FROM ItemTable")
-        all_keys = [row[0] for row in cursor.fetchall()]
-        
-        safe_blackbox_keys = []
+        Setiap tabel key/value dicari dengan satu query atas index key-nya
+        (lihat key_match_conditions()): key exact berupa point lookup, rules
+        prefix hanya membaca rentang index yang cocok dan rules contains
+        cocok di posisi mana pun dalam nama key, seperti daftar pola aslinya.
+        Mengembalikan pasangan (tabel, key) yang terurut.
+        """
+        cursor = self.conn.cursor()
+        safe_blackbox_keys = set()
+        conditions = self.key_match_conditions([("main", table) for table in self.tables])
         
-        # 1. Cek key yang ada dalam daftar spesifik
-        for key in all_keys:
-            if key in self.specific_blackbox_keys:
-                safe_blackbox_keys.append(key)
+        for table in self.tables:
+            condition, params = conditions[("main", table)]
+            cursor.execute(f"SELECT key FROM {quote_identifier(table)} WHERE {condition}", params)
+            safe_blackbox_keys.update((table, row[0]) for row in cursor)
         
-        # 2. Cek key dengan pattern yang AMAN (hanya di nama key, bukan value)
-        for key in all_keys:
-            key_lower = key.lower()
-            for pattern in self.safe_key_patterns:
-                if pattern.lower() in key_lower and key not in safe_blackbox_keys:
-                    safe_blackbox_keys.append(key)
-                    break
+        return sorted(safe_blackbox_keys)
+    
+    def key_match_conditions(self, sources):
+        """Bangun kondisi WHERE yang mencocokkan rules dengan index key
         
-        return safe_blackbox_keys
+        Mengembalikan {(schema, tabel): (sql, params)}. Key exact berupa point
+        lookup. Rules prefix, dan bagian literal di awal glob, ditelusuri
+        satu karakter demi satu karakter: kedua variasi huruf besar/kecil
+        dicek ke index key dan ejaan yang tidak mengawali key mana pun
+        dibuang, sehingga setiap prefix hanya butuh beberapa probe index
+        ditambah range scan atas key yang berawalan prefix itu, sebesar apa
+        pun tabelnya. Rules contains menjadi tes LIKE '%...%' tanpa
+        membedakan huruf besar/kecil, yang membaca seluruh index key di
+        dalam SQLite. Hanya yang cocok dicek oleh credential_key_match();
+        rules yang tidak bisa dipersempit SQLite (regex, glob yang diawali
+        wildcard, teks non-ASCII) memanggil credential_key_match() untuk
+        setiap key.
+        """
+        if self.rules.needs_scan:
+            return {source: ("credential_key_match(key)", []) for source in sources}
+        conditions = {}
+        for source in sources:
+            table = qualified_name(*source)
+            sql = "key IN (SELECT value FROM json_each(?))"
+            params = [json.dumps(self.rules.exact_keys)]
+            if self.rules.prefixes:
+                # heads berisi ejaan setiap prefix sejauh ini yang mengawali
+                # minimal satu key, sebagai batas index key [low, high)
+                sql += (
+                    " OR rowid IN (WITH RECURSIVE heads(low, high, rest) AS ("
+                    "SELECT '', '', value FROM json_each(?) UNION "
+                    "SELECT low || c.value, low || char(unicode(c.value) + 1), substr(rest, 2) "
+                    "FROM heads, json_each(json_array(upper(substr(rest, 1, 1)), lower(substr(rest, 1, 1)))) AS c "
+                    f"WHERE rest <> '' AND EXISTS (SELECT 1 FROM {table} WHERE key >= low || c.value AND key < low || char(unicode(c.value) + 1))) "
+                    f"SELECT k.rowid FROM heads CROSS JOIN {table} AS k ON k.key >= low AND k.key < high "
+                    "WHERE rest = '' AND credential_key_match(k.key))"
+                )
+                params.append(json.dumps(self.rules.prefixes))
+            if self.rules.contains:
+                likes = " OR ".join("key LIKE ? ESCAPE '\\'" for _ in self.rules.contains)
+                sql += f" OR (({likes}) AND credential_key_match(key))"
+                params += [f"%{like_escape(text)}%" for text in self.rules.contains]
+            conditions[source] = (sql, params)
+        return conditions
     
-    def get_key_value(self, key):
+    def get_key_value(self, key, table="ItemTable"):
         """Dapatkan value dari key tertentu"""
         cursor = self.conn.cursor()
-        cursor.execute("SELECT value FROM ItemTable WHERE key = ?", (key,))
+        cursor.execute(f"SELECT value FROM {quote_identifier(table)} WHERE key = ?", (key,))
         result = cursor.fetchone()
         return result[0] if result else None
     
-    def analyze_key(self, key):
-        """Analisis apakah key benar-benar terkait kredensial Blackbox"""
-        value = self.get_key_value(key)
+    def get_value_heads(self, keys):
+        """Baca paling banyak max_sniff_bytes dari value banyak pasangan (tabel, key)
+        
+        Mengembalikan {(tabel, key): (teks, terpotong)}. Value dibaca
+        bertahap dengan Connection.blobopen (Python 3.11+), atau dipotong
+        dengan substr() di dalam SQLite pada versi lama, sehingga value
+        berukuran MB tidak pernah dimuat utuh. Satu query per tabel.
+        """
+        cursor = self.conn.cursor()
+        limit = self.max_sniff_bytes
+        heads = {}
         
+        tables = {}
+        for table, key in keys:
+            tables.setdefault(table, []).append(key)
+        
+        for table, table_keys in tables.items():
+            quoted = quote_identifier(table)
+            if hasattr(self.conn, "blobopen"):
+                cursor.execute(
+                    f"SELECT rowid, key, typeof(value) FROM {quoted} "
+                    "WHERE key IN (SELECT value FROM json_each(?))",
+                    (json.dumps(table_keys),),
+                )
+                for rowid, key, value_type in cursor.fetchall():
+                    if value_type not in ("text", "blob"):
+                        heads[(table, key)] = (None, False)
+                        continue
+                    with self.conn.blobopen(table, "value", rowid, readonly=True) as blob:
+                        data = blob.read(limit)
+                        truncated = len(blob) > limit
+                    heads[(table, key)] = (data.decode("utf-8", "ignore"), truncated)
+            else:
+                cursor.execute(
+                    "SELECT key, CASE WHEN typeof(value) IN ('text', 'blob') "
+                    "THEN substr(CAST(value AS BLOB), 1, ?) END, "
+                    f"length(CAST(value AS BLOB)) > ? FROM {quoted} "
+                    "WHERE key IN (SELECT value FROM json_each(?))",
+                    (limit, limit, json.dumps(table_keys)),
+                )
+                for key, data, truncated in cursor.fetchall():
+                    text = data.decode("utf-8", "ignore") if data is not None else None
+                    heads[(table, key)] = (text, bool(truncated))
+        
+        return heads
+    
+    def analyze_key(self, key, value, truncated=False):
+        """Analisis apakah key benar-benar terkait kredensial sebuah tool
+        
+        value bisa hanya berupa awal dari value yang besar (truncated=True);
+        dalam hal itu hanya member objek yang muat utuh yang diperiksa.
+        """
         analysis = {
             "key": key,
+            "tool": self.rules.match_tool(key),
             "is_credential": False,
             "reason": "",
             "preview": ""
         }
         
         # Analisis berdasarkan nama key
-        if key == "Blackboxapp.blackboxagent":
-            analysis["is_credential"] = True
-            analysis["reason"] = "Kredensial utama Blackbox"
-        elif "blackboxai-dev" in key.lower():
+        match = self.rules.match_credential_key(key, analysis["tool"])
+        if match:
+            analysis["tool"], analysis["reason"] = match
             analysis["is_credential"] = True
-            analysis["reason"] = "Extension UI Blackbox"
         else:
             analysis["reason"] = "Tidak jelas terkait kredensial"
         
@@ -120,16 +292,19 @@ class SafeBlackboxCredentialRemover:
         if value:
             try:
                 if value.strip().startswith(("{", "[")):
-                    parsed = json.loads(value)
-                    if isinstance(parsed, dict) and any(k in parsed for k in ["userId", "blackbox_userId", "apiProvider"]):
+                    if truncated:
+                        parsed = sniff_json_object(value)
+                    else:
+                        parsed = json.loads(value)
+                    match = self.rules.match_json_fields(parsed, analysis["tool"])
+                    if match:
+                        analysis["tool"], analysis["reason"] = match
                         analysis["is_credential"] = True
-                        analysis["reason"] = "Mengandung data kredensial"
                     
                     # Preview untuk key penting
-                    if analysis["is_credential"]:
-                        important_keys = ["userId", "blackbox_userId", "apiProvider", "installed"]
+                    if analysis["is_credential"] and isinstance(parsed, dict):
                         preview = {}
-                        for imp_key in important_keys:
+                        for imp_key in self.rules.preview_fields(analysis["tool"]):
                             if imp_key in parsed:
                                 preview[imp_key] = parsed[imp_key]
                         if preview:
@@ -139,146 +314,2556 @@ class SafeBlackboxCredentialRemover:
         
         return analysis
     
-    def display_analysis(self, keys):
-        """Tampilkan analisis key yang ditemukan"""
-        print(f"\n[ANALYSIS] Analisis {len(keys)} key yang ditemukan:")
+    def analyze_keys(self, keys):
+        """Analisis pasangan (tabel, key) yang ditemukan tanpa mencetak apa pun
         
-        credential_keys = []
-        non_credential_keys = []
+        Mengembalikan satu record analyze_key() per key, ditambah tabelnya,
+        dengan urutan yang sama seperti keys.
+        """
+        # Baca awal semua value sekaligus, bukan satu query per key
+        heads = self.get_value_heads(keys)
         
-        for i, key in enumerate(keys, 1):
-            analysis = self.analyze_key(key)
-            
-            status = "🔑 KREDENSIAL" if analysis["is_credential"] else "❓ TIDAK JELAS"
-            print(f"\n   {i}. {key}")
-            print(f"      Status: {status}")
-            print(f"      Alasan: {analysis['reason']}")
-            
-            if analysis["preview"]:
-                print(f"      Preview:")
-                for line in analysis["preview"].split('\n'):
-                    print(f"         {line}")
-            
-            if analysis["is_credential"]:
-                credential_keys.append(key)
-            else:
-                non_credential_keys.append(key)
+        records = []
+        for table, key in keys:
+            value, truncated = heads.get((table, key), (None, False))
+            records.append(dict(self.analyze_key(key, value, truncated), table=table))
+        return records
+    
+    def display_analysis(self, keys):
+        """Tampilkan analisis key yang ditemukan
         
+        Mengembalikan key kredensial dan key yang tidak jelas sebagai list
+        (tabel, key).
+        """
+        records = self.analyze_keys(keys)
+        self.renderer.analysis(self.db_path, records)
+        
+        credential_keys = [(record["table"], record["key"]) for record in records if record["is_credential"]]
+        non_credential_keys = [(record["table"], record["key"]) for record in records if not record["is_credential"]]
         return credential_keys, non_credential_keys
     
-    def remove_safe_keys(self, keys_to_remove, confirm=True):
-        """Hapus hanya key yang sudah diverifikasi aman"""
+    def remove_safe_keys(self, keys_to_remove, confirm=True, include_history=True):
+        """Hapus hanya key yang sudah diverifikasi aman
+        
+        Penghapusan key dan pembersihan history Blackbox diterapkan bersama
+        dalam satu transaksi. Mengembalikan hasil apply_removal(), atau None
+        jika penghapusan dibatalkan.
+        """
         if not keys_to_remove:
             print("[INFO] Tidak ada key kredensial yang akan dihapus")
-            return True
-        
-        if confirm:
+        elif confirm:
             print(f"\n[SAFE REMOVAL] Akan menghapus {len(keys_to_remove)} key KREDENSIAL:")
-            for key in keys_to_remove:
-                print(f"   ✅ {key}")
+            for table, key in keys_to_remove:
+                print(f"   ✅ {format_key(table, key)}")
             
             response = input("\nApakah Anda yakin ingin menghapus HANYA kredensial ini? (yes/no): ").lower()
             if response not in ["yes", "y"]:
                 print("[CANCELLED] Penghapusan dibatalkan")
-                return False
+                return None
         
-        cursor = self.conn.cursor()
-        removed_count = 0
+        history_plan = None
+        if include_history:
+            history_plan = self.find_blackbox_history()
+            if history_plan and confirm and not self.confirm_history_cleanup(history_plan):
+                history_plan = None
         
-        for key in keys_to_remove:
-            try:
-                cursor.execute("DELETE FROM ItemTable WHERE key = ?", (key,))
-                if cursor.rowcount > 0:
-                    removed_count += 1
-                    print(f"[REMOVED] ✅ {key}")
-                else:
-                    print(f"[NOT_FOUND] ❌ {key} (sudah tidak ada)")
-            except Exception as e:
-                print(f"[ERROR] ❌ Gagal menghapus {key}: {e}")
+        if self.atomic:
+            result = self.apply_removal_atomic(keys_to_remove, history_plan)
+        else:
+            result = self.apply_removal(keys_to_remove, history_plan)
+        self.renderer.removal(self.db_path, result)
+        return result
+    
+    def new_removal_result(self):
+        """Kembalikan dict hasil kosong dari apply_removal()"""
+        return {
+            "removed": [],
+            "not_found": [],
+            "history_removed": [],
+            "history_error": None,
+            "journal_path": None,
+            "deleted_count": 0,
+            "lock_seconds": 0.0,
+            "swap_seconds": None,
+            "stale": [],
+            "error": None,
+        }
+    
+    def apply_removal(self, keys_to_remove, history_plan=None, expected=None):
+        """Hapus key dan tulis ulang history dalam satu transaksi BEGIN IMMEDIATE
         
-        # Commit perubahan
-        self.conn.commit()
-        print(f"\n[SUCCESS] Berhasil menghapus {removed_count} key kredensial dari database")
-        return True
+        Berjalan di koneksi tulis tersendiri yang berumur pendek, sehingga
+        write lock hanya dipegang selama penghapusan batch. keys_to_remove
+        berisi pasangan (tabel, key). Dengan expected (lihat apply_changes())
+        tidak ada yang diubah kecuali setiap value masih cocok dengan
+        digest-nya. Mengembalikan dict berisi hasil per key dan lama write
+        lock dipegang.
+        """
+        result = self.new_removal_result()
+        conn = None
+        locked_at = None
+        
+        try:
+            conn = self.open_write_connection()
+            self.begin_immediate(conn)
+            locked_at = time.perf_counter()
+            self.apply_changes(conn, keys_to_remove, history_plan, result, expected)
+            conn.commit()
+        except (sqlite3.Error, OSError) as e:
+            if conn:
+                conn.rollback()
+            self.discard_journal(result["journal_path"])
+            result["journal_path"] = None
+            result["removed"] = []
+            result["not_found"] = []
+            result["deleted_count"] = 0
+            result["error"] = str(e)
+        finally:
+            if locked_at is not None:
+                result["lock_seconds"] = time.perf_counter() - locked_at
+            if conn:
+                conn.close()
+        
+        return result
     
-    def cleanup_blackbox_history(self):
-        """Bersihkan HANYA entry history yang berkaitan dengan Blackbox"""
-        cursor = self.conn.cursor()
+    def apply_changes(self, conn, keys_to_remove, history_plan, result, expected=None):
+        """Tulis journal, hapus key dan tulis ulang history di dalam transaksi
         
-        # Dapatkan history.recentlyOpenedPathsList
-        cursor.execute(
-            "SELECT value FROM ItemTable WHERE key = ?",
-            ("history.recentlyOpenedPathsList",),
-        )
-        result = cursor.fetchone()
+        Penghapusan key berjalan di bawah savepoint; jika gagal pemanggil
+        me-rollback seluruh transaksi. Penulisan ulang history memakai
+        savepoint sendiri, sehingga kegagalan di sana hanya membatalkan
+        perubahan history. Mengisi result (lihat new_removal_result) dan
+        menyerahkan commit ke pemanggil.
         
-        if not result:
-            print("[INFO] Tidak ada history yang perlu dibersihkan")
+        expected memetakan (tabel, key) ke SHA-256 value yang menjadi dasar
+        rencana perubahan. Jika ada key yang hilang atau berubah, atau history
+        berubah, tidak ada yang ditulis dan result["stale"] berisi value
+        tersebut.
+        """
+        cursor = conn.cursor()
+        tables = {}
+        for table, key in keys_to_remove:
+            tables.setdefault(table, []).append(key)
+        
+        # Simpan baris yang akan berubah sebelum menyentuh apa pun
+        deleted_rows = []
+        for table, table_keys in tables.items():
+            cursor.execute(
+                f"SELECT key, value FROM {quote_identifier(table)} "
+                "WHERE key IN (SELECT value FROM json_each(?))",
+                (json.dumps(table_keys),),
+            )
+            deleted_rows.extend((table, key, value) for key, value in cursor)
+        existing = {(table, key) for table, key, _ in deleted_rows}
+        
+        if expected is not None:
+            current = {(table, key): value_digest(value) for table, key, value in deleted_rows}
+            result["stale"] = [format_key(table, key) for (table, key), digest in expected.items() if current.get((table, key)) != digest]
+        
+        # History dianalisis di koneksi read-only; lewati jika editor
+        # sudah menulis value yang lebih baru sejak itu
+        updated_rows = []
+        if history_plan:
+            updates = {update["key"]: update for update in history_plan["updates"]}
+            cursor.execute(
+                "SELECT key, value FROM ItemTable "
+                "WHERE key IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(updates)),),
+            )
+            for key, value in cursor:
+                if value_digest(value) == updates[key]["before_sha256"]:
+                    updated_rows.append((key, value, updates[key]["value"]))
+            if len(updated_rows) != len(updates):
+                if expected is not None:
+                    result["stale"].extend(updates)
+                result["history_error"] = "history berubah sejak dianalisis, dilewati"
+                updated_rows = []
+                history_plan = None
+        
+        if result["stale"]:
+            result["error"] = "rencana kedaluwarsa, value berikut berubah sejak rencana ditulis"
             return
         
+        if deleted_rows or updated_rows:
+            result["journal_path"] = self.write_journal(deleted_rows, updated_rows)
+        
+        cursor.execute("SAVEPOINT remove_keys")
+        for table, table_keys in tables.items():
+            cursor.execute(
+                f"DELETE FROM {quote_identifier(table)} "
+                "WHERE key IN (SELECT value FROM json_each(?))",
+                (json.dumps(table_keys),),
+            )
+            result["deleted_count"] += cursor.rowcount
+        cursor.execute("RELEASE remove_keys")
+        
+        for table_key in keys_to_remove:
+            if tuple(table_key) in existing:
+                result["removed"].append(table_key)
+            else:
+                result["not_found"].append(table_key)
+        
+        if history_plan:
+            cursor.execute("SAVEPOINT clean_history")
+            try:
+                cursor.executemany(
+                    "UPDATE ItemTable SET value = ? WHERE key = ?",
+                    [(update["value"], update["key"]) for update in history_plan["updates"]],
+                )
+                cursor.execute("RELEASE clean_history")
+                result["history_removed"] = history_plan["removed_entries"]
+            except sqlite3.Error as e:
+                cursor.execute("ROLLBACK TO clean_history")
+                cursor.execute("RELEASE clean_history")
+                result["history_error"] = str(e)
+    
+    def apply_removal_atomic(self, keys_to_remove, history_plan=None, expected=None):
+        """Terapkan penghapusan ke salinan lalu rename salinan itu ke database
+        
+        Database disalin dengan backup API ke file sementara di sebelahnya,
+        perubahan diterapkan dan di-commit di sana, salinan dicek dengan
+        PRAGMA quick_check dan di-fsync. Baru setelah itu write lock diambil
+        di database asli. Jika PRAGMA data_version menunjukkan tidak ada yang
+        commit sejak salinan dibuat, salinan di-rename menimpa database asli
+        dan direktorinya di-fsync. Jika ada, salinan disiapkan ulang (sampai
+        ATOMIC_ATTEMPTS kali). Database asli tidak pernah diubah, sehingga
+        crash hanya menyisakan file lama atau file baru. Jendela swap (write
+        lock sampai rename) tidak bergantung pada ukuran database dan
+        dikembalikan sebagai swap_seconds.
+        
+        Rename mengganti file di bawah proses yang masih membukanya; penulisan
+        mereka berikutnya akan masuk ke file lama. Karena itu mode ini ditolak
+        selama proses lain membuka database, dan di mode WAL, di mana file
+        -wal milik file lama.
+        """
+        result = self.new_removal_result()
+        db_path = os.path.abspath(self.db_path)
+        directory = os.path.dirname(db_path)
+        conn = None
+        clone_path = None
+        
         try:
-            history_data = json.loads(result[0])
-            original_count = len(history_data.get("entries", []))
-            
-            # Filter entry yang berkaitan dengan blackbox (path/folder)
-            filtered_entries = []
-            removed_entries = []
-            
-            for entry in history_data.get("entries", []):
-                folder_uri = entry.get("folderUri", "").lower()
-                if any(pattern in folder_uri for pattern in ["blackbox", "blackboxai", "blackboxapp"]):
-                    removed_entries.append(entry.get("folderUri", ""))
-                else:
-                    filtered_entries.append(entry)
+            holders = processes_with_open_file(db_path)
+            if holders:
+                raise RuntimeError(f"database sedang dibuka proses lain (PID {', '.join(map(str, holders))}), tutup editor terlebih dahulu")
             
-            removed_count = len(removed_entries)
+            conn = self.open_write_connection()
+            if conn.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal":
+                raise RuntimeError("atomic apply butuh rollback journal, bukan WAL")
             
-            if removed_count > 0:
-                history_data["entries"] = filtered_entries
-                new_value = json.dumps(history_data)
+            for attempt in range(ATOMIC_ATTEMPTS):
+                version = conn.execute("PRAGMA data_version").fetchone()[0]
                 
-                print(f"\n[HISTORY CLEANUP] Ditemukan {removed_count} entry Blackbox di history:")
-                for entry in removed_entries:
-                    print(f"   - {entry}")
+                fd, clone_path = tempfile.mkstemp(prefix=".atomic-", suffix=".vscdb", dir=directory)
+                os.close(fd)
+                clone = sqlite3.connect(clone_path)
+                try:
+                    conn.backup(clone)
+                    clone.execute("BEGIN IMMEDIATE")
+                    result = self.new_removal_result()
+                    self.apply_changes(clone, keys_to_remove, history_plan, result, expected)
+                    if result["error"]:
+                        return result
+                    clone.commit()
+                    check = clone.execute("PRAGMA quick_check").fetchone()[0]
+                    if check != "ok":
+                        raise sqlite3.DatabaseError(f"quick_check gagal: {check}")
+                finally:
+                    clone.close()
+                # Clone dimiliki yang menjalankan script ini (mis. root yang membersihkan
+                # profil user); editor tetap harus memiliki file hasil pertukaran
+                owner = os.stat(db_path)
+                clone_stat = os.stat(clone_path)
+                if (clone_stat.st_uid, clone_stat.st_gid) != (owner.st_uid, owner.st_gid):
+                    try:
+                        os.chown(clone_path, owner.st_uid, owner.st_gid)
+                    except PermissionError:
+                        print("[WARNING] Pemilik database tidak bisa dipertahankan, menghapus di tempat")
+                        self.discard_journal(result["journal_path"])
+                        return self.apply_removal(keys_to_remove, history_plan, expected)
+                shutil.copymode(db_path, clone_path)
+                with open(clone_path, "rb+") as f:
+                    os.fsync(f.fileno())
                 
-                response = input(f"\nApakah ingin menghapus {removed_count} entry ini dari history? (yes/no): ").lower()
-                if response in ["yes", "y"]:
-                    cursor.execute(
-                        "UPDATE ItemTable SET value = ? WHERE key = ?",
-                        (new_value, "history.recentlyOpenedPathsList"),
-                    )
-                    self.conn.commit()
-                    print(f"[CLEANED] ✅ Berhasil membersihkan {removed_count} entry dari history")
-                else:
-                    print("[SKIPPED] History cleanup dibatalkan")
-            else:
-                print("[INFO] Tidak ada entry Blackbox di history")
+                # Jendela swap: penulis lain diblokir dari sini sampai rename
+                self.begin_immediate(conn)
+                locked_at = time.perf_counter()
+                if conn.execute("PRAGMA data_version").fetchone()[0] == version:
+                    os.replace(clone_path, db_path)
+                    clone_path = None
+                    fsync_directory(directory)
+                    result["swap_seconds"] = time.perf_counter() - locked_at
+                    result["lock_seconds"] = result["swap_seconds"]
+                    conn.rollback()
+                    if self.conn:
+                        # Koneksi analisis masih membaca file lama
+                        self.conn.close()
+                        self.conn = connect_read_only(self.db_path, self.busy_timeout)
+                        self.register_functions()
+                    return result
                 
-        except Exception as e:
-            print(f"[ERROR] Gagal membersihkan history: {e}")
+                # Ada yang commit setelah salinan dibuat: ulangi dari awal
+                conn.rollback()
+                self.discard_journal(result["journal_path"])
+                os.remove(clone_path)
+                clone_path = None
+            
+            raise RuntimeError(f"database terus berubah, menyerah setelah {ATOMIC_ATTEMPTS} percobaan")
+        except (sqlite3.Error, OSError, RuntimeError) as e:
+            if conn and conn.in_transaction:
+                conn.rollback()
+            self.discard_journal(result["journal_path"])
+            result = self.new_removal_result()
+            result["error"] = str(e)
+            return result
+        finally:
+            if conn:
+                conn.close()
+            if clone_path and os.path.exists(clone_path):
+                os.remove(clone_path)
+    
+    def discard_journal(self, journal_path):
+        """Hapus journal undo dari perubahan yang tidak pernah diterapkan"""
+        if journal_path and os.path.exists(journal_path):
+            os.remove(journal_path)
+        if self.journal_path == journal_path:
+            self.journal_path = None
+    
+    def write_journal(self, deleted_rows, updated_rows):
+        """Tulis journal undo untuk sebuah penghapusan dan kembalikan path-nya
+        
+        Journal berisi baris yang dihapus beserta tabelnya dan value sebelum
+        diubah (list history di ItemTable), sehingga undo hanya menyimpan
+        beberapa baris yang berubah. Journal ditulis dan di-fsync di dalam
+        transaksi, sebelum ada baris yang diubah.
+        """
+        journal = {
+            "database": os.path.abspath(self.db_path),
+            "created_at": datetime.now().isoformat(),
+            "deleted": [dict(table=table, key=key, **encode_value(value)) for table, key, value in deleted_rows],
+            "updated": [
+                dict(table="ItemTable", key=key, after_sha256=value_digest(new_value), **encode_value(value))
+                for key, value, new_value in updated_rows
+            ],
+        }
+        self.journal_path = self.backup_store.save_journal(journal)
+        self.backup_store.prune(self.db_path, self.keep_backups, self.keep_days)
+        return self.journal_path
+    
+    def apply_journal(self, journal):
+        """Jalankan ulang journal undo dalam satu transaksi
+        
+        Baris yang dihapus dimasukkan kembali dan baris yang diubah mendapat
+        value sebelumnya. Jika baris yang diubah sudah berubah lagi sejak
+        journal ditulis, tidak ada yang dipulihkan dan key dilaporkan konflik.
+        Entry tanpa tabel (journal lama) milik ItemTable.
+        """
+        result = {"restored": [], "conflicts": [], "error": None}
+        conn = None
+        
+        try:
+            conn = self.open_write_connection()
+            cursor = conn.cursor()
+            self.begin_immediate(conn)
+            
+            for entry in journal["updated"]:
+                table = quote_identifier(entry.get("table", "ItemTable"))
+                cursor.execute(f"SELECT value FROM {table} WHERE key = ?", (entry["key"],))
+                row = cursor.fetchone()
+                current = value_digest(row[0]) if row else None
+                if current not in (entry["after_sha256"], value_digest(decode_value(entry))):
+                    result["conflicts"].append(entry["key"])
+            
+            if result["conflicts"]:
+                conn.rollback()
+                return result
+            
+            entries = journal["deleted"] + journal["updated"]
+            tables = {}
+            for entry in entries:
+                tables.setdefault(entry.get("table", "ItemTable"), []).append(entry)
+            for table, table_entries in tables.items():
+                cursor.executemany(
+                    f"INSERT OR REPLACE INTO {quote_identifier(table)} (key, value) VALUES (?, ?)",
+                    [(entry["key"], decode_value(entry)) for entry in table_entries],
+                )
+            conn.commit()
+            result["restored"] = [entry["key"] for entry in entries]
+        except sqlite3.Error as e:
+            if conn:
+                conn.rollback()
+            result["error"] = str(e)
+        finally:
+            if conn:
+                conn.close()
+        
+        return result
+    
+    def value_digests(self, keys):
+        """SHA-256 dari value utuh banyak pasangan (tabel, key)
+        
+        Hanya dipakai untuk key kredensial dari rencana perubahan, sehingga
+        membaca value utuh tetap murah. Satu query per tabel.
+        """
+        cursor = self.conn.cursor()
+        tables = {}
+        for table, key in keys:
+            tables.setdefault(table, []).append(key)
+        
+        digests = {}
+        for table, table_keys in tables.items():
+            cursor.execute(
+                f"SELECT key, value FROM {quote_identifier(table)} "
+                "WHERE key IN (SELECT value FROM json_each(?))",
+                (json.dumps(table_keys),),
+            )
+            for key, value in cursor:
+                digests[(table, key)] = value_digest(value)
+        return digests
+    
+    def build_plan(self, credential_keys, unclear_keys, history_plan):
+        """Jabarkan penghapusan sebagai rencana perubahan untuk apply_plan()
+        
+        Setiap key membawa SHA-256 value yang dianalisis dan setiap update
+        history membawa digest value yang digantikannya, sehingga rencana yang
+        dihitung dari keadaan database yang lebih lama akan ditolak.
+        """
+        digests = self.value_digests(credential_keys)
+        return {
+            "database": os.path.abspath(self.db_path),
+            "created_at": datetime.now().isoformat(),
+            "keys": [{"table": table, "key": key, "sha256": digests[(table, key)]} for table, key in credential_keys if (table, key) in digests],
+            "unclear": [format_key(table, key) for table, key in unclear_keys],
+            "history": history_plan["updates"] if history_plan else [],
+            "history_removed": history_plan["removed_entries"] if history_plan else [],
+        }
+    
+    def apply_plan(self, plan):
+        """Terapkan rencana perubahan dalam satu transaksi, tanpa prompt
+        
+        Ditolak seluruhnya (result["stale"]) jika ada value yang berbeda dari
+        value yang menjadi dasar rencana. Mengembalikan hasil apply_removal().
+        """
+        keys = [(entry["table"], entry["key"]) for entry in plan["keys"]]
+        expected = {(entry["table"], entry["key"]): entry["sha256"] for entry in plan["keys"]}
+        history_plan = None
+        if plan["history"]:
+            history_plan = {"updates": plan["history"], "removed_entries": plan["history_removed"]}
+        
+        if self.atomic:
+            return self.apply_removal_atomic(keys, history_plan, expected)
+        return self.apply_removal(keys, history_plan, expected)
+    
+    def find_blackbox_history(self):
+        """Cari entry history yang berkaitan dengan Blackbox tanpa mengubah apa pun
+        
+        Semua HISTORY_KEYS dibaca dengan satu query dan difilter satu value
+        demi satu value. Mengembalikan dict rencana berisi value yang ditulis
+        ulang ("updates": key, value dan digest value yang digantikan) dan
+        entry yang dihapus, atau None jika tidak ada yang perlu dibersihkan.
+        """
+        if "ItemTable" not in self.tables:
+            print("[INFO] Tidak ada history yang perlu dibersihkan")
+            return None
+        
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT key, value FROM ItemTable "
+            "WHERE key IN (SELECT value FROM json_each(?))",
+            (json.dumps(HISTORY_KEYS),),
+        )
+        return self.plan_history_cleanup(cursor)
+    
+    def plan_history_cleanup(self, rows):
+        """Saring entry Blackbox dari baris history (key, value)
+        
+        Mengembalikan dict rencana seperti di find_blackbox_history(), atau None.
+        """
+        updates = []
+        removed_entries = []
+        found = False
+        
+        for key, value in rows:
+            found = True
+            try:
+                pieces, removed = filter_history_pieces(value, self.rules.history_patterns)
+            except (ValueError, UnicodeDecodeError) as e:
+                print(f"[ERROR] Gagal membaca history {key}: {e}")
+                continue
+            if removed:
+                before_sha256 = value_digest(value)
+                # Lepaskan value asli sebelum potongan yang dipertahankan
+                # digabung, supaya tidak ada di memori bersama dua salinan
+                del value
+                updates.append({"key": key, "value": "".join(pieces), "before_sha256": before_sha256})
+                del pieces
+                removed_entries.extend(removed)
+        
+        if not found:
+            print("[INFO] Tidak ada history yang perlu dibersihkan")
+            return None
+        if not updates:
+            print("[INFO] Tidak ada entry Blackbox di history")
+            return None
+        
+        return {"updates": updates, "removed_entries": removed_entries}
+    
+    def confirm_history_cleanup(self, history_plan):
+        """Tampilkan entry history Blackbox dan tanyakan apakah ingin dihapus"""
+        removed_count = len(history_plan["removed_entries"])
+        
+        print(f"\n[HISTORY CLEANUP] Ditemukan {removed_count} entry Blackbox di history:")
+        for entry in history_plan["removed_entries"]:
+            print(f"   - {entry}")
+        
+        response = input(f"\nApakah ingin menghapus {removed_count} entry ini dari history? (yes/no): ").lower()
+        if response in ["yes", "y"]:
+            return True
+        
+        print("[SKIPPED] History cleanup dibatalkan")
+        return False
+    
+    def cleanup_blackbox_history(self):
+        """Bersihkan HANYA entry history yang berkaitan dengan Blackbox
+        
+        Mengembalikan hasil apply_removal(), atau None jika tidak ada yang
+        perlu dibersihkan atau pembersihan dibatalkan.
+        """
+        history_plan = self.find_blackbox_history()
+        if not history_plan or not self.confirm_history_cleanup(history_plan):
+            return None
+        
+        result = self.apply_removal([], history_plan)
+        self.renderer.history(self.db_path, result)
+        return result
     
-    def verify_removal(self):
-        """Verifikasi bahwa hanya kredensial yang terhapus"""
+    def verify_removal(self, removal=None, deep=False):
+        """Verifikasi bahwa hanya kredensial yang terhapus
+        
+        Dengan hasil dari apply_removal() pengecekan dibuat terarah: rowcount
+        DELETE harus sama dengan baris yang terlihat di dalam transaksi dan
+        lookup berindex tidak boleh menemukan satu pun key yang dihapus.
+        Tanpa hasil tersebut, atau dengan deep=True, semua key di-scan ulang.
+        """
         print("\n[VERIFY] Memverifikasi penghapusan kredensial...")
         
-        remaining_keys = self.find_safe_blackbox_keys()
+        if removal is None or deep:
+            remaining_keys = self.find_safe_blackbox_keys()
+        else:
+            if removal["deleted_count"] != len(removal["removed"]):
+                print(f"[WARNING] Menghapus {removal['deleted_count']} baris, seharusnya {len(removal['removed'])}")
+                return False
+            tables = {}
+            for table, key in removal["removed"] + removal["not_found"]:
+                tables.setdefault(table, []).append(key)
+            cursor = self.conn.cursor()
+            remaining_keys = []
+            for table, table_keys in tables.items():
+                cursor.execute(
+                    f"SELECT key FROM {quote_identifier(table)} "
+                    "WHERE key IN (SELECT value FROM json_each(?))",
+                    (json.dumps(table_keys),),
+                )
+                remaining_keys.extend((table, row[0]) for row in cursor)
+            remaining_keys.sort()
         
         if remaining_keys:
             print(f"[WARNING] Masih ada {len(remaining_keys)} key Blackbox:")
-            for key in remaining_keys:
-                print(f"   - {key}")
+            for table, key in remaining_keys:
+                print(f"   - {format_key(table, key)}")
             return False
         else:
             print("[SUCCESS] ✅ Semua kredensial Blackbox berhasil dihapus!")
             print("[INFO] Data umum Cursor tetap aman dan tidak terhapus")
             return True
+    
+    def compact_database(self):
+        """Kembalikan halaman yang dibebaskan oleh penghapusan ke file system
+        
+        Memakai incremental vacuum jika auto_vacuum database bernilai
+        INCREMENTAL. Selain itu dijalankan VACUUM in-place, yang membangun
+        ulang file di dalam satu transaksi eksklusif: penulisan oleh editor
+        yang terbuka menunggu busy timeout alih-alih hilang, dan pembaca tetap
+        memegang file yang valid. Mengembalikan dict berisi metode yang
+        dipakai, bytes yang didapat kembali dan waktu.
+        """
+        result = {
+            "method": None,
+            "freelist_pages": 0,
+            "bytes_before": database_size(self.db_path),
+            "bytes_after": None,
+            "reclaimed_bytes": 0,
+            "seconds": 0.0,
+            "error": None,
+        }
+        started = time.perf_counter()
+        conn = None
+        
+        print("\n[COMPACT] Mengembalikan ruang kosong...")
+        try:
+            conn = self.open_write_connection()
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            result["freelist_pages"] = freelist
+            print(f"[COMPACT] {freelist:,} halaman kosong ({freelist * page_size:,} bytes)")
+            
+            if freelist == 0:
+                result["method"] = "none"
+            elif auto_vacuum == 2:
+                result["method"] = "incremental_vacuum"
+                # execute() hanya menjalankan pragma satu langkah (satu halaman); jalankan sebagai script
+                conn.executescript("PRAGMA incremental_vacuum")
+            else:
+                result["method"] = "vacuum"
+                conn.execute("VACUUM")
+            
+            if self.journal_mode == "wal":
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        except (sqlite3.Error, OSError) as e:
+            result["error"] = str(e)
+        finally:
+            if conn:
+                conn.close()
+        
+        result["seconds"] = time.perf_counter() - started
+        result["bytes_after"] = database_size(self.db_path)
+        result["reclaimed_bytes"] = result["bytes_before"] - result["bytes_after"]
+        
+        if result["error"]:
+            print(f"[ERROR] Pemadatan gagal: {result['error']}")
+        else:
+            print(f"[COMPACT] {result['method']}: {result['bytes_before']:,} -> {result['bytes_after']:,} bytes ({result['reclaimed_bytes']:,} didapat kembali dalam {result['seconds']:.2f}s)")
+        return result
+
+# Berapa kali atomic apply menyalin ulang database yang berubah di tengah jalan
+ATOMIC_ATTEMPTS = 3
+
+# Key ItemTable yang berisi daftar recently opened, dicek dalam satu query
+HISTORY_KEYS = ["history.recentlyOpenedPathsList", "history.entries"]
+
+# Field entry yang berisi URI atau path dari entry history
+HISTORY_URI_FIELDS = {"folderUri", "fileUri", "configPath", "resource"}
+
+# Rules bawaan: key Blackbox yang selama ini dihapus oleh script ini
+DEFAULT_RULES = {
+    "tools": [
+        {
+            "name": "Blackbox",
+            "keys": [
+                {"exact": "Blackboxapp.blackboxagent"},
+                {"exact": "workbench.view.extension.blackboxai-dev-ActivityBar.state.hidden"},
+                {"contains": "blackboxapp.blackboxagent"},
+                {"contains": "blackboxai-dev."},
+                {"contains": "workbench.view.extension.blackboxai-dev"},
+            ],
+            "credentials": [
+                {"exact": "Blackboxapp.blackboxagent", "reason": "Kredensial utama Blackbox"},
+                {"glob": "*blackboxai-dev*", "reason": "Extension UI Blackbox"},
+                {"json_fields": ["userId", "blackbox_userId", "apiProvider"], "reason": "Mengandung data kredensial"},
+            ],
+            "preview_fields": ["userId", "blackbox_userId", "apiProvider", "installed"],
+            "history": ["blackbox", "blackboxai", "blackboxapp"],
+        }
+    ]
+}
+
+class CredentialRules:
+    """Rules kredensial dari satu atau lebih tool, dikompilasi menjadi satu matcher
+    
+    Setiap tool punya rules "keys" yang memilih key kandidat, rules
+    "credentials" yang memastikan key berisi kredensial, serta
+    "preview_fields" dan pattern path "history" yang opsional. Rule key
+    berupa salah satu dari:
+        
+        {"exact": "Key.name"}        key persis, membedakan huruf besar/kecil
+        {"prefix": "key.prefix"}     awal key, tanpa membedakan huruf besar/kecil
+        {"contains": "key.part"}     teks di posisi mana pun dalam key, tanpa membedakan huruf besar/kecil
+        {"glob": "*.key.*"}          pattern fnmatch, tanpa membedakan huruf besar/kecil
+        {"regex": "pattern"}         regular expression yang dicari di dalam key
+    
+    Rules kredensial memakai bentuk yang sama ditambah {"json_fields": [...]},
+    yang cocok dengan value objek JSON yang memiliki salah satu field
+    (boleh bertitik). Setiap rule kredensial boleh punya "reason" yang
+    ditampilkan di analisis.
+    """
+    
+    KEY_KINDS = ("exact", "prefix", "contains", "glob", "regex")
+    
+    def __init__(self, config):
+        tools = config.get("tools") if isinstance(config, dict) else None
+        if not tools:
+            raise ValueError("rules membutuhkan list 'tools' yang tidak kosong")
+        
+        self.tools = tools
+        self.exact_keys = []
+        self.prefixes = []
+        self.contains = []
+        self.needs_scan = False
+        self.history_patterns = []
+        self.key_rules = []
+        self.credential_rules = []
+        self.json_rules = []
+        
+        key_parts = []
+        credential_parts = []
+        tool_credential_parts = {}
+        for tool in tools:
+            name = tool.get("name")
+            if not name:
+                raise ValueError("setiap tool membutuhkan 'name'")
+            
+            for rule in tool.get("keys", []):
+                kind, pattern = self.rule_kind(rule)
+                key_parts.append(self.compile_rule(kind, pattern, len(key_parts)))
+                self.key_rules.append(name)
+                self.add_lookup(kind, pattern)
+            
+            for rule in tool.get("credentials", []):
+                reason = rule.get("reason", f"Kredensial {name}")
+                if "json_fields" in rule:
+                    self.json_rules.append((name, rule["json_fields"], reason))
+                    continue
+                kind, pattern = self.rule_kind(rule)
+                part = self.compile_rule(kind, pattern, len(credential_parts))
+                credential_parts.append(part)
+                tool_credential_parts.setdefault(name, []).append(part)
+                self.credential_rules.append((name, reason))
+            
+            self.history_patterns.extend(p.lower() for p in tool.get("history", []))
+        
+        # Satu alternation per kumpulan rules; named group menunjukkan rule yang cocok
+        self.key_matcher = re.compile("|".join(key_parts) or "(?!)")
+        self.credential_matcher = re.compile("|".join(credential_parts) or "(?!)")
+        # Per tool juga, agar rules tool milik key dicoba lebih dulu
+        self.tool_credential_matchers = {name: re.compile("|".join(parts)) for name, parts in tool_credential_parts.items()}
+    
+    def rule_kind(self, rule):
+        """Kembalikan (jenis, pattern) dari sebuah rule key"""
+        kinds = [kind for kind in self.KEY_KINDS if kind in rule]
+        if len(kinds) != 1:
+            raise ValueError(f"rule {rule} membutuhkan tepat satu dari: {', '.join(self.KEY_KINDS)}")
+        return kinds[0], rule[kinds[0]]
+    
+    def compile_rule(self, kind, pattern, index):
+        """Kompilasi satu rule menjadi alternatif bernama yang berawal di awal key"""
+        if kind == "exact":
+            source = re.escape(pattern) + r"\Z"
+        elif kind == "prefix":
+            source = f"(?i:{re.escape(pattern)})"
+        elif kind == "contains":
+            source = f"(?i:(?s:.*?){re.escape(pattern)})"
+        elif kind == "glob":
+            source = f"(?i:{fnmatch.translate(pattern)})"
+        else:
+            re.compile(pattern)
+            source = f"(?s:.*?)(?:{pattern})"
+        return f"(?P<r{index}>{source})"
+    
+    def add_lookup(self, kind, pattern):
+        """Catat cara SQLite menemukan key sebuah rule memakai index key"""
+        if kind == "exact":
+            self.exact_keys.append(pattern)
+            return
+        if kind == "glob":
+            pattern = re.split(r"[*?\[]", pattern, 1)[0]
+        lookups = self.contains if kind == "contains" else self.prefixes
+        # LIKE hanya menyamakan huruf ASCII, teks lain butuh matcher
+        if kind == "regex" or not pattern or not pattern.isascii():
+            self.needs_scan = True
+        elif pattern.lower() not in lookups:
+            lookups.append(pattern.lower())
+    
+    def match_tool(self, key):
+        """Kembalikan tool yang rules key-nya memilih key, atau None"""
+        match = self.key_matcher.match(key)
+        return self.key_rules[int(match.lastgroup[1:])] if match else None
+    
+    def match_credential_key(self, key, tool=None):
+        """Kembalikan (tool, reason) dari rule kredensial yang cocok dengan key, atau None
+        
+        Rules dari tool yang diberikan dicoba lebih dulu, lalu rules tool lain.
+        """
+        matcher = self.tool_credential_matchers.get(tool)
+        match = matcher.match(key) if matcher else None
+        match = match or self.credential_matcher.match(key)
+        return self.credential_rules[int(match.lastgroup[1:])] if match else None
+    
+    def match_json_fields(self, data, tool=None):
+        """Kembalikan (tool, reason) dari rule json_fields yang cocok dengan data, atau None
+        
+        Rules dari tool yang diberikan dicoba lebih dulu, lalu rules tool lain.
+        """
+        if not isinstance(data, dict):
+            return None
+        rules = sorted(self.json_rules, key=lambda rule: rule[0] != tool)
+        for name, fields, reason in rules:
+            if any(json_field_exists(data, field) for field in fields):
+                return name, reason
+        return None
+    
+    def preview_fields(self, tool):
+        """Kembalikan field yang ditampilkan di preview analisis sebuah tool"""
+        for entry in self.tools:
+            if entry["name"] == tool:
+                return entry.get("preview_fields", [])
+        return []
+
+def quote_identifier(name):
+    """Beri tanda kutip pada nama tabel untuk dipakai di SQL"""
+    return '"' + name.replace('"', '""') + '"'
+
+def like_escape(text):
+    """Escape wildcard LIKE di text (ESCAPE '\\')"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def qualified_name(schema, table):
+    """Beri tanda kutip pada nama tabel beserta schema-nya untuk dipakai di SQL"""
+    return f"{quote_identifier(schema)}.{quote_identifier(table)}"
+
+def format_key(table, key):
+    """Tampilkan key beserta tabelnya; key ItemTable ditampilkan seperti sebelumnya"""
+    return key if table == "ItemTable" else f"[{table}] {key}"
+
+def sniff_json_object(text):
+    """Decode member awal dari objek JSON yang mungkin terpotong
+    
+    Member di-decode satu per satu; member yang terpotong oleh batas ukuran
+    dan semua setelahnya diabaikan. Mengembalikan member yang ditemukan,
+    atau None jika teks bukan objek JSON.
+    """
+    decoder = json.JSONDecoder()
+    whitespace = re.compile(r"\s*")
+    pos = whitespace.match(text).end()
+    if not text.startswith("{", pos):
+        return None
+    
+    data = {}
+    pos += 1
+    while True:
+        pos = whitespace.match(text, pos).end()
+        try:
+            name, pos = decoder.raw_decode(text, pos)
+            pos = whitespace.match(text, pos).end()
+            if not text.startswith(":", pos):
+                return data
+            pos = whitespace.match(text, pos + 1).end()
+            value, pos = decoder.raw_decode(text, pos)
+        except ValueError:
+            return data
+        if isinstance(name, str):
+            data[name] = value
+        pos = whitespace.match(text, pos).end()
+        if not text.startswith(",", pos):
+            return data
+        pos += 1
+
+def json_field_exists(data, path):
+    """Cek apakah path field bertitik ada di dalam objek JSON bertingkat"""
+    for part in path.split("."):
+        if not isinstance(data, dict) or part not in data:
+            return False
+        data = data[part]
+    return True
+
+def history_entry_uris(entry):
+    """Kumpulkan URI dan path dari satu entry history
+    
+    Mencakup folder, file dan workspace (workspace.configPath), entry editor
+    yang bersarang dan entry berupa string biasa dari daftar versi lama.
+    """
+    if isinstance(entry, str):
+        return [entry]
+    uris = []
+    if isinstance(entry, dict):
+        for name, value in entry.items():
+            if name in HISTORY_URI_FIELDS and isinstance(value, str):
+                uris.append(value)
+            elif isinstance(value, (dict, list)):
+                uris.extend(history_entry_uris(value))
+    elif isinstance(entry, list):
+        for item in entry:
+            if isinstance(item, (dict, list)):
+                uris.extend(history_entry_uris(item))
+    return uris
+
+def filter_history_value(text, patterns):
+    """Buang entry history yang URI-nya mengandung salah satu pattern
+    
+    Mengembalikan value baru dan URI pertama dari setiap entry yang dihapus,
+    atau (None, []) jika tidak ada yang cocok; lihat filter_history_pieces().
+    Pemanggil masih memegang text selama value baru digabung, jadi pemanggil
+    yang memiliki value besar sebaiknya memakai filter_history_pieces() dan
+    melepaskan value asli lebih dulu.
+    """
+    pieces, removed = filter_history_pieces(text, patterns)
+    if not removed:
+        return None, []
+    return "".join(pieces), removed
+
+def filter_history_pieces(text, patterns):
+    """Buang entry history yang URI-nya mengandung salah satu pattern
+    
+    Value berupa object dengan array "entries" atau array biasa. Array
+    ditelusuri satu entry demi satu entry dan hanya entry yang sedang
+    diperiksa yang di-decode. Entry yang dipertahankan disalin sebagai
+    potongan teks asli, sehingga sisa value tetap sama byte demi byte. Entry
+    hanya diperiksa di tempat pencarian case-insensitive menemukan pattern,
+    dan penelusuran berhenti setelah kecocokan terakhir. Mengembalikan value
+    baru sebagai list potongan untuk digabung dan URI pertama dari setiap
+    entry yang dihapus, atau (None, []) jika tidak ada yang cocok. Potongan
+    tidak merujuk ke text. Raise ValueError untuk value yang bukan daftar
+    history.
+    """
+    if isinstance(text, bytes):
+        text = text.decode("utf-8")
+    if not patterns:
+        return None, []
+    
+    # Tanpa escape, teks mentah cocok tepat di tempat string hasil decode
+    # cocok; dengan escape setiap entry harus di-decode
+    if "\\" in text:
+        hits = None
+    else:
+        search = re.compile("|".join(map(re.escape, patterns)), re.IGNORECASE)
+        hits = [match.start() for match in search.finditer(text)]
+        if not hits:
+            return None, []
+    
+    decoder = json.JSONDecoder()
+    whitespace = re.compile(r"\s*")
+    pos = whitespace.match(text).end()
+    
+    # Cari awal array entries
+    if text.startswith("{", pos):
+        pos = whitespace.match(text, pos + 1).end()
+        while not text.startswith("}", pos):
+            name, pos = decoder.raw_decode(text, pos)
+            pos = whitespace.match(text, pos).end()
+            if not text.startswith(":", pos):
+                raise ValueError(f"diharapkan ':' di offset {pos}")
+            pos = whitespace.match(text, pos + 1).end()
+            if name == "entries":
+                break
+            _, pos = decoder.raw_decode(text, pos)
+            pos = whitespace.match(text, pos).end()
+            if text.startswith(",", pos):
+                pos = whitespace.match(text, pos + 1).end()
+        else:
+            return None, []
+    if not text.startswith("[", pos):
+        raise ValueError(f"diharapkan array entries di offset {pos}")
+    
+    # Entry yang dihapus dipotong bersama pemisah di depannya, atau di
+    # belakangnya selama belum ada yang dipertahankan, sehingga spasi entry
+    # yang dipertahankan dan spasi array tetap seperti aslinya
+    array_start = pos
+    pieces = []
+    keep_from = 0
+    kept_end = None
+    cut_to_next = False
+    removed = []
+    next_hit = 0
+    pos = whitespace.match(text, pos + 1).end()
+    while not text.startswith("]", pos):
+        if hits is not None:
+            while next_hit < len(hits) and hits[next_hit] < pos:
+                next_hit += 1
+            if next_hit == len(hits):
+                # Tidak ada kecocokan setelah titik ini: pertahankan sisanya
+                break
+        
+        start = pos
+        entry, pos = decoder.raw_decode(text, pos)
+        uris = []
+        if hits is None or hits[next_hit] < pos:
+            uris = history_entry_uris(entry)
+        if any(pattern in uri.lower() for uri in uris for pattern in patterns):
+            removed.append(uris[0])
+            if kept_end is None:
+                # Belum ada yang dipertahankan: potong sampai entry berikutnya
+                if not cut_to_next:
+                    pieces.append(text[keep_from:start])
+                    cut_to_next = True
+            elif keep_from <= kept_end:
+                pieces.append(text[keep_from:kept_end])
+            keep_from = pos
+        else:
+            if cut_to_next:
+                keep_from = start
+                cut_to_next = False
+            kept_end = pos
+        
+        # JSON ringkas (seperti yang ditulis editor) tidak punya spasi di sini
+        if text.startswith(",", pos) and not text[pos + 1 : pos + 2].isspace():
+            pos += 1
+            continue
+        pos = whitespace.match(text, pos).end()
+        if text.startswith(",", pos):
+            pos = whitespace.match(text, pos + 1).end()
+        elif not text.startswith("]", pos):
+            raise ValueError(f"diharapkan ',' atau ']' di offset {pos}")
+    
+    if not removed:
+        return None, []
+    if text.startswith("]", pos):
+        if kept_end is None:
+            # Semua entry dihapus
+            pieces = [text[: array_start + 1]]
+            keep_from = pos
+    elif cut_to_next:
+        # Penelusuran berhenti lebih awal: entry yang tidak diperiksa dan
+        # akhir value disalin apa adanya
+        keep_from = pos
+    pieces.append(text[keep_from:])
+    return pieces, removed
+
+def load_rules(rules_path):
+    """Muat rules kredensial dari file .json atau .toml"""
+    if rules_path.lower().endswith(".toml"):
+        if tomllib is None:
+            raise ValueError("file rules TOML membutuhkan Python 3.11+, gunakan JSON")
+        with open(rules_path, "rb") as f:
+            return CredentialRules(tomllib.load(f))
+    
+    with open(rules_path, encoding="utf-8") as f:
+        return CredentialRules(json.load(f))
+
+def connect_read_only(db_path, timeout=2.0):
+    """Buka koneksi read-only (URI mode=ro) dengan busy timeout"""
+    uri = f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro"
+    return sqlite3.connect(uri, uri=True, timeout=timeout)
+
+def processes_with_open_file(path):
+    """Kembalikan PID proses lain yang sedang membuka path (Linux)
+    
+    Memindai /proc/<pid>/fd; proses milik user lain tidak bisa diperiksa.
+    Mengembalikan list kosong jika /proc tidak tersedia.
+    """
+    if not os.path.isdir("/proc/self/fd"):
+        return []
+    target = os.stat(path)
+    pids = []
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit() or int(pid) == os.getpid():
+            continue
+        fd_dir = os.path.join("/proc", pid, "fd")
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue
+        for fd in fds:
+            try:
+                stat = os.stat(os.path.join(fd_dir, fd))
+            except OSError:
+                continue
+            if (stat.st_dev, stat.st_ino) == (target.st_dev, target.st_ino):
+                pids.append(int(pid))
+                break
+    return pids
+
+def fsync_directory(directory):
+    """Buat rename di directory tahan crash (sebisanya, tidak di Windows)"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def database_size(db_path):
+    """Ukuran database di disk, termasuk file WAL jika ada"""
+    size = os.path.getsize(db_path)
+    if os.path.exists(db_path + "-wal"):
+        size += os.path.getsize(db_path + "-wal")
+    return size
+
+def encode_value(value):
+    """Encode value kolom untuk journal JSON (bytes menjadi base64)"""
+    if isinstance(value, bytes):
+        return {"value_base64": base64.b64encode(value).decode("ascii")}
+    return {"value": value}
+
+def decode_value(entry):
+    """Decode value kolom yang ditulis oleh encode_value()"""
+    if "value_base64" in entry:
+        return base64.b64decode(entry["value_base64"])
+    return entry["value"]
+
+def value_digest(value):
+    """SHA-256 dari value kolom, dipakai untuk mendeteksi baris yang berubah"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    return hashlib.sha256(bytes(value)).hexdigest()
+
+class HumanRenderer:
+    """Tampilkan hasil sebagai baris konsol yang selama ini dicetak script ini
+    
+    Setiap hasil diformat menjadi satu blok dan ditulis dengan satu
+    panggilan, sehingga ribuan key atau database hanya butuh sedikit
+    penulisan (dan flush di terminal), bukan satu per baris. Ditulis ke
+    sys.stdout kecuali stream diberikan.
+    """
+    
+    def __init__(self, stream=None):
+        self.stream = stream
+    
+    def write(self, lines):
+        (self.stream or sys.stdout).write("\n".join(lines) + "\n")
+    
+    def analysis(self, db_path, records):
+        lines = [f"\n[ANALYSIS] Analisis {len(records)} key yang ditemukan:"]
+        for i, record in enumerate(records, 1):
+            status = "🔑 KREDENSIAL" if record["is_credential"] else "❓ TIDAK JELAS"
+            lines.append(f"\n   {i}. {format_key(record['table'], record['key'])}")
+            lines.append(f"      Status: {status}")
+            if record["tool"]:
+                lines.append(f"      Tool: {record['tool']}")
+            lines.append(f"      Alasan: {record['reason']}")
+            if record["preview"]:
+                lines.append("      Preview:")
+                lines.extend(f"         {line}" for line in record["preview"].split("\n"))
+        self.write(lines)
+    
+    def removal(self, db_path, result):
+        if result["error"]:
+            lines = [f"[ERROR] ❌ Penghapusan di-rollback, database tidak berubah: {result['error']}"]
+            lines.extend(f"   - {key}" for key in result["stale"])
+            self.write(lines)
+            return
+        
+        lines = [f"\n[SUCCESS] Berhasil menghapus {len(result['removed'])} key kredensial dari database"]
+        if result["not_found"]:
+            lines.append(f"[NOT_FOUND] ❌ {len(result['not_found'])} key sudah tidak ada")
+        if result["history_error"]:
+            lines.append(f"[ERROR] Gagal membersihkan history: {result['history_error']}")
+        elif result["history_removed"]:
+            lines.append(f"[CLEANED] ✅ Berhasil membersihkan {len(result['history_removed'])} entry dari history")
+        if result["journal_path"]:
+            lines.append(f"[JOURNAL] Journal undo tersimpan di: {result['journal_path']}")
+        if result["swap_seconds"] is not None:
+            lines.append(f"[ATOMIC] Salinan sudah dicek dan di-rename menimpa database, jendela swap {result['swap_seconds'] * 1000:.1f} ms")
+        else:
+            lines.append(f"[LOCK] Write lock dipegang selama {result['lock_seconds'] * 1000:.1f} ms")
+        self.write(lines)
+    
+    def history(self, db_path, result):
+        if result["error"] or result["history_error"]:
+            self.write([f"[ERROR] Gagal membersihkan history: {result['error'] or result['history_error']}"])
+        else:
+            self.write([f"[CLEANED] ✅ Berhasil membersihkan {len(result['history_removed'])} entry dari history"])
+    
+    def fleet_entry(self, entry):
+        lines = [f"   [{entry['status'].upper()}] {entry['path']} ({entry['removed']} key, {entry['timings'].get('total', 0):.2f}s)"]
+        if entry["error"]:
+            lines.append(f"      [ERROR] {entry['error']}")
+        self.write(lines)
+    
+    def fleet_summary(self, report):
+        self.write([f"\n[FLEET] Selesai dalam {report['total_seconds']:.2f}s: {report['summary']}"])
+
+class JsonLinesRenderer:
+    """Tampilkan hasil sebagai JSON lines untuk program lain
+    
+    Satu object per key yang dianalisis ("key"), penghapusan ("removal"),
+    pembersihan history ("history"), database fleet ("database") dan run
+    fleet ("fleet"). Setiap hasil ditulis dengan satu panggilan.
+    """
+    
+    def __init__(self, stream=None):
+        self.stream = stream
+    
+    def write(self, records):
+        (self.stream or sys.stdout).write("".join(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records))
+    
+    def analysis(self, db_path, records):
+        self.write(
+            {
+                "event": "key",
+                "database": db_path,
+                "table": record["table"],
+                "key": record["key"],
+                "credential": record["is_credential"],
+                "tool": record["tool"],
+                "reason": record["reason"],
+                "preview": json.loads(record["preview"]) if record["preview"] else None,
+            }
+            for record in records
+        )
+    
+    def removal(self, db_path, result):
+        record = {"event": "removal", "database": db_path}
+        record.update(result)
+        for field in ("removed", "not_found"):
+            record[field] = [{"table": table, "key": key} for table, key in result[field]]
+        self.write([record])
+    
+    def history(self, db_path, result):
+        self.write([{"event": "history", "database": db_path, "history_removed": result["history_removed"], "journal_path": result["journal_path"], "error": result["error"] or result["history_error"]}])
+    
+    def fleet_entry(self, entry):
+        self.write([dict(event="database", **entry)])
+    
+    def fleet_summary(self, report):
+        self.write([{"event": "fleet", "workers": report["workers"], "total_seconds": report["total_seconds"], "summary": report["summary"]}])
+
+class SilentRenderer:
+    """Tidak menampilkan apa pun; hasil hanya dikembalikan"""
+    
+    def analysis(self, db_path, records):
+        pass
+    
+    def removal(self, db_path, result):
+        pass
+    
+    def history(self, db_path, result):
+        pass
+    
+    def fleet_entry(self, entry):
+        pass
+    
+    def fleet_summary(self, report):
+        pass
+
+# Renderer yang bisa dipilih dengan --output
+RENDERERS = {
+    "human": HumanRenderer,
+    "jsonl": JsonLinesRenderer,
+    "silent": SilentRenderer,
+}
+
+class BackupStore:
+    """Penyimpanan snapshot database terkompresi berbasis isi (content-addressed)
+    
+    Snapshot diambil dengan SQLite online backup API dan disimpan terkompresi
+    gzip sebagai objects/<sha256>.vscdb.gz, sehingga snapshot yang identik
+    hanya disimpan sekali. Setiap snapshot juga punya manifest JSON kecil di
+    snapshots/ yang mencatat file sumber dan waktu pembuatannya. Journal undo
+    per baris dari setiap penghapusan disimpan di journals/.
+    """
+    
+    def __init__(self, root):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.snapshots_dir = os.path.join(root, "snapshots")
+        self.journals_dir = os.path.join(root, "journals")
+    
+    @staticmethod
+    def default_root(db_path):
+        """Direktori backup jika tidak ditentukan: di sebelah database"""
+        return os.path.join(os.path.dirname(os.path.abspath(db_path)), ".vscdb_backups")
+    
+    def make_dirs(self, *paths):
+        """Buat direktori penyimpanan yang hanya bisa dibuka pemiliknya"""
+        for path in (self.root,) + paths:
+            os.makedirs(path, mode=0o700, exist_ok=True)
+    
+    def object_path(self, digest):
+        """Path snapshot terkompresi dengan hash isi tertentu"""
+        return os.path.join(self.objects_dir, f"{digest}.vscdb.gz")
+    
+    def snapshot(self, db_path):
+        """Ambil snapshot konsisten dari db_path dan kembalikan manifest-nya"""
+        self.make_dirs(self.objects_dir, self.snapshots_dir)
+        source = os.path.abspath(db_path)
+        
+        fd, temp_path = tempfile.mkstemp(suffix=".vscdb", dir=self.root)
+        os.close(fd)
+        try:
+            # Salinan per halaman yang tetap konsisten walaupun file sedang dipakai
+            src = connect_read_only(source)
+            dst = sqlite3.connect(temp_path)
+            try:
+                src.backup(dst)
+            finally:
+                dst.close()
+                src.close()
+            
+            size = os.path.getsize(temp_path)
+            digest = self.file_digest(temp_path)
+            object_path = self.object_path(digest)
+            if not os.path.exists(object_path):
+                self.compress(temp_path, object_path)
+        finally:
+            os.remove(temp_path)
+        
+        created_at = datetime.now()
+        source_hash = hashlib.sha1(source.encode("utf-8")).hexdigest()[:8]
+        manifest = {
+            "id": f"{created_at.strftime('%Y%m%d_%H%M%S_%f')}_{source_hash}",
+            "source": source,
+            "created_at": created_at.isoformat(),
+            "object": digest,
+            "size": size,
+            "compressed_size": os.path.getsize(object_path),
+        }
+        self.write_json(os.path.join(self.snapshots_dir, f"{manifest['id']}.json"), manifest, mode=0o600)
+        return manifest
+    
+    def file_digest(self, path, chunk_size=1024 * 1024):
+        """SHA-256 dari sebuah file, dibaca per chunk"""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def compress(self, source_path, object_path):
+        """Kompres file secara streaming ke penyimpanan, diganti secara atomik"""
+        temp_path = f"{object_path}.tmp{os.getpid()}"
+        # Snapshot adalah salinan penuh database, termasuk kredensialnya
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(source_path, "rb") as src, open(fd, "wb") as raw, gzip.GzipFile(
+            fileobj=raw, mode="wb", compresslevel=6
+        ) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(temp_path, object_path)
+    
+    def write_json(self, path, data, mode=0o666):
+        """Tulis file JSON lewat file sementara dan rename atomik
+        
+        mode adalah permission saat file dibuat (dikurangi umask).
+        """
+        temp_path = f"{path}.tmp{os.getpid()}"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+        with open(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    
+    def save_journal(self, journal):
+        """Simpan journal undo, hanya bisa dibaca pemiliknya, dan kembalikan path-nya"""
+        self.make_dirs(self.journals_dir)
+        created_at = datetime.fromisoformat(journal["created_at"])
+        source_hash = hashlib.sha1(journal["database"].encode("utf-8")).hexdigest()[:8]
+        path = os.path.join(self.journals_dir, f"{created_at.strftime('%Y%m%d_%H%M%S_%f')}_{source_hash}.json")
+        # Journal berisi kredensial yang dihapus itu sendiri
+        self.write_json(path, journal, mode=0o600)
+        return path
+    
+    def list_journals(self, db_path=None):
+        """Daftar path journal undo, terbaru dulu, opsional untuk satu database"""
+        if not os.path.isdir(self.journals_dir):
+            return []
+        
+        source = os.path.abspath(db_path) if db_path else None
+        journals = []
+        for entry in os.scandir(self.journals_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            if source is not None:
+                source_hash = hashlib.sha1(source.encode("utf-8")).hexdigest()[:8]
+                if not entry.name.endswith(f"_{source_hash}.json"):
+                    continue
+            journals.append(entry.path)
+        return sorted(journals, reverse=True)
+    
+    def find_journal(self, db_path, journal):
+        """Cari journal berdasarkan path, nama file atau ID, atau yang terbaru untuk 'latest'"""
+        if os.path.isfile(journal):
+            return journal
+        if journal == "latest":
+            journals = self.list_journals(db_path)
+            return journals[0] if journals else None
+        name = journal if journal.endswith(".json") else f"{journal}.json"
+        path = os.path.join(self.journals_dir, name)
+        return path if os.path.isfile(path) else None
+    
+    def list_snapshots(self, db_path=None):
+        """Daftar manifest snapshot, terbaru dulu, opsional untuk satu database"""
+        if not os.path.isdir(self.snapshots_dir):
+            return []
+        
+        source = os.path.abspath(db_path) if db_path else None
+        snapshots = []
+        for entry in os.scandir(self.snapshots_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            with open(entry.path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if source is None or manifest["source"] == source:
+                snapshots.append(manifest)
+        snapshots.sort(key=lambda manifest: manifest["created_at"], reverse=True)
+        return snapshots
+    
+    def prune(self, db_path, keep=None, keep_days=None):
+        """Terapkan kebijakan retensi pada snapshot dan journal db_path
+        
+        keep membatasi jumlah snapshot dan jumlah journal undo yang disimpan,
+        keep_days menghapus yang lebih tua dari jumlah hari tersebut. Object
+        terkompresi yang tidak lagi dirujuk snapshot mana pun ikut dihapus.
+        Mengembalikan jumlah snapshot dan journal yang dihapus.
+        """
+        if keep is None and keep_days is None:
+            return 0
+        
+        cutoff = None
+        if keep_days is not None:
+            cutoff = datetime.now() - timedelta(days=keep_days)
+        
+        removed = 0
+        for index, manifest in enumerate(self.list_snapshots(db_path)):
+            expired = keep is not None and index >= keep
+            expired = expired or (cutoff and manifest["created_at"] < cutoff.isoformat())
+            if expired:
+                os.remove(os.path.join(self.snapshots_dir, f"{manifest['id']}.json"))
+                removed += 1
+        
+        if removed:
+            referenced = {manifest["object"] for manifest in self.list_snapshots()}
+            for entry in os.scandir(self.objects_dir):
+                digest = entry.name.split(".", 1)[0]
+                if entry.name.endswith(".vscdb.gz") and digest not in referenced:
+                    os.remove(entry.path)
+        
+        for index, path in enumerate(self.list_journals(db_path)):
+            # Nama journal diawali waktu pembuatannya
+            name = os.path.basename(path)
+            expired = keep is not None and index >= keep
+            expired = expired or (cutoff and name < cutoff.strftime("%Y%m%d_%H%M%S_%f"))
+            if expired:
+                os.remove(path)
+                removed += 1
+        return removed
+    
+    def find_snapshot(self, db_path, snapshot_id):
+        """Cari manifest snapshot berdasarkan ID, atau yang terbaru untuk 'latest'"""
+        if snapshot_id == "latest":
+            snapshots = self.list_snapshots(db_path)
+            return snapshots[0] if snapshots else None
+        for manifest in self.list_snapshots():
+            if manifest["id"] == snapshot_id:
+                return manifest
+        return None
+    
+    def restore(self, manifest, target_path):
+        """Pulihkan snapshot ke target_path dengan online backup API"""
+        fd, temp_path = tempfile.mkstemp(suffix=".vscdb", dir=self.root)
+        os.close(fd)
+        try:
+            with gzip.open(self.object_path(manifest["object"]), "rb") as src, open(temp_path, "wb") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            
+            src = sqlite3.connect(temp_path)
+            dst = sqlite3.connect(target_path)
+            try:
+                src.backup(dst)
+            finally:
+                dst.close()
+                src.close()
+        finally:
+            os.remove(temp_path)
+
+def list_backups(store, db_path):
+    """Tampilkan snapshot yang tersedia untuk sebuah database"""
+    snapshots = store.list_snapshots(db_path)
+    if not snapshots and not store.list_journals(db_path):
+        print(f"[INFO] Tidak ada backup di: {store.root}")
+        return
+    
+    print(f"[BACKUPS] {len(snapshots)} snapshot di {store.root}:")
+    for manifest in snapshots:
+        print(f"   {manifest['id']}  {manifest['created_at'][:19]}  {manifest['size']:,} bytes ({manifest['compressed_size']:,} terkompresi)")
+    
+    journals = store.list_journals(db_path)
+    if journals:
+        print(f"\n[JOURNALS] {len(journals)} journal undo:")
+        for path in journals:
+            print(f"   {os.path.basename(path)[:-5]}  {os.path.getsize(path):,} bytes")
+
+def restore_backup(store, db_path, snapshot_id):
+    """Pulihkan database dari snapshot setelah konfirmasi"""
+    manifest = store.find_snapshot(db_path, snapshot_id)
+    if not manifest:
+        print(f"[ERROR] Backup tidak ditemukan: {snapshot_id}")
+        return False
+    
+    print(f"[RESTORE] Snapshot {manifest['id']} dari {manifest['created_at'][:19]}")
+    response = input(f"\nTimpa {db_path} dengan backup ini? (yes/no): ").lower()
+    if response not in ["yes", "y"]:
+        print("[CANCELLED] Restore dibatalkan")
+        return False
+    
+    try:
+        store.restore(manifest, db_path)
+        print(f"[SUCCESS] ✅ Database berhasil dipulihkan dari backup: {manifest['id']}")
+        return True
+    except Exception as e:
+        print(f"[ERROR] Gagal memulihkan backup: {e}")
+        return False
+
+def undo_journal(store, db_path, journal):
+    """Jalankan ulang journal undo ke database setelah konfirmasi"""
+    journal_path = store.find_journal(db_path, journal)
+    if not journal_path:
+        print(f"[ERROR] Journal undo tidak ditemukan: {journal}")
+        return False
+    
+    with open(journal_path, encoding="utf-8") as f:
+        data = json.load(f)
+    if os.path.realpath(data["database"]) != os.path.realpath(db_path):
+        print(f"[ERROR] Journal {journal_path} ditulis untuk {data['database']}")
+        print(f"   Tidak diterapkan ke {db_path}")
+        return False
+    
+    print(f"[UNDO] Journal {journal_path} dari {data['created_at'][:19]}")
+    print(f"[UNDO] Memulihkan {len(data['deleted'])} key yang dihapus dan {len(data['updated'])} value yang diubah")
+    response = input(f"\nTerapkan journal ini ke {db_path}? (yes/no): ").lower()
+    if response not in ["yes", "y"]:
+        print("[CANCELLED] Undo dibatalkan")
+        return False
+    
+    remover = SafeBlackboxCredentialRemover(db_path, backup_dir=store.root)
+    try:
+        if not remover.connect():
+            return False
+        result = remover.apply_journal(data)
+    finally:
+        remover.close()
+    
+    if result["error"]:
+        print(f"[ERROR] Gagal menerapkan journal: {result['error']}")
+        return False
+    if result["conflicts"]:
+        print("[ERROR] Value sudah berubah sejak journal ditulis, tidak ada yang dipulihkan:")
+        for key in result["conflicts"]:
+            print(f"   - {key}")
+        return False
+    
+    print(f"[SUCCESS] ✅ Berhasil memulihkan {len(result['restored'])} key dari journal undo")
+    return True
+
+def write_plan(db_path, plan_path, include_history=True, backup_options=None, renderer=None):
+    """Analisis database tanpa prompt dan simpan rencana perubahannya
+    
+    Tidak ada yang diubah. Rencana bisa diterapkan nanti dengan
+    apply_plan_file(), juga ke database yang sedang dipakai jika analisis
+    dijalankan di salinannya.
+    """
+    remover = SafeBlackboxCredentialRemover(db_path, renderer=renderer, **(backup_options or {}))
+    try:
+        if not remover.connect():
+            return None
+        potential_keys = remover.find_safe_blackbox_keys()
+        credential_keys, unclear_keys = [], []
+        if potential_keys:
+            credential_keys, unclear_keys = remover.display_analysis(potential_keys)
+        history_plan = remover.find_blackbox_history() if include_history else None
+        plan = remover.build_plan(credential_keys, unclear_keys, history_plan)
+    finally:
+        remover.close()
+    
+    with open(plan_path, "w", encoding="utf-8") as f:
+        json.dump(plan, f, indent=2, ensure_ascii=False)
+    print(f"\n[PLAN] {len(plan['keys'])} key kredensial dan {len(plan['history_removed'])} entry history disimpan ke: {plan_path}")
+    print(f'[PLAN] Untuk menerapkan: python blackbox_logout.py "{db_path}" --apply {plan_path}')
+    return plan
+
+def load_plan(plan_path):
+    """Muat rencana perubahan yang ditulis oleh write_plan()"""
+    with open(plan_path, encoding="utf-8") as f:
+        plan = json.load(f)
+    for field in ("database", "created_at", "keys", "history", "history_removed"):
+        if field not in plan:
+            raise ValueError(f"bukan rencana perubahan, '{field}' tidak ada")
+    return plan
+
+def apply_plan_file(db_path, plan, backup_options=None, snapshot=False, deep_verify=False, compact=False, renderer=None):
+    """Terapkan rencana perubahan yang sudah dimuat ke database lalu verifikasi"""
+    remover = SafeBlackboxCredentialRemover(db_path, renderer=renderer, **(backup_options or {}))
+    try:
+        if snapshot and not remover.create_backup():
+            return None
+        if not remover.connect():
+            return None
+        
+        print(f"[PLAN] Rencana dari {plan['created_at'][:19]}: {len(plan['keys'])} key kredensial dan {len(plan['history_removed'])} entry history")
+        if os.path.abspath(db_path) != plan["database"]:
+            print(f"[INFO] Rencana ditulis untuk {plan['database']}, hash value dicek di sini")
+        
+        result = remover.apply_plan(plan)
+        remover.renderer.removal(db_path, result)
+        if result["error"]:
+            return result
+        
+        remover.verify_removal(result, deep=deep_verify)
+        if compact:
+            remover.compact_database()
+        if remover.journal_path:
+            journal_id = os.path.basename(remover.journal_path)[:-5]
+            print(f'[UNDO] Untuk membatalkan: python blackbox_logout.py "{db_path}" --undo {journal_id}')
+        return result
+    finally:
+        remover.close()
+
+class InotifySource:
+    """Tunggu penulisan ke database dan file -wal-nya dengan inotify Linux"""
+    
+    name = "inotify"
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    EVENT_HEADER = struct.Struct("iIII")
+    
+    def __init__(self, db_path):
+        libc_path = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or not libc_path:
+            raise OSError("inotify hanya tersedia di Linux")
+        base_name = os.path.basename(db_path)
+        self.names = {base_name, base_name + "-wal", base_name + "-journal"}
+        
+        # Direktori yang dipantau: SQLite membuat dan menghapus -wal/-journal
+        libc = ctypes.CDLL(libc_path, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        directory = os.path.dirname(os.path.abspath(db_path))
+        mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"inotify_add_watch gagal untuk {directory}")
+    
+    def wait(self, timeout=None):
+        """Kembalikan True begitu salah satu file berubah, False jika timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None
+            if deadline is not None:
+                remaining = max(0.0, deadline - time.monotonic())
+            readable, _, _ = select.select([self.fd], [], [], remaining)
+            if not readable:
+                return False
+            if self.read_events():
+                return True
+    
+    def read_events(self):
+        """Kosongkan event yang tertunda; True jika salah satunya tentang database"""
+        changed = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                length = self.EVENT_HEADER.unpack_from(data, offset)[3]
+                offset += self.EVENT_HEADER.size
+                name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+                offset += length
+                changed = changed or name in self.names
+    
+    def close(self):
+        os.close(self.fd)
+
+class PollingSource:
+    """Cadangan untuk InotifySource yang mengecek ukuran dan mtime file secara berkala"""
+    
+    name = "polling"
+    
+    def __init__(self, db_path, interval=0.25):
+        self.paths = [db_path, db_path + "-wal", db_path + "-journal"]
+        self.interval = interval
+        self.signature = self.stat_files()
+    
+    def stat_files(self):
+        signature = []
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                signature.append(None)
+        return signature
+    
+    def wait(self, timeout=None):
+        """Kembalikan True begitu salah satu file berubah, False jika timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            signature = self.stat_files()
+            if signature != self.signature:
+                self.signature = signature
+                return True
+            delay = self.interval
+            if deadline is not None:
+                delay = min(delay, deadline - time.monotonic())
+                if delay <= 0:
+                    return False
+            time.sleep(delay)
+    
+    def close(self):
+        pass
+
+class CredentialWatcher:
+    """Hapus kredensial lagi begitu editor menuliskannya kembali
+    
+    Penulisan ke database dan file -wal-nya ditangkap dengan inotify, atau
+    dengan polling jika inotify tidak tersedia. Rentetan penulisan di-debounce
+    sampai sepi selama `debounce` detik, tetapi paling lama setengah dari
+    latency budget. Setiap pengecekan pertama-tama membandingkan PRAGMA
+    data_version, yang hanya berubah jika koneksi lain melakukan commit, lalu
+    menjalankan lookup rules dari key_match_conditions(), sehingga hanya
+    value yang cocok dengan rules yang dibaca. Latency diukur dari penulisan pertama
+    dalam satu rentetan sampai commit penghapusan.
+    """
+    
+    def __init__(self, remover, include_history=True, debounce=0.2, latency_budget=1.0, poll=False, stats_path=None):
+        self.remover = remover
+        self.include_history = include_history
+        self.debounce = debounce
+        self.latency_budget = latency_budget
+        self.poll = poll
+        self.stats_path = stats_path
+        self.data_version = None
+        self.inode = None
+        self.counters = {
+            "events": 0,
+            "checks": 0,
+            "skipped_checks": 0,
+            "removals": 0,
+            "keys_removed": 0,
+            "history_removed": 0,
+            "errors": 0,
+            "over_budget": 0,
+            "last_check_ms": None,
+            "last_latency_ms": None,
+            "max_latency_ms": None,
+            "avg_latency_ms": None,
+        }
+        self.latencies = 0
+        self.total_latency = 0.0
+    
+    def open_source(self):
+        """Pakai inotify jika bisa, selain itu polling"""
+        if not self.poll:
+            try:
+                return InotifySource(self.remover.db_path)
+            except OSError as e:
+                print(f"[WATCH] inotify tidak tersedia ({e}), memakai polling")
+        return PollingSource(self.remover.db_path, min(0.25, self.latency_budget / 4))
+    
+    def run(self):
+        """Pantau sampai dihentikan dengan Ctrl+C"""
+        if not self.remover.connect():
+            return False
+        self.inode = os.stat(self.remover.db_path).st_ino
+        source = self.open_source()
+        print(f"[WATCH] Memantau {self.remover.db_path} ({source.name}, debounce {self.debounce * 1000:.0f} ms, latency budget {self.latency_budget * 1000:.0f} ms)")
+        print("[WATCH] Tekan Ctrl+C untuk berhenti")
+        
+        try:
+            # Kredensial mungkin sudah kembali sebelum penulisan pertama
+            self.check()
+            while True:
+                if not source.wait():
+                    continue
+                first_event = time.perf_counter()
+                self.counters["events"] += 1
+                deadline = first_event + self.latency_budget / 2
+                while True:
+                    quiet = min(self.debounce, deadline - time.perf_counter())
+                    if quiet <= 0 or not source.wait(quiet):
+                        break
+                    self.counters["events"] += 1
+                self.check(first_event)
+        except KeyboardInterrupt:
+            print("\n[WATCH] Dihentikan")
+        finally:
+            source.close()
+            self.write_stats()
+            self.print_counters()
+        return True
+    
+    def check(self, first_event=None):
+        """Hapus kredensial yang cocok dengan rules jika database berubah"""
+        remover = self.remover
+        started = time.perf_counter()
+        try:
+            # Editor bisa mengganti file; buka file yang baru
+            inode = os.stat(remover.db_path).st_ino
+            if inode != self.inode:
+                remover.close()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    if not remover.connect():
+                        raise OSError(f"tidak bisa membuka {remover.db_path}")
+                self.inode = inode
+                self.data_version = None
+            
+            version = remover.conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self.data_version:
+                self.counters["skipped_checks"] += 1
+                return None
+            self.data_version = version
+            self.counters["checks"] += 1
+            
+            records = remover.analyze_keys(remover.find_safe_blackbox_keys())
+            credential_keys = [(record["table"], record["key"]) for record in records if record["is_credential"]]
+            with contextlib.redirect_stdout(io.StringIO()):
+                history_plan = None
+                if self.include_history:
+                    history_plan = remover.find_blackbox_history()
+            if not credential_keys and not history_plan:
+                self.counters["last_check_ms"] = round((time.perf_counter() - started) * 1000, 2)
+                return None
+            
+            result = remover.apply_removal(credential_keys, history_plan)
+            # Commit kita sendiri tidak boleh memicu pengecekan lagi
+            self.data_version = remover.conn.execute("PRAGMA data_version").fetchone()[0]
+        except (sqlite3.Error, OSError) as e:
+            self.counters["errors"] += 1
+            print(f"[WATCH] [ERROR] Pengecekan gagal: {e}")
+            return None
+        
+        finished = time.perf_counter()
+        self.counters["last_check_ms"] = round((finished - started) * 1000, 2)
+        if result["error"]:
+            self.counters["errors"] += 1
+            print(f"[WATCH] [ERROR] Penghapusan di-rollback: {result['error']}")
+            return result
+        
+        self.counters["removals"] += 1
+        self.counters["keys_removed"] += len(result["removed"])
+        self.counters["history_removed"] += len(result["history_removed"])
+        message = f"[WATCH] {datetime.now():%H:%M:%S} Menghapus {len(result['removed'])} key"
+        if result["history_removed"]:
+            message += f" dan {len(result['history_removed'])} entry history"
+        
+        if first_event is not None:
+            latency_ms = (finished - first_event) * 1000
+            self.latencies += 1
+            self.total_latency += latency_ms
+            self.counters["last_latency_ms"] = round(latency_ms, 2)
+            self.counters["max_latency_ms"] = round(max(latency_ms, self.counters["max_latency_ms"] or 0.0), 2)
+            self.counters["avg_latency_ms"] = round(self.total_latency / self.latencies, 2)
+            message += f", latency {latency_ms:.0f} ms"
+            if latency_ms > self.latency_budget * 1000:
+                self.counters["over_budget"] += 1
+                message += " (melebihi budget)"
+        print(message)
+        self.write_stats()
+        return result
+    
+    def write_stats(self):
+        """Simpan counter sebagai JSON untuk monitoring (replace atomik)"""
+        if not self.stats_path:
+            return
+        stats = dict(self.counters, database=os.path.abspath(self.remover.db_path), updated_at=datetime.now().isoformat())
+        tmp_path = self.stats_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(stats, f, indent=2)
+            os.replace(tmp_path, self.stats_path)
+        except OSError as e:
+            print(f"[WATCH] [WARNING] Gagal menulis statistik: {e}")
+    
+    def print_counters(self):
+        print("[WATCH] Counter:")
+        for name, value in self.counters.items():
+            print(f"   {name}: {value if value is not None else '-'}")
+
+def new_fleet_entry(db_path, status="clean", error=None):
+    """Kembalikan entry laporan fleet kosong untuk satu database"""
+    return {
+        "path": db_path,
+        "status": status,
+        "removed": 0,
+        "not_found": 0,
+        "unclear": 0,
+        "history_removed": 0,
+        "reclaimed_bytes": 0,
+        "backup_path": None,
+        "journal_path": None,
+        "error": error,
+        "timings": {},
+    }
+
+def clean_database(db_path, include_history=True, backup_options=None):
+    """Bersihkan satu database tanpa konfirmasi dan kembalikan dict laporan
+    
+    Dipakai oleh mode fleet di dalam proses worker. Hasil tidak ditampilkan
+    dan sisa output console ditangkap, agar log worker yang berjalan paralel
+    tidak bercampur.
+    """
+    report = new_fleet_entry(db_path)
+    options = dict(backup_options or {})
+    snapshot = options.pop("snapshot", False)
+    compact = options.pop("compact", False)
+    deep_verify = options.pop("deep_verify", False)
+    remover = SafeBlackboxCredentialRemover(db_path, renderer=SilentRenderer(), **options)
+    log = io.StringIO()
+    started = time.perf_counter()
+    
+    def lap(step, since):
+        now = time.perf_counter()
+        report["timings"][step] = round(now - since, 4)
+        return now
+    
+    try:
+        with contextlib.redirect_stdout(log):
+            step_started = time.perf_counter()
+            if snapshot and not remover.create_backup():
+                raise RuntimeError(log.getvalue().strip().splitlines()[-1])
+            if not remover.connect():
+                raise RuntimeError(log.getvalue().strip().splitlines()[-1])
+            report["backup_path"] = remover.backup_path
+            step_started = lap("backup", step_started)
+            
+            potential_keys = remover.find_safe_blackbox_keys()
+            credential_keys, non_credential_keys = remover.display_analysis(potential_keys)
+            report["unclear"] = len(non_credential_keys)
+            step_started = lap("analyze", step_started)
+            
+            result = remover.remove_safe_keys(credential_keys, confirm=False, include_history=include_history)
+            step_started = lap("remove", step_started)
+            if result["error"]:
+                raise RuntimeError(result["error"])
+            
+            report["journal_path"] = result["journal_path"]
+            report["timings"]["lock"] = round(result["lock_seconds"], 4)
+            report["removed"] = len(result["removed"])
+            report["not_found"] = len(result["not_found"])
+            report["history_removed"] = len(result["history_removed"])
+            if result["history_error"]:
+                report["error"] = f"history: {result['history_error']}"
+            
+            verified = remover.verify_removal(result, deep=deep_verify)
+            step_started = lap("verify", step_started)
+            
+            if compact:
+                compacted = remover.compact_database()
+                lap("compact", step_started)
+                report["reclaimed_bytes"] = compacted["reclaimed_bytes"]
+                if compacted["error"] and not report["error"]:
+                    report["error"] = f"compact: {compacted['error']}"
+        
+        if report["removed"] or report["history_removed"]:
+            report["status"] = "cleaned"
+        if not verified or report["error"]:
+            report["status"] = "warning"
+    except Exception as e:
+        report["status"] = "failed"
+        report["error"] = str(e)
+    finally:
+        remover.close()
+    
+    report["timings"]["total"] = round(time.perf_counter() - started, 4)
+    return report
+
+def attach_limit():
+    """Kembalikan jumlah database yang bisa di-ATTACH oleh satu koneksi"""
+    conn = sqlite3.connect(":memory:")
+    try:
+        return conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    except AttributeError:  # Python < 3.11: default bawaan SQLite
+        return 10
+    finally:
+        conn.close()
+
+def union_all(parts):
+    """Gabungkan statement SELECT (sql, params) menjadi satu query UNION ALL"""
+    sql = " UNION ALL ".join(part_sql for part_sql, _ in parts)
+    return sql, [param for _, part_params in parts for param in part_params]
+
+def clean_database_group(db_paths, include_history=True, backup_options=None):
+    """Bersihkan sekelompok database yang di-ATTACH ke satu koneksi
+    
+    Ditujukan untuk banyak database workspaceStorage kecil, di mana membuka
+    koneksi dan commit per file lebih mahal daripada pekerjaannya sendiri.
+    Daftar tabel, pencarian key, pembacaan value, pembacaan history dan
+    verifikasi masing-masing dijalankan sebagai satu query UNION ALL di
+    semua schema yang di-attach, dan penghapusan seluruh grup di-commit
+    dalam satu transaksi. Jika grup tidak bisa di-commit, misalnya karena
+    editor masih mengunci salah satu file, setiap database di grup
+    dibersihkan sendiri-sendiri dengan clean_database(). Mengembalikan satu
+    dict laporan per database, dengan waktu dari seluruh grup.
+    """
+    options = dict(backup_options or {})
+    snapshot = options.pop("snapshot", False)
+    compact = options.pop("compact", False)
+    deep_verify = options.pop("deep_verify", False)
+    rules_path = options.pop("rules_path", None)
+    rules = load_rules(rules_path) if rules_path else CredentialRules(DEFAULT_RULES)
+    
+    removers = []
+    for db_path in db_paths:
+        remover = SafeBlackboxCredentialRemover(db_path, renderer=SilentRenderer(), **options)
+        remover.rules = rules
+        removers.append(remover)
+    schemas = [f"db{index}" for index in range(len(db_paths))]
+    reports = [new_fleet_entry(db_path) for db_path in db_paths]
+    timings = {}
+    log = io.StringIO()
+    started = time.perf_counter()
+    conn = None
+    committed = False
+    
+    def lap(step, since):
+        now = time.perf_counter()
+        timings[step] = round(now - since, 4)
+        return now
+    
+    def find_keys(cursor, tables):
+        if not tables:
+            return []
+        sources = [(schemas[index], table) for index, table in tables]
+        conditions = removers[0].key_match_conditions(sources)
+        parts = [
+            (
+                f"SELECT {index}, ?, key FROM {qualified_name(*source)} "
+                f"WHERE {conditions[source][0]}",
+                [table] + conditions[source][1],
+            )
+            for (index, table), source in zip(tables, sources)
+        ]
+        cursor.execute(*union_all(parts))
+        return cursor.fetchall()
+    
+    def select_keys(cursor, columns, keys_by_table, extra_params=()):
+        parts = [
+            (
+                f"SELECT {index}, ?, {columns} FROM "
+                f"{qualified_name(schemas[index], table)} "
+                "WHERE key IN (SELECT value FROM json_each(?))",
+                [table, *extra_params, json.dumps(keys)],
+            )
+            for (index, table), keys in keys_by_table.items()
+        ]
+        if not parts:
+            return []
+        cursor.execute(*union_all(parts))
+        return cursor.fetchall()
+    
+    def read_history(cursor, indexes):
+        parts = [
+            (
+                f"SELECT {index}, key, value FROM "
+                f"{qualified_name(schemas[index], 'ItemTable')} "
+                "WHERE key IN (SELECT value FROM json_each(?))",
+                [json.dumps(HISTORY_KEYS)],
+            )
+            for index in indexes
+        ]
+        cursor.execute(*union_all(parts))
+        history = {}
+        for index, key, value in cursor:
+            history.setdefault(index, []).append((key, value))
+        return history
+    
+    try:
+        with contextlib.redirect_stdout(log):
+            step_started = time.perf_counter()
+            for remover, report in zip(removers, reports):
+                if snapshot and not remover.create_backup():
+                    raise RuntimeError(log.getvalue().strip().splitlines()[-1])
+                report["backup_path"] = remover.backup_path
+            
+            conn = sqlite3.connect(":memory:", timeout=removers[0].busy_timeout, uri=True)
+            removers[0].register_functions(conn)
+            cursor = conn.cursor()
+            for schema, db_path in zip(schemas, db_paths):
+                # mode=rw: jangan pernah membuat database yang sudah hilang
+                uri = "file:" + pathname2url(os.path.abspath(db_path)) + "?mode=rw"
+                cursor.execute(f"ATTACH DATABASE ? AS {schema}", (uri,))
+            step_started = lap("backup", step_started)
+            
+            # 1. Tabel key/value dari setiap schema
+            cursor.execute(
+                *union_all(
+                    [
+                        (
+                            f"SELECT {index}, m.name FROM {schema}.sqlite_master AS m "
+                            "WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%' "
+                            "AND (SELECT count(*) FROM pragma_table_info(m.name, ?) "
+                            "AS c WHERE lower(c.name) IN ('key', 'value')) = 2",
+                            [schema],
+                        )
+                        for index, schema in enumerate(schemas)
+                    ]
+                )
+            )
+            tables = sorted(cursor.fetchall())
+            
+            # 2. Key yang cocok dan awal value-nya
+            keys_by_table = {}
+            for index, table, key in find_keys(cursor, tables):
+                keys_by_table.setdefault((index, table), []).append(key)
+            limit = removers[0].max_sniff_bytes
+            credential_keys = {}
+            for index, table, key, data, truncated in select_keys(
+                cursor,
+                "key, CASE WHEN typeof(value) IN ('text', 'blob') "
+                "THEN substr(CAST(value AS BLOB), 1, ?) END, "
+                "length(CAST(value AS BLOB)) > ?",
+                keys_by_table,
+                (limit, limit),
+            ):
+                text = data.decode("utf-8", "ignore") if data is not None else None
+                analysis = removers[index].analyze_key(key, text, bool(truncated))
+                if analysis["is_credential"]:
+                    credential_keys.setdefault((index, table), []).append(key)
+                else:
+                    reports[index]["unclear"] += 1
+            
+            # 3. History dari schema yang punya ItemTable
+            history_plans = {}
+            history_schemas = [index for index, table in tables if table == "ItemTable"]
+            if include_history and history_schemas:
+                history = read_history(cursor, history_schemas)
+                for index, rows in history.items():
+                    # Serahkan baris satu per satu, supaya setiap value bisa
+                    # dilepas begitu selesai disaring
+                    rows.reverse()
+                    plan = removers[index].plan_history_cleanup(rows.pop() for _ in range(len(rows)))
+                    if plan:
+                        history_plans[index] = plan
+            step_started = lap("analyze", step_started)
+            
+            # 4. Satu transaksi tulis untuk seluruh grup
+            removers[0].begin_immediate(conn)
+            locked_at = time.perf_counter()
+            
+            deleted_rows = {}
+            for index, table, key, value in select_keys(
+                cursor, "key, value", credential_keys
+            ):
+                deleted_rows.setdefault(index, []).append((table, key, value))
+            
+            updated_rows = {}
+            if history_plans:
+                history = read_history(cursor, history_plans)
+                for index, plan in history_plans.items():
+                    current = dict(history.get(index, []))
+                    rows = [
+                        (update["key"], current[update["key"]], update["value"])
+                        for update in plan["updates"]
+                        if update["key"] in current and value_digest(current[update["key"]]) == update["before_sha256"]
+                    ]
+                    if len(rows) == len(plan["updates"]):
+                        updated_rows[index] = rows
+                for index in list(history_plans):
+                    if index not in updated_rows:
+                        del history_plans[index]
+                        reports[index]["error"] = "history: history berubah sejak analisis, dilewati"
+            
+            for index in set(deleted_rows) | set(updated_rows):
+                reports[index]["journal_path"] = removers[index].write_journal(
+                    deleted_rows.get(index, []), updated_rows.get(index, [])
+                )
+            
+            deleted_count = {}
+            for (index, table), keys in credential_keys.items():
+                cursor.execute(
+                    f"DELETE FROM {qualified_name(schemas[index], table)} "
+                    "WHERE key IN (SELECT value FROM json_each(?))",
+                    (json.dumps(keys),),
+                )
+                deleted_count[index] = deleted_count.get(index, 0) + cursor.rowcount
+            for index, plan in history_plans.items():
+                cursor.executemany(
+                    f"UPDATE {qualified_name(schemas[index], 'ItemTable')} "
+                    "SET value = ? WHERE key = ?",
+                    [(update["value"], update["key"]) for update in plan["updates"]],
+                )
+            conn.commit()
+            committed = True
+            timings["lock"] = round(time.perf_counter() - locked_at, 4)
+            step_started = lap("remove", step_started)
+            
+            for index, rows in deleted_rows.items():
+                reports[index]["removed"] = len(rows)
+            for (index, table), keys in credential_keys.items():
+                reports[index]["not_found"] += len(keys)
+            for index, report in enumerate(reports):
+                report["not_found"] -= report["removed"]
+                if index in history_plans:
+                    report["history_removed"] = len(
+                        history_plans[index]["removed_entries"]
+                    )
+            
+            # 5. Verifikasi: rowcount ditambah satu query point lookup untuk grup
+            if deep_verify:
+                remaining = find_keys(cursor, tables)
+            else:
+                remaining = select_keys(cursor, "key", credential_keys)
+            unverified = {row[0] for row in remaining}
+            unverified.update(
+                index
+                for index, report in enumerate(reports)
+                if deleted_count.get(index, 0) != report["removed"]
+            )
+            step_started = lap("verify", step_started)
+            
+            if compact:
+                for remover, report in zip(removers, reports):
+                    compacted = remover.compact_database()
+                    report["reclaimed_bytes"] = compacted["reclaimed_bytes"]
+                    if compacted["error"] and not report["error"]:
+                        report["error"] = f"compact: {compacted['error']}"
+                lap("compact", step_started)
+        
+        for index, report in enumerate(reports):
+            if report["removed"] or report["history_removed"]:
+                report["status"] = "cleaned"
+            if index in unverified or report["error"]:
+                report["status"] = "warning"
+    except Exception as e:
+        if conn and not committed:
+            conn.rollback()
+            conn.close()
+            conn = None
+            for remover, report in zip(removers, reports):
+                remover.discard_journal(report["journal_path"])
+            return [
+                clean_database(db_path, include_history, backup_options)
+                for db_path in db_paths
+            ]
+        for report in reports:
+            report["status"] = "failed"
+            report["error"] = str(e)
+    finally:
+        if conn:
+            conn.close()
+    
+    timings["total"] = round(time.perf_counter() - started, 4)
+    for report in reports:
+        report["timings"] = dict(timings)
+    return reports
+
+EDITOR_NAMES = ["Code", "Code - Insiders", "VSCodium", "Cursor"]
+
+def editor_config_roots():
+    """Kembalikan direktori yang menyimpan pengaturan tiap editor di platform ini"""
+    if os.name == "nt":
+        return [os.environ.get("APPDATA") or os.path.expanduser("~/AppData/Roaming")]
+    if sys.platform == "darwin":
+        return [os.path.expanduser("~/Library/Application Support")]
+    return [os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")]
+
+def inventory_cache_path():
+    """Lokasi cache inventaris database (direktori cache XDG)"""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_home, "blackbox_logout", "inventory.json")
+
+def load_inventory_cache(cache_path):
+    """Baca cache inventaris, kosong jika tidak ada atau rusak"""
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+def save_inventory_cache(cache_path, cache):
+    """Tulis cache inventaris secara atomik (kegagalan tidak fatal)"""
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"[WARNING] Gagal menyimpan cache inventaris: {e}")
+
+def list_workspace_folders(storage_dir):
+    """Kembalikan folder workspace dari direktori workspaceStorage"""
+    try:
+        with os.scandir(storage_dir) as entries:
+            return [entry.path for entry in entries if entry.is_dir(follow_symlinks=False)]
+    except OSError:
+        return []
+
+def discover_databases(use_cache=True, cache_path=None):
+    """Cari file state.vscdb global dan workspace dari setiap editor yang terpasang
+    
+    Direktori workspaceStorage dibaca dengan os.scandir di thread pool.
+    Daftar folder dari direktori yang mtime-nya tidak berubah sejak eksekusi
+    terakhir (tidak ada workspace baru atau terhapus) diambil dari cache
+    inventaris. state.vscdb setiap folder selalu dicek di pool yang sama,
+    karena editor membuatnya di dalam folder yang sudah ada tanpa mengubah
+    mtime direktori.
+    """
+    cache_path = cache_path or inventory_cache_path()
+    cache = load_inventory_cache(cache_path) if use_cache else {}
+    cached_storage = cache.get("storage", {})
+    
+    databases = []
+    storage_dirs = []
+    for root in editor_config_roots():
+        for editor in EDITOR_NAMES:
+            user_dir = os.path.join(root, editor, "User")
+            global_db = os.path.join(user_dir, "globalStorage", "state.vscdb")
+            if os.path.isfile(global_db):
+                databases.append({"editor": editor, "scope": "global", "path": global_db})
+            storage_dir = os.path.join(user_dir, "workspaceStorage")
+            try:
+                mtime_ns = os.stat(storage_dir).st_mtime_ns
+            except OSError:
+                continue
+            storage_dirs.append((editor, storage_dir, mtime_ns))
+    
+    inventory = {}
+    stale = []
+    for editor, storage_dir, mtime_ns in storage_dirs:
+        entry = cached_storage.get(storage_dir)
+        if entry and entry.get("mtime_ns") == mtime_ns and "folders" in entry:
+            inventory[storage_dir] = entry
+        else:
+            stale.append((storage_dir, mtime_ns))
+    
+    workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        if stale:
+            listings = pool.map(list_workspace_folders, [d for d, _ in stale])
+            for (storage_dir, mtime_ns), folders in zip(stale, listings):
+                inventory[storage_dir] = {"mtime_ns": mtime_ns, "folders": sorted(folders)}
+            save_inventory_cache(cache_path, {"updated_at": datetime.now().isoformat(), "storage": inventory})
+        
+        candidates = [(editor, os.path.join(folder, "state.vscdb")) for editor, storage_dir, _ in storage_dirs for folder in inventory[storage_dir]["folders"]]
+        found = pool.map(os.path.isfile, [path for _, path in candidates])
+        databases.extend({"editor": editor, "scope": "workspace", "path": path} for (editor, path), exists in zip(candidates, found) if exists)
+    databases.sort(key=lambda entry: (entry["editor"], entry["scope"], entry["path"]))
+    return databases
+
+def print_inventory(databases):
+    """Tampilkan database editor yang ditemukan"""
+    global_count = sum(1 for entry in databases if entry["scope"] == "global")
+    print(f"[DISCOVER] Ditemukan {len(databases)} database ({global_count} global, {len(databases) - global_count} workspace)")
+    for entry in databases:
+        print(f"   [{entry['editor']}] {entry['scope']:<9} {entry['path']}")
+
+def expand_database_paths(patterns):
+    """Ubah path file dan pattern glob menjadi daftar database yang terurut"""
+    paths = set()
+    for pattern in patterns:
+        matches = glob.glob(os.path.expanduser(pattern), recursive=True)
+        if not matches and os.path.exists(pattern):
+            matches = [pattern]
+        paths.update(os.path.abspath(path) for path in matches if os.path.isfile(path))
+    return sorted(paths)
+
+def write_fleet_report(report, report_path):
+    """Simpan laporan fleet sebagai JSON atau CSV, sesuai ekstensi file"""
+    if report_path.lower().endswith(".csv"):
+        timing_columns = ["backup", "analyze", "remove", "lock", "verify", "compact", "total"]
+        columns = [
+            "path",
+            "status",
+            "removed",
+            "not_found",
+            "unclear",
+            "history_removed",
+            "reclaimed_bytes",
+            "backup_path",
+            "journal_path",
+            "error",
+        ]
+        with open(report_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns + [f"{step}_seconds" for step in timing_columns])
+            for entry in report["databases"]:
+                writer.writerow(
+                    [entry[column] for column in columns]
+                    + [entry["timings"].get(step, "") for step in timing_columns]
+                )
+    else:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+def run_fleet(patterns, workers=None, report_path=None, include_history=True, backup_options=None, group_size=None, renderer=None):
+    """Bersihkan banyak database secara paralel tanpa konfirmasi
+    
+    Dengan group_size, database dibersihkan per grup yang di-ATTACH ke satu
+    koneksi (lihat clean_database_group); 0 berarti batas attach SQLite.
+    Setiap database dan ringkasan akhir dikirim ke renderer.
+    """
+    renderer = renderer or HumanRenderer()
+    db_paths = expand_database_paths(patterns)
+    if not db_paths:
+        print("[ERROR] Tidak ada file database yang cocok dengan path yang diberikan")
+        return None
+    
+    if group_size is None:
+        groups = [[path] for path in db_paths]
+    else:
+        limit = attach_limit()
+        group_size = min(group_size or limit, limit)
+        groups = [db_paths[start : start + group_size] for start in range(0, len(db_paths), group_size)]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(groups)))
+    if group_size is None:
+        print(f"[FLEET] Membersihkan {len(db_paths)} database dengan {workers} worker")
+    else:
+        print(f"[FLEET] Membersihkan {len(db_paths)} database dalam {len(groups)} grup berisi maksimal {group_size} dengan {workers} worker")
+    
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for group in groups:
+            if group_size is None:
+                future = executor.submit(clean_database, group[0], include_history, backup_options)
+            else:
+                future = executor.submit(clean_database_group, group, include_history, backup_options)
+            futures[future] = group
+        for future in as_completed(futures):
+            try:
+                entries = future.result()
+                if group_size is None:
+                    entries = [entries]
+            except Exception as e:
+                entries = [new_fleet_entry(path, status="failed", error=str(e)) for path in futures[future]]
+            for entry in entries:
+                results.append(entry)
+                renderer.fleet_entry(entry)
+    
+    results.sort(key=lambda entry: entry["path"])
+    summary = {}
+    for entry in results:
+        summary[entry["status"]] = summary.get(entry["status"], 0) + 1
+    
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "workers": workers,
+        "total_seconds": round(time.perf_counter() - started, 4),
+        "summary": summary,
+        "databases": results,
+    }
+    
+    renderer.fleet_summary(report)
+    if report_path:
+        write_fleet_report(report, report_path)
+        print(f"[REPORT] Laporan disimpan ke: {report_path}")
+    return report
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Script AMAN untuk menghapus HANYA kredensial Blackbox",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        fromfile_prefix_chars="@",
+        epilog="""
+Contoh penggunaan:
+  python blackbox_logout.py
+  python blackbox_logout.py /path/ke/state.vscdb
+  python blackbox_logout.py --fleet "/home/*/.config/Cursor/User/globalStorage/state.vscdb"
+  python blackbox_logout.py --fleet @databases.txt --workers 8 --report report.csv
+  python blackbox_logout.py --discover
+  python blackbox_logout.py --discover --fleet --report report.csv
+  python blackbox_logout.py --discover --fleet --batch --report report.csv
+  python blackbox_logout.py state.vscdb --rules credential_rules.example.json
+  python blackbox_logout.py state.vscdb --watch --latency-budget 0.5 --stats watch.json
+        """,
+    )
+    parser.add_argument("db_path", nargs="?", help="Path ke file state.vscdb")
+    parser.add_argument("--rules", metavar="FILE", help="Rules kredensial (.json atau .toml) dari tool yang akan di-logout (default: Blackbox)")
+    parser.add_argument("--fleet", nargs="*", metavar="PATH", help="Bersihkan banyak database (path atau pattern glob) tanpa konfirmasi")
+    parser.add_argument("--discover", action="store_true", help="Cari database global dan workspace dari Code, Code - Insiders, VSCodium dan Cursor (tambahkan --fleet untuk membersihkan semuanya)")
+    parser.add_argument("--no-cache", action="store_true", help="Pindai ulang folder editor tanpa memakai cache inventaris")
+    parser.add_argument("--workers", type=int, help="Jumlah maksimum proses worker paralel (default: jumlah CPU)")
+    parser.add_argument("--batch", nargs="?", type=int, const=0, metavar="N", help="Mode fleet: ATTACH sampai N database ke satu koneksi dan commit bersama (default N: batas attach SQLite)")
+    parser.add_argument("--report", metavar="FILE", help="Simpan laporan fleet ke file .json atau .csv")
+    parser.add_argument("--no-history", action="store_true", help="Jangan bersihkan entry Blackbox dari history di mode fleet, watch dan plan")
+    parser.add_argument("--watch", action="store_true", help="Tetap berjalan dan hapus kredensial lagi setiap kali muncul kembali")
+    parser.add_argument("--debounce", type=float, default=0.2, metavar="SECONDS", help="Mode watch: tunggu sampai penulisan sepi selama ini (default: 0.2)")
+    parser.add_argument("--latency-budget", type=float, default=1.0, metavar="SECONDS", help="Mode watch: waktu maksimum dari penulisan sampai penghapusan (default: 1.0)")
+    parser.add_argument("--poll", action="store_true", help="Mode watch: cek file secara berkala alih-alih memakai inotify")
+    parser.add_argument("--stats", metavar="FILE", help="Mode watch: simpan counter terbaru di file JSON ini")
+    parser.add_argument("--atomic", action="store_true", help="Terapkan perubahan ke salinan yang sudah dicek lalu rename menimpa database (editor harus ditutup)")
+    parser.add_argument("--snapshot", action="store_true", help="Ambil juga snapshot lengkap terkompresi sebelum perubahan")
+    parser.add_argument("--deep-verify", action="store_true", help="Verifikasi dengan scan ulang semua key, bukan hanya key yang dihapus")
+    parser.add_argument("--compact", action="store_true", help="Kembalikan ruang yang dibebaskan oleh penghapusan (VACUUM) sesudahnya")
+    parser.add_argument("--backup-dir", metavar="DIR", help="Direktori penyimpanan backup (default: .vscdb_backups di sebelah database)")
+    parser.add_argument("--keep-backups", type=int, metavar="N", help="Simpan hanya N backup terbaru")
+    parser.add_argument("--keep-days", type=float, metavar="D", help="Hapus backup yang lebih tua dari D hari")
+    parser.add_argument("--list-backups", action="store_true", help="Tampilkan daftar backup database")
+    parser.add_argument("--restore", metavar="SNAPSHOT", help="Pulihkan database dari ID backup (atau 'latest')")
+    parser.add_argument("--undo", metavar="JOURNAL", help="Batalkan penghapusan dari journal-nya (path, ID atau 'latest')")
+    parser.add_argument("--output", choices=sorted(RENDERERS), default="human", help="Cara hasil ditampilkan: human (default), jsonl (JSON lines di stdout, log di stderr) atau silent")
+    parser.add_argument("--plan", metavar="FILE", help="Analisis tanpa prompt dan simpan rencana perubahan ke FILE, tidak ada yang diubah")
+    parser.add_argument("--apply", metavar="FILE", help="Terapkan rencana yang disimpan dengan --plan, ditolak jika ada value yang berubah sejak itu")
+    args = parser.parse_args()
+    
+    # Output silent juga menyembunyikan prompt yes/no, yang lalu menunggu selamanya
+    prompts = args.restore or args.undo
+    unattended = args.fleet is not None or args.plan or args.apply or args.watch
+    if args.output == "silent" and (prompts or not (unattended or args.discover or args.list_backups)):
+        parser.error("--output silent butuh mode tanpa prompt: --fleet, --plan, --apply, --watch, --discover atau --list-backups")
+    return args
 
 def main():
+    args = parse_args()
+    
+    if args.output == "human":
+        run(args, HumanRenderer())
+        return
+    
+    # stdout hanya berisi hasil; baris log masuk ke stderr, atau dibuang
+    # di mode silent
+    if args.output == "jsonl":
+        renderer = JsonLinesRenderer(sys.stdout)
+        with contextlib.redirect_stdout(sys.stderr):
+            run(args, renderer)
+    else:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            run(args, SilentRenderer())
+
+def run(args, renderer):
+    """Jalankan command line, hasil ditampilkan dengan renderer"""
     print("=" * 80)
     print("[SAFE BLACKBOX CREDENTIAL REMOVER]")
     print("Script AMAN untuk menghapus HANYA kredensial Blackbox")
     print("=" * 80)
     
+    backup_options = {
+        "backup_dir": args.backup_dir,
+        "keep_backups": args.keep_backups,
+        "keep_days": args.keep_days,
+        "rules_path": args.rules,
+        "atomic": args.atomic,
+    }
+    
+    if args.rules:
+        try:
+            rules = load_rules(args.rules)
+        except (OSError, ValueError, re.error) as e:
+            print(f"[ERROR] File rules tidak valid {args.rules}: {e}")
+            return
+        tool_names = ", ".join(tool["name"] for tool in rules.tools)
+        print(f"[RULES] Rules dimuat untuk: {tool_names}")
+    
+    plan = None
+    if args.apply:
+        try:
+            plan = load_plan(args.apply)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] File rencana tidak valid {args.apply}: {e}")
+            return
+        # Tanpa path, terapkan ke database tempat rencana ditulis
+        if not args.db_path:
+            args.db_path = plan["database"]
+    
+    discovered = []
+    if args.discover:
+        discovered = discover_databases(use_cache=not args.no_cache)
+        print_inventory(discovered)
+        if args.fleet is None:
+            return
+    
+    if args.atomic and args.batch is not None:
+        print("[INFO] --atomic membersihkan setiap database sendiri-sendiri, --batch diabaikan")
+        args.batch = None
+    
+    if args.fleet is not None:
+        run_fleet(args.fleet + [entry["path"] for entry in discovered], args.workers, args.report, not args.no_history, dict(backup_options, snapshot=args.snapshot, compact=args.compact, deep_verify=args.deep_verify), args.batch, renderer)
+        return
+    
     # Hanya mencari file di direktori yang sama dengan script
     script_dir = os.path.dirname(os.path.abspath(__file__))
     local_paths = [
@@ -288,8 +2873,8 @@ def main():
     
     # Tentukan file database
     db_path = None
-    if len(sys.argv) > 1:
-        provided_path = sys.argv[1]
+    if args.db_path:
+        provided_path = args.db_path
         if os.path.exists(provided_path):
             db_path = provided_path
         else:
@@ -305,15 +2890,42 @@ def main():
         print("[ERROR] File state.vscdb tidak ditemukan di direktori script!")
         print("[INFO] Script ini hanya bekerja dengan file lokal untuk keamanan")
         print("[SOLUTION] Copy file state.vscdb ke direktori ini terlebih dahulu")
+        print("[TIP] Gunakan --discover untuk mencari database editor milik user ini")
         return
     
     print(f"[DATABASE] Menggunakan file: {db_path}")
     
+    store = BackupStore(args.backup_dir or BackupStore.default_root(db_path))
+    if args.list_backups:
+        list_backups(store, db_path)
+        return
+    if args.restore:
+        restore_backup(store, db_path, args.restore)
+        return
+    if args.undo:
+        undo_journal(store, db_path, args.undo)
+        return
+    if args.plan:
+        write_plan(db_path, args.plan, not args.no_history, backup_options, renderer)
+        return
+    if plan:
+        apply_plan_file(db_path, plan, backup_options, snapshot=args.snapshot, deep_verify=args.deep_verify, compact=args.compact, renderer=renderer)
+        return
+    
+    if args.watch:
+        remover = SafeBlackboxCredentialRemover(db_path, renderer=renderer, **backup_options)
+        watcher = CredentialWatcher(remover, include_history=not args.no_history, debounce=args.debounce, latency_budget=args.latency_budget, poll=args.poll, stats_path=args.stats)
+        try:
+            watcher.run()
+        finally:
+            remover.close()
+        return
+    
     # Peringatan untuk safe mode
     print("\n[SAFE MODE] Mode Aman Aktif:")
     print("1. Hanya menghapus kredensial Blackbox yang TERVERIFIKASI")
     print("2. Data umum Cursor (history, UI, extension lain) TIDAK akan dihapus")
-    print("3. Backup otomatis akan dibuat")
+    print("3. Journal undo dari setiap perubahan akan disimpan (backup lengkap dengan --snapshot)")
     print("4. Analisis detail sebelum penghapusan")
     
     response = input("\nApakah Anda ingin melanjutkan analisis aman? (yes/no): ").lower()
@@ -322,11 +2934,11 @@ def main():
         return
     
     # Inisialisasi remover
-    remover = SafeBlackboxCredentialRemover(db_path)
+    remover = SafeBlackboxCredentialRemover(db_path, renderer=renderer, **backup_options)
     
     try:
-        # Buat backup
-        if not remover.create_backup():
+        # Buat backup lengkap (journal undo selalu ditulis)
+        if args.snapshot and not remover.create_backup():
             return
         
         # Koneksi ke database
@@ -346,38 +2958,37 @@ def main():
         
         if non_credential_keys:
             print(f"\n[WARNING] Ditemukan {len(non_credential_keys)} key yang TIDAK JELAS:")
-            for key in non_credential_keys:
-                print(f"   ❓ {key}")
+            for table, key in non_credential_keys:
+                print(f"   ❓ {format_key(table, key)}")
             print("[SAFE] Key ini TIDAK akan dihapus untuk keamanan")
         
         if not credential_keys:
             print("\n[INFO] Tidak ada kredensial yang jelas teridentifikasi untuk dihapus")
             return
         
-        # Hapus hanya credential keys
-        if remover.remove_safe_keys(credential_keys):
-            # Bersihkan history (opsional)
-            remover.cleanup_blackbox_history()
-            
+        # Hapus hanya credential keys (dan entry history) dalam satu transaksi
+        result = remover.remove_safe_keys(credential_keys)
+        if result and not result["error"]:
             # Verifikasi penghapusan
-            success = remover.verify_removal()
+            success = remover.verify_removal(result, deep=args.deep_verify)
+            
+            # Perkecil file agar editor memuat database state yang lebih kecil
+            if args.compact:
+                remover.compact_database()
             
             if success:
                 print(f"\n[COMPLETED] ✅ Kredensial Blackbox berhasil dihapus dengan aman!")
-                print(f"[BACKUP] File backup tersimpan di: {remover.backup_path}")
+                if remover.backup_path:
+                    print(f"[BACKUP] File backup tersimpan di: {remover.backup_path}")
+                if remover.journal_path:
+                    journal_id = os.path.basename(remover.journal_path)[:-5]
+                    print(f'[UNDO] Untuk membatalkan: python blackbox_logout.py "{db_path}" --undo {journal_id}')
                 print(f"[CLEANED] File yang sudah dibersihkan: {db_path}")
                 
-                print("\n[NEXT_STEPS] Untuk menerapkan perubahan ke Cursor:")
-                print("1. Tutup Cursor/VSCode jika masih buka")
-                print("2. Copy file yang sudah dibersihkan ke lokasi asli:")
-                print(f"   FROM: {db_path}")
-                print(f"   TO: C:\\Users\\{os.getenv('USERNAME', 'Home')}\\AppData\\Roaming\\Cursor\\User\\globalStorage\\state.vscdb")
-                print("3. Buka Cursor/VSCode")
-                print("4. Extension Blackbox akan muncul dalam keadaan logout")
-                
-                print("\n[COPY COMMAND]:")
-                original_location = f"C:\\Users\\{os.getenv('USERNAME', 'Home')}\\AppData\\Roaming\\Cursor\\User\\globalStorage\\state.vscdb"
-                print(f'   copy "{db_path}" "{original_location}"')
+                print("\n[NEXT_STEPS] Perubahan sudah langsung diterapkan ke database:")
+                print("1. Tidak perlu menutup Cursor/VSCode atau meng-copy file kembali")
+                print("2. Extension Blackbox akan muncul dalam keadaan logout")
+                print("3. Jika editor sedang terbuka, jalankan 'Developer: Reload Window' sekali")
     
     except Exception as e:
         print(f"[ERROR] Terjadi kesalahan: {e}")
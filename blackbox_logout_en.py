@@ -5,41 +5,98 @@ This version is more specific and does not remove other general Cursor data
 """
 
 import sqlite3
+import argparse
+import base64
+import contextlib
+import csv
+import ctypes
+import ctypes.util
+import fnmatch
+import glob
+import gzip
+import hashlib
+import io
 import json
 import os
+import re
+import select
 import shutil
+import struct
 import sys
-from datetime import datetime
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from urllib.request import pathname2url
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11: JSON rule files only
+    tomllib = None
 
 
 class SafeBlackboxCredentialRemover:
-    def __init__(self, db_path):
+    def __init__(
+        self,
+        db_path,
+        backup_dir=None,
+        keep_backups=None,
+        keep_days=None,
+        rules_path=None,
+        atomic=False,
+        renderer=None,
+    ):
         self.db_path = db_path
         self.backup_path = None
+        self.backup_id = None
+        self.journal_path = None
+        self.journal_mode = None
         self.conn = None
 
-        # SPECIFIC list of keys related to Blackbox credentials ONLY
-        self.specific_blackbox_keys = [
-            "Blackboxapp.blackboxagent",  # Main credentials
-            "workbench.view.extension.blackboxai-dev-ActivityBar.state.hidden",  # Extension UI
-            # Additional specific keys if found
-        ]
+        # Seconds to wait for a lock held by the editor, and how many times
+        # to retry taking the write lock after that (with backoff)
+        self.busy_timeout = 2.0
+        self.lock_retries = 5
 
-        # Patterns for key names that are DEFINITELY related to Blackbox
-        self.safe_key_patterns = [
-            "blackboxapp.blackboxagent",
-            "blackboxai-dev.",
-            "workbench.view.extension.blackboxai-dev",
-        ]
+        # Apply removals to a clone that is renamed over the database
+        # instead of changing the database in place
+        self.atomic = atomic
+
+        # Key/value tables found on connect, and how many bytes of a value
+        # are read to recognise credentials (values can be many MB)
+        self.tables = []
+        self.max_sniff_bytes = 64 * 1024
+
+        # Snapshot store and retention policy used by create_backup()
+        self.backup_store = BackupStore(backup_dir or BackupStore.default_root(db_path))
+        self.keep_backups = keep_backups
+        self.keep_days = keep_days
+
+        # Key and credential rules of every tool to log out (Blackbox by
+        # default), compiled into one matcher that is registered on connect
+        self.rules = load_rules(rules_path) if rules_path else CredentialRules(DEFAULT_RULES)
+
+        # Where analysis and removal results go: HumanRenderer,
+        # JsonLinesRenderer or SilentRenderer
+        self.renderer = renderer or HumanRenderer()
 
     def create_backup(self):
         """Create backup of database file before making changes"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.backup_path = f"{self.db_path}.safe_backup_{timestamp}"
-
         try:
-            shutil.copy2(self.db_path, self.backup_path)
+            snapshot = self.backup_store.snapshot(self.db_path)
+            self.backup_id = snapshot["id"]
+            self.backup_path = self.backup_store.object_path(snapshot["object"])
             print(f"[BACKUP] Backup successfully created: {self.backup_path}")
+            print(
+                f"[BACKUP] Snapshot ID: {snapshot['id']} "
+                f"({snapshot['compressed_size']:,} bytes compressed)"
+            )
+
+            pruned = self.backup_store.prune(
+                self.db_path, self.keep_backups, self.keep_days
+            )
+            if pruned:
+                print(f"[BACKUP] Removed {pruned} old backups (retention policy)")
             return True
         except Exception as e:
             print(f"[ERROR] Failed to create backup: {e}")
@@ -52,8 +109,14 @@ class SafeBlackboxCredentialRemover:
                 print(f"[ERROR] Database file not found: {self.db_path}")
                 return False
 
-            self.conn = sqlite3.connect(self.db_path)
+            # Analysis only reads, so the editor keeps full access meanwhile
+            self.conn = connect_read_only(self.db_path, self.busy_timeout)
+            self.register_functions()
+            self.journal_mode = self.conn.execute("PRAGMA journal_mode").fetchone()[0]
+            self.tables = self.find_key_value_tables()
             print(f"[SUCCESS] Successfully connected to database: {self.db_path}")
+            print(f"[INFO] Read-only analysis, journal mode: {self.journal_mode}")
+            print(f"[INFO] Key/value tables: {', '.join(self.tables)}")
             return True
         except Exception as e:
             print(f"[ERROR] Failed to connect to database: {e}")
@@ -64,51 +127,189 @@ class SafeBlackboxCredentialRemover:
         if self.conn:
             self.conn.close()
 
-    def find_safe_blackbox_keys(self):
-        """Find ONLY keys that are DEFINITELY related to Blackbox credentials"""
-        cursor = self.conn.cursor()
-
-        # Search in ItemTable
-        cursor.execute("SELECT key FROM ItemTable")
-        all_keys = [row[0] for row in cursor.fetchall()]
-
-        safe_blackbox_keys = []
+    def open_write_connection(self):
+        """Open a short-lived read-write connection with a busy timeout"""
+        return sqlite3.connect(self.db_path, timeout=self.busy_timeout)
 
-        # 1. Check keys that exist in specific list
-        for key in all_keys:
-            if key in self.specific_blackbox_keys:
-                safe_blackbox_keys.append(key)
+    def begin_immediate(self, conn):
+        """Take the write lock, retrying with backoff while the editor holds it"""
+        delay = 0.05
+        for attempt in range(self.lock_retries + 1):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as e:
+                busy = "locked" in str(e) or "busy" in str(e)
+                if not busy or attempt == self.lock_retries:
+                    raise
+                time.sleep(delay)
+                delay = min(delay * 2, 1.0)
+
+    def register_functions(self, conn=None):
+        """Register the compiled key matcher as an SQL function"""
+        (conn or self.conn).create_function(
+            "credential_key_match",
+            1,
+            lambda key: key is not None and self.rules.key_matcher.match(key) is not None,
+        )
 
-        # 2. Check keys with SAFE patterns (only in key name, not value)
-        for key in all_keys:
-            key_lower = key.lower()
-            for pattern in self.safe_key_patterns:
-                if pattern.lower() in key_lower and key not in safe_blackbox_keys:
-                    safe_blackbox_keys.append(key)
-                    break
+    def find_key_value_tables(self):
+        """List the tables with key and value columns (ItemTable, cursorDiskKV, ...)"""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT name FROM sqlite_master "
+            "WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        )
+        tables = []
+        for (name,) in cursor.fetchall():
+            cursor.execute(f"PRAGMA table_info({quote_identifier(name)})")
+            columns = {row[1].lower() for row in cursor.fetchall()}
+            if {"key", "value"} <= columns:
+                tables.append(name)
+        return tables
 
-        return safe_blackbox_keys
+    def find_safe_blackbox_keys(self):
+        """Find ONLY keys that are DEFINITELY related to the tools' credentials
+
+        Every key/value table is searched with one query over its key index
+        (see key_match_conditions()): exact keys are point lookups, prefix
+        rules read only the matching range of the index and contains rules
+        match anywhere in the key name, like the original pattern list.
+        Returns sorted (table, key) pairs.
+        """
+        cursor = self.conn.cursor()
+        safe_blackbox_keys = set()
+        conditions = self.key_match_conditions([("main", table) for table in self.tables])
 
-    def get_key_value(self, key):
+        for table in self.tables:
+            condition, params = conditions[("main", table)]
+            cursor.execute(
+                f"SELECT key FROM {quote_identifier(table)} WHERE {condition}", params
+            )
+            safe_blackbox_keys.update((table, row[0]) for row in cursor)
+
+        return sorted(safe_blackbox_keys)
+
+    def key_match_conditions(self, sources):
+        """Build the WHERE condition matching the rules against a key index
+
+        Returns {(schema, table): (sql, params)}. Exact keys are point
+        lookups. Prefix rules, and the literal start of globs, are walked
+        one character at a time: both letter cases are probed against the
+        key index and spellings no key starts with are dropped, so each
+        prefix costs a few index probes plus a range scan of the keys that
+        start with it, however large the table is. Contains rules are case-insensitive LIKE '%...%' tests, which read
+        the whole key index inside SQLite. Only the hits are checked by
+        credential_key_match(); rules SQLite cannot narrow down (regexes,
+        globs starting with a wildcard, non-ASCII text) call
+        credential_key_match() on every key.
+        """
+        if self.rules.needs_scan:
+            return {source: ("credential_key_match(key)", []) for source in sources}
+        conditions = {}
+        for source in sources:
+            table = qualified_name(*source)
+            sql = "key IN (SELECT value FROM json_each(?))"
+            params = [json.dumps(self.rules.exact_keys)]
+            if self.rules.prefixes:
+                # heads holds the spellings of each prefix typed so far that
+                # start at least one key, as [low, high) key index bounds
+                sql += (
+                    " OR rowid IN (WITH RECURSIVE heads(low, high, rest) AS ("
+                    "SELECT '', '', value FROM json_each(?) UNION "
+                    "SELECT low || c.value, low || char(unicode(c.value) + 1), substr(rest, 2) "
+                    "FROM heads, json_each(json_array("
+                    "upper(substr(rest, 1, 1)), lower(substr(rest, 1, 1)))) AS c "
+                    f"WHERE rest <> '' AND EXISTS (SELECT 1 FROM {table} "
+                    "WHERE key >= low || c.value AND key < low || char(unicode(c.value) + 1))) "
+                    f"SELECT k.rowid FROM heads CROSS JOIN {table} AS k "
+                    "ON k.key >= low AND k.key < high "
+                    "WHERE rest = '' AND credential_key_match(k.key))"
+                )
+                params.append(json.dumps(self.rules.prefixes))
+            if self.rules.contains:
+                likes = " OR ".join("key LIKE ? ESCAPE '\\'" for _ in self.rules.contains)
+                sql += f" OR (({likes}) AND credential_key_match(key))"
+                params += [f"%{like_escape(text)}%" for text in self.rules.contains]
+            conditions[source] = (sql, params)
+        return conditions
+
+    def get_key_value(self, key, table="ItemTable"):
         """Get value from specific key"""
         cursor = self.conn.cursor()
-        cursor.execute("SELECT value FROM ItemTable WHERE key = ?", (key,))
+        cursor.execute(
+            f"SELECT value FROM {quote_identifier(table)} WHERE key = ?", (key,)
+        )
         result = cursor.fetchone()
         return result[0] if result else None
 
-    def analyze_key(self, key):
-        """Analyze whether key is really related to Blackbox credentials"""
-        value = self.get_key_value(key)
+    def get_value_heads(self, keys):
+        """Read at most max_sniff_bytes of the value of many (table, key) pairs
 
-        analysis = {"key": key, "is_credential": False, "reason": "", "preview": ""}
+        Returns {(table, key): (text, truncated)}. Values are read
+        incrementally with Connection.blobopen (Python 3.11+), or cut with
+        substr() inside SQLite on older versions, so a multi-MB value is
+        never loaded whole. One query per table finds the rows.
+        """
+        cursor = self.conn.cursor()
+        limit = self.max_sniff_bytes
+        heads = {}
+
+        tables = {}
+        for table, key in keys:
+            tables.setdefault(table, []).append(key)
+
+        for table, table_keys in tables.items():
+            quoted = quote_identifier(table)
+            if hasattr(self.conn, "blobopen"):
+                cursor.execute(
+                    f"SELECT rowid, key, typeof(value) FROM {quoted} "
+                    "WHERE key IN (SELECT value FROM json_each(?))",
+                    (json.dumps(table_keys),),
+                )
+                for rowid, key, value_type in cursor.fetchall():
+                    if value_type not in ("text", "blob"):
+                        heads[(table, key)] = (None, False)
+                        continue
+                    with self.conn.blobopen(
+                        table, "value", rowid, readonly=True
+                    ) as blob:
+                        data = blob.read(limit)
+                        truncated = len(blob) > limit
+                    heads[(table, key)] = (data.decode("utf-8", "ignore"), truncated)
+            else:
+                cursor.execute(
+                    "SELECT key, CASE WHEN typeof(value) IN ('text', 'blob') "
+                    "THEN substr(CAST(value AS BLOB), 1, ?) END, "
+                    f"length(CAST(value AS BLOB)) > ? FROM {quoted} "
+                    "WHERE key IN (SELECT value FROM json_each(?))",
+                    (limit, limit, json.dumps(table_keys)),
+                )
+                for key, data, truncated in cursor.fetchall():
+                    text = data.decode("utf-8", "ignore") if data is not None else None
+                    heads[(table, key)] = (text, bool(truncated))
+
+        return heads
+
+    def analyze_key(self, key, value, truncated=False):
+        """Analyze whether key is really related to credentials of a tool
+
+        value may be only the start of a large value (truncated=True); then
+        only the object members that fit completely are inspected.
+        """
+        analysis = {
+            "key": key,
+            "tool": self.rules.match_tool(key),
+            "is_credential": False,
+            "reason": "",
+            "preview": "",
+        }
 
         # Analysis based on key name
-        if key == "Blackboxapp.blackboxagent":
+        match = self.rules.match_credential_key(key, analysis["tool"])
+        if match:
+            analysis["tool"], analysis["reason"] = match
             analysis["is_credential"] = True
-            analysis["reason"] = "Main Blackbox credentials"
-        elif "blackboxai-dev" in key.lower():
-            analysis["is_credential"] = True
-            analysis["reason"] = "Blackbox Extension UI"
         else:
             analysis["reason"] = "Not clearly related to credentials"
 
@@ -116,24 +317,19 @@ class SafeBlackboxCredentialRemover:
         if value:
             try:
                 if value.strip().startswith(("{", "[")):
-                    parsed = json.loads(value)
-                    if isinstance(parsed, dict) and any(
-                        k in parsed
-                        for k in ["userId", "blackbox_userId", "apiProvider"]
-                    ):
+                    if truncated:
+                        parsed = sniff_json_object(value)
+                    else:
+                        parsed = json.loads(value)
+                    match = self.rules.match_json_fields(parsed, analysis["tool"])
+                    if match:
+                        analysis["tool"], analysis["reason"] = match
                         analysis["is_credential"] = True
-                        analysis["reason"] = "Contains credential data"
 
                     # Preview for important keys
-                    if analysis["is_credential"]:
-                        important_keys = [
-                            "userId",
-                            "blackbox_userId",
-                            "apiProvider",
-                            "installed",
-                        ]
+                    if analysis["is_credential"] and isinstance(parsed, dict):
                         preview = {}
-                        for imp_key in important_keys:
+                        for imp_key in self.rules.preview_fields(analysis["tool"]):
                             if imp_key in parsed:
                                 preview[imp_key] = parsed[imp_key]
                         if preview:
@@ -143,162 +339,2975 @@ class SafeBlackboxCredentialRemover:
 
         return analysis
 
-    def display_analysis(self, keys):
-        """Display analysis of found keys"""
-        print(f"\n[ANALYSIS] Analysis of {len(keys)} keys found:")
-
-        credential_keys = []
-        non_credential_keys = []
+    def analyze_keys(self, keys):
+        """Analyze found (table, key) pairs without printing anything
 
-        for i, key in enumerate(keys, 1):
-            analysis = self.analyze_key(key)
+        Returns one analyze_key() record per key, with its table added, in
+        the order of keys.
+        """
+        # Read the start of all values at once instead of one query per key
+        heads = self.get_value_heads(keys)
 
-            status = "🔑 CREDENTIAL" if analysis["is_credential"] else "❓ UNCLEAR"
-            print(f"\n   {i}. {key}")
-            print(f"      Status: {status}")
-            print(f"      Reason: {analysis['reason']}")
+        records = []
+        for table, key in keys:
+            value, truncated = heads.get((table, key), (None, False))
+            records.append(dict(self.analyze_key(key, value, truncated), table=table))
+        return records
 
-            if analysis["preview"]:
-                print(f"      Preview:")
-                for line in analysis["preview"].split("\n"):
-                    print(f"         {line}")
+    def display_analysis(self, keys):
+        """Display analysis of found keys
 
-            if analysis["is_credential"]:
-                credential_keys.append(key)
-            else:
-                non_credential_keys.append(key)
+        Returns the credential keys and the unclear keys as (table, key)
+        lists.
+        """
+        records = self.analyze_keys(keys)
+        self.renderer.analysis(self.db_path, records)
 
+        credential_keys = [
+            (record["table"], record["key"]) for record in records if record["is_credential"]
+        ]
+        non_credential_keys = [
+            (record["table"], record["key"])
+            for record in records
+            if not record["is_credential"]
+        ]
         return credential_keys, non_credential_keys
 
-    def remove_safe_keys(self, keys_to_remove, confirm=True):
-        """Remove only keys that have been verified as safe"""
+    def remove_safe_keys(self, keys_to_remove, confirm=True, include_history=True):
+        """Remove only keys that have been verified as safe
+
+        Key deletion and the Blackbox history cleanup are applied together in
+        a single transaction. Returns the result of apply_removal(), or None
+        if the removal was cancelled.
+        """
         if not keys_to_remove:
             print("[INFO] No credential keys to remove")
-            return True
-
-        if confirm:
+        elif confirm:
             print(
                 f"\n[SAFE REMOVAL] Will remove {len(keys_to_remove)} CREDENTIAL keys:"
             )
-            for key in keys_to_remove:
-                print(f"   ✅ {key}")
+            for table, key in keys_to_remove:
+                print(f"   ✅ {format_key(table, key)}")
 
             response = input(
                 "\nAre you sure you want to remove ONLY these credentials? (yes/no): "
             ).lower()
             if response not in ["yes", "y"]:
                 print("[CANCELLED] Removal cancelled")
-                return False
+                return None
 
-        cursor = self.conn.cursor()
-        removed_count = 0
+        history_plan = None
+        if include_history:
+            history_plan = self.find_blackbox_history()
+            if history_plan and confirm and not self.confirm_history_cleanup(history_plan):
+                history_plan = None
+
+        if self.atomic:
+            result = self.apply_removal_atomic(keys_to_remove, history_plan)
+        else:
+            result = self.apply_removal(keys_to_remove, history_plan)
+        self.renderer.removal(self.db_path, result)
+        return result
+
+    def new_removal_result(self):
+        """Return the empty result dict of apply_removal()"""
+        return {
+            "removed": [],
+            "not_found": [],
+            "history_removed": [],
+            "history_error": None,
+            "journal_path": None,
+            "deleted_count": 0,
+            "lock_seconds": 0.0,
+            "swap_seconds": None,
+            "stale": [],
+            "error": None,
+        }
+
+    def apply_removal(self, keys_to_remove, history_plan=None, expected=None):
+        """Delete keys and rewrite history in one BEGIN IMMEDIATE transaction
+
+        Runs on its own short-lived write connection, so the write lock is
+        only held for the batched delete. keys_to_remove holds (table, key)
+        pairs. With expected (see apply_changes()) nothing is changed unless
+        every value still matches its digest. Returns a dict with the per-key
+        outcome and the time the write lock was held.
+        """
+        result = self.new_removal_result()
+        conn = None
+        locked_at = None
 
-        for key in keys_to_remove:
+        try:
+            conn = self.open_write_connection()
+            self.begin_immediate(conn)
+            locked_at = time.perf_counter()
+            self.apply_changes(conn, keys_to_remove, history_plan, result, expected)
+            conn.commit()
+        except (sqlite3.Error, OSError) as e:
+            if conn:
+                conn.rollback()
+            self.discard_journal(result["journal_path"])
+            result["journal_path"] = None
+            result["removed"] = []
+            result["not_found"] = []
+            result["deleted_count"] = 0
+            result["error"] = str(e)
+        finally:
+            if locked_at is not None:
+                result["lock_seconds"] = time.perf_counter() - locked_at
+            if conn:
+                conn.close()
+
+        return result
+
+    def apply_changes(self, conn, keys_to_remove, history_plan, result, expected=None):
+        """Journal, delete the keys and rewrite history inside a transaction
+
+        The key deletes run under a savepoint; if they fail the caller rolls
+        back the whole transaction. The history rewrite runs under its own
+        savepoint, so a failure there only undoes the history change. Fills
+        in result (see new_removal_result) and leaves committing to the
+        caller.
+
+        expected maps (table, key) to the SHA-256 of the value a change plan
+        was computed from. If any key is missing or changed, or the history
+        changed, nothing is written and result["stale"] lists the values.
+        """
+        cursor = conn.cursor()
+        tables = {}
+        for table, key in keys_to_remove:
+            tables.setdefault(table, []).append(key)
+
+        # Save the rows about to change before touching anything
+        deleted_rows = []
+        for table, table_keys in tables.items():
+            cursor.execute(
+                f"SELECT key, value FROM {quote_identifier(table)} "
+                "WHERE key IN (SELECT value FROM json_each(?))",
+                (json.dumps(table_keys),),
+            )
+            deleted_rows.extend((table, key, value) for key, value in cursor)
+        existing = {(table, key) for table, key, _ in deleted_rows}
+
+        if expected is not None:
+            current = {
+                (table, key): value_digest(value) for table, key, value in deleted_rows
+            }
+            result["stale"] = [
+                format_key(table, key)
+                for (table, key), digest in expected.items()
+                if current.get((table, key)) != digest
+            ]
+
+        # The history was analyzed on the read-only connection; skip it
+        # if the editor has written a newer value since then
+        updated_rows = []
+        if history_plan:
+            updates = {update["key"]: update for update in history_plan["updates"]}
+            cursor.execute(
+                "SELECT key, value FROM ItemTable "
+                "WHERE key IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(updates)),),
+            )
+            for key, value in cursor:
+                if value_digest(value) == updates[key]["before_sha256"]:
+                    updated_rows.append((key, value, updates[key]["value"]))
+            if len(updated_rows) != len(updates):
+                if expected is not None:
+                    result["stale"].extend(updates)
+                result["history_error"] = "history changed since analysis, skipped"
+                updated_rows = []
+                history_plan = None
+
+        if result["stale"]:
+            result["error"] = "plan is stale, these values changed since it was written"
+            return
+
+        if deleted_rows or updated_rows:
+            result["journal_path"] = self.write_journal(deleted_rows, updated_rows)
+
+        cursor.execute("SAVEPOINT remove_keys")
+        for table, table_keys in tables.items():
+            cursor.execute(
+                f"DELETE FROM {quote_identifier(table)} "
+                "WHERE key IN (SELECT value FROM json_each(?))",
+                (json.dumps(table_keys),),
+            )
+            result["deleted_count"] += cursor.rowcount
+        cursor.execute("RELEASE remove_keys")
+
+        for table_key in keys_to_remove:
+            if tuple(table_key) in existing:
+                result["removed"].append(table_key)
+            else:
+                result["not_found"].append(table_key)
+
+        if history_plan:
+            cursor.execute("SAVEPOINT clean_history")
             try:
-                cursor.execute("DELETE FROM ItemTable WHERE key = ?", (key,))
-                if cursor.rowcount > 0:
-                    removed_count += 1
-                    print(f"[REMOVED] ✅ {key}")
-                else:
-                    print(f"[NOT_FOUND] ❌ {key} (already doesn't exist)")
-            except Exception as e:
-                print(f"[ERROR] ❌ Failed to remove {key}: {e}")
+                cursor.executemany(
+                    "UPDATE ItemTable SET value = ? WHERE key = ?",
+                    [
+                        (update["value"], update["key"])
+                        for update in history_plan["updates"]
+                    ],
+                )
+                cursor.execute("RELEASE clean_history")
+                result["history_removed"] = history_plan["removed_entries"]
+            except sqlite3.Error as e:
+                cursor.execute("ROLLBACK TO clean_history")
+                cursor.execute("RELEASE clean_history")
+                result["history_error"] = str(e)
+
+    def apply_removal_atomic(self, keys_to_remove, history_plan=None, expected=None):
+        """Apply the removal to a clone and rename it over the database
+
+        The database is cloned with the backup API into a temp file next to
+        it, the changes are applied and committed there, the clone is
+        checked with PRAGMA quick_check and fsynced. Only then is the write
+        lock taken on the original. If PRAGMA data_version shows that
+        nobody committed since the clone was taken, the clone is renamed
+        over the original and the directory is fsynced. Otherwise the clone
+        is prepared again (up to ATOMIC_ATTEMPTS times). The original is
+        never modified, so a crash leaves either the old or the new file.
+        The swap window (write lock to rename) does not depend on the
+        database size and is returned as swap_seconds.
+
+        A rename replaces the file under any process that still has it
+        open; their later writes would go to the old file. So this mode is
+        refused while another process has the database open, and in WAL
+        mode, where the -wal file belongs to the old file.
+        """
+        result = self.new_removal_result()
+        db_path = os.path.abspath(self.db_path)
+        directory = os.path.dirname(db_path)
+        conn = None
+        clone_path = None
 
-        # Commit changes
-        self.conn.commit()
-        print(
-            f"\n[SUCCESS] Successfully removed {removed_count} credential keys from database"
-        )
-        return True
+        try:
+            holders = processes_with_open_file(db_path)
+            if holders:
+                raise RuntimeError(
+                    "database is open in other processes "
+                    f"(PID {', '.join(map(str, holders))}), close the editor first"
+                )
 
-    def cleanup_blackbox_history(self):
-        """Clean up ONLY history entries related to Blackbox"""
+            conn = self.open_write_connection()
+            if conn.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal":
+                raise RuntimeError("atomic apply needs a rollback journal, not WAL")
+
+            for attempt in range(ATOMIC_ATTEMPTS):
+                version = conn.execute("PRAGMA data_version").fetchone()[0]
+
+                fd, clone_path = tempfile.mkstemp(
+                    prefix=".atomic-", suffix=".vscdb", dir=directory
+                )
+                os.close(fd)
+                clone = sqlite3.connect(clone_path)
+                try:
+                    conn.backup(clone)
+                    clone.execute("BEGIN IMMEDIATE")
+                    result = self.new_removal_result()
+                    self.apply_changes(
+                        clone, keys_to_remove, history_plan, result, expected
+                    )
+                    if result["error"]:
+                        return result
+                    clone.commit()
+                    check = clone.execute("PRAGMA quick_check").fetchone()[0]
+                    if check != "ok":
+                        raise sqlite3.DatabaseError(f"quick_check failed: {check}")
+                finally:
+                    clone.close()
+                # The clone belongs to whoever runs this (e.g. root cleaning a
+                # user's profile); the editor must still own the swapped file
+                owner = os.stat(db_path)
+                clone_stat = os.stat(clone_path)
+                if (clone_stat.st_uid, clone_stat.st_gid) != (owner.st_uid, owner.st_gid):
+                    try:
+                        os.chown(clone_path, owner.st_uid, owner.st_gid)
+                    except PermissionError:
+                        print("[WARNING] Cannot keep the database owner, removing in place")
+                        self.discard_journal(result["journal_path"])
+                        return self.apply_removal(keys_to_remove, history_plan, expected)
+                shutil.copymode(db_path, clone_path)
+                with open(clone_path, "rb+") as f:
+                    os.fsync(f.fileno())
+
+                # Swap window: writers are blocked from here until the rename
+                self.begin_immediate(conn)
+                locked_at = time.perf_counter()
+                if conn.execute("PRAGMA data_version").fetchone()[0] == version:
+                    os.replace(clone_path, db_path)
+                    clone_path = None
+                    fsync_directory(directory)
+                    result["swap_seconds"] = time.perf_counter() - locked_at
+                    result["lock_seconds"] = result["swap_seconds"]
+                    conn.rollback()
+                    if self.conn:
+                        # The analysis connection still reads the old file
+                        self.conn.close()
+                        self.conn = connect_read_only(self.db_path, self.busy_timeout)
+                        self.register_functions()
+                    return result
+
+                # Someone committed after the clone was taken: start again
+                conn.rollback()
+                self.discard_journal(result["journal_path"])
+                os.remove(clone_path)
+                clone_path = None
+
+            raise RuntimeError(
+                f"database kept changing, gave up after {ATOMIC_ATTEMPTS} attempts"
+            )
+        except (sqlite3.Error, OSError, RuntimeError) as e:
+            if conn and conn.in_transaction:
+                conn.rollback()
+            self.discard_journal(result["journal_path"])
+            result = self.new_removal_result()
+            result["error"] = str(e)
+            return result
+        finally:
+            if conn:
+                conn.close()
+            if clone_path and os.path.exists(clone_path):
+                os.remove(clone_path)
+
+    def discard_journal(self, journal_path):
+        """Delete the undo journal of changes that were never applied"""
+        if journal_path and os.path.exists(journal_path):
+            os.remove(journal_path)
+        if self.journal_path == journal_path:
+            self.journal_path = None
+
+    def write_journal(self, deleted_rows, updated_rows):
+        """Write the undo journal for a removal and return its path
+
+        The journal holds the deleted rows with their table and the
+        pre-image of updated values (the history list in ItemTable), so undo
+        costs only the few rows that change. It is written and fsynced
+        inside the transaction, before any row is modified.
+        """
+        journal = {
+            "database": os.path.abspath(self.db_path),
+            "created_at": datetime.now().isoformat(),
+            "deleted": [
+                dict(table=table, key=key, **encode_value(value))
+                for table, key, value in deleted_rows
+            ],
+            "updated": [
+                dict(
+                    table="ItemTable",
+                    key=key,
+                    after_sha256=value_digest(new_value),
+                    **encode_value(value),
+                )
+                for key, value, new_value in updated_rows
+            ],
+        }
+        self.journal_path = self.backup_store.save_journal(journal)
+        self.backup_store.prune(self.db_path, self.keep_backups, self.keep_days)
+        return self.journal_path
+
+    def apply_journal(self, journal):
+        """Replay an undo journal in a single transaction
+
+        Deleted rows are inserted back and updated rows get their previous
+        value. If an updated row has been changed again since the journal
+        was written, nothing is replayed and the key is reported as conflict.
+        Entries without a table (older journals) belong to ItemTable.
+        """
+        result = {"restored": [], "conflicts": [], "error": None}
+        conn = None
+
+        try:
+            conn = self.open_write_connection()
+            cursor = conn.cursor()
+            self.begin_immediate(conn)
+
+            for entry in journal["updated"]:
+                table = quote_identifier(entry.get("table", "ItemTable"))
+                cursor.execute(
+                    f"SELECT value FROM {table} WHERE key = ?", (entry["key"],)
+                )
+                row = cursor.fetchone()
+                current = value_digest(row[0]) if row else None
+                if current not in (entry["after_sha256"], value_digest(decode_value(entry))):
+                    result["conflicts"].append(entry["key"])
+
+            if result["conflicts"]:
+                conn.rollback()
+                return result
+
+            entries = journal["deleted"] + journal["updated"]
+            tables = {}
+            for entry in entries:
+                tables.setdefault(entry.get("table", "ItemTable"), []).append(entry)
+            for table, table_entries in tables.items():
+                cursor.executemany(
+                    f"INSERT OR REPLACE INTO {quote_identifier(table)} (key, value) "
+                    "VALUES (?, ?)",
+                    [(entry["key"], decode_value(entry)) for entry in table_entries],
+                )
+            conn.commit()
+            result["restored"] = [entry["key"] for entry in entries]
+        except sqlite3.Error as e:
+            if conn:
+                conn.rollback()
+            result["error"] = str(e)
+        finally:
+            if conn:
+                conn.close()
+
+        return result
+
+    def value_digests(self, keys):
+        """SHA-256 of the whole value of many (table, key) pairs
+
+        Only used for the credential keys of a change plan, so reading the
+        full values is cheap. One query per table.
+        """
         cursor = self.conn.cursor()
+        tables = {}
+        for table, key in keys:
+            tables.setdefault(table, []).append(key)
+
+        digests = {}
+        for table, table_keys in tables.items():
+            cursor.execute(
+                f"SELECT key, value FROM {quote_identifier(table)} "
+                "WHERE key IN (SELECT value FROM json_each(?))",
+                (json.dumps(table_keys),),
+            )
+            for key, value in cursor:
+                digests[(table, key)] = value_digest(value)
+        return digests
+
+    def build_plan(self, credential_keys, unclear_keys, history_plan):
+        """Describe a removal as a change plan for apply_plan()
+
+        Each key carries the SHA-256 of the value it was analyzed with and
+        each history update the digest of the value it replaces, so a plan
+        computed from an older state of the database is refused.
+        """
+        digests = self.value_digests(credential_keys)
+        return {
+            "database": os.path.abspath(self.db_path),
+            "created_at": datetime.now().isoformat(),
+            "keys": [
+                {"table": table, "key": key, "sha256": digests[(table, key)]}
+                for table, key in credential_keys
+                if (table, key) in digests
+            ],
+            "unclear": [format_key(table, key) for table, key in unclear_keys],
+            "history": history_plan["updates"] if history_plan else [],
+            "history_removed": history_plan["removed_entries"] if history_plan else [],
+        }
+
+    def apply_plan(self, plan):
+        """Apply a change plan in one transaction, without prompting
+
+        Refused as a whole (result["stale"]) when any value differs from
+        the one the plan was computed from. Returns the apply_removal()
+        result.
+        """
+        keys = [(entry["table"], entry["key"]) for entry in plan["keys"]]
+        expected = {(entry["table"], entry["key"]): entry["sha256"] for entry in plan["keys"]}
+        history_plan = None
+        if plan["history"]:
+            history_plan = {
+                "updates": plan["history"],
+                "removed_entries": plan["history_removed"],
+            }
+
+        if self.atomic:
+            return self.apply_removal_atomic(keys, history_plan, expected)
+        return self.apply_removal(keys, history_plan, expected)
+
+    def find_blackbox_history(self):
+        """Find history entries related to Blackbox without changing anything
+
+        All HISTORY_KEYS are read with one query and filtered one value at a
+        time. Returns a plan dict with the rewritten values ("updates": key,
+        value and digest of the value it replaces) and the removed entries,
+        or None when there is nothing to clean up.
+        """
+        if "ItemTable" not in self.tables:
+            print("[INFO] No history to clean up")
+            return None
 
-        # Get history.recentlyOpenedPathsList
+        cursor = self.conn.cursor()
         cursor.execute(
-            "SELECT value FROM ItemTable WHERE key = ?",
-            ("history.recentlyOpenedPathsList",),
+            "SELECT key, value FROM ItemTable "
+            "WHERE key IN (SELECT value FROM json_each(?))",
+            (json.dumps(HISTORY_KEYS),),
         )
-        result = cursor.fetchone()
+        return self.plan_history_cleanup(cursor)
+
+    def plan_history_cleanup(self, rows):
+        """Filter the Blackbox entries out of (key, value) history rows
 
-        if not result:
+        Returns the plan dict described in find_blackbox_history(), or None.
+        """
+        updates = []
+        removed_entries = []
+        found = False
+
+        for key, value in rows:
+            found = True
+            try:
+                pieces, removed = filter_history_pieces(
+                    value, self.rules.history_patterns
+                )
+            except (ValueError, UnicodeDecodeError) as e:
+                print(f"[ERROR] Failed to read history {key}: {e}")
+                continue
+            if removed:
+                before_sha256 = value_digest(value)
+                # Let go of the original value before the kept pieces are
+                # joined, so it is not in memory next to two copies
+                del value
+                updates.append(
+                    {
+                        "key": key,
+                        "value": "".join(pieces),
+                        "before_sha256": before_sha256,
+                    }
+                )
+                del pieces
+                removed_entries.extend(removed)
+
+        if not found:
             print("[INFO] No history to clean up")
-            return
+            return None
+        if not updates:
+            print("[INFO] No Blackbox entries in history")
+            return None
 
-        try:
-            history_data = json.loads(result[0])
-            original_count = len(history_data.get("entries", []))
-
-            # Filter entries related to blackbox (path/folder)
-            filtered_entries = []
-            removed_entries = []
-
-            for entry in history_data.get("entries", []):
-                folder_uri = entry.get("folderUri", "").lower()
-                if any(
-                    pattern in folder_uri
-                    for pattern in ["blackbox", "blackboxai", "blackboxapp"]
-                ):
-                    removed_entries.append(entry.get("folderUri", ""))
-                else:
-                    filtered_entries.append(entry)
+        return {"updates": updates, "removed_entries": removed_entries}
 
-            removed_count = len(removed_entries)
+    def confirm_history_cleanup(self, history_plan):
+        """Show Blackbox history entries and ask whether to remove them"""
+        removed_count = len(history_plan["removed_entries"])
 
-            if removed_count > 0:
-                history_data["entries"] = filtered_entries
-                new_value = json.dumps(history_data)
+        print(f"\n[HISTORY CLEANUP] Found {removed_count} Blackbox entries in history:")
+        for entry in history_plan["removed_entries"]:
+            print(f"   - {entry}")
 
-                print(
-                    f"\n[HISTORY CLEANUP] Found {removed_count} Blackbox entries in history:"
-                )
-                for entry in removed_entries:
-                    print(f"   - {entry}")
-
-                response = input(
-                    f"\nDo you want to remove {removed_count} entries from history? (yes/no): "
-                ).lower()
-                if response in ["yes", "y"]:
-                    cursor.execute(
-                        "UPDATE ItemTable SET value = ? WHERE key = ?",
-                        (new_value, "history.recentlyOpenedPathsList"),
-                    )
-                    self.conn.commit()
-                    print(
-                        f"[CLEANED] ✅ Successfully cleaned {removed_count} entries from history"
-                    )
-                else:
-                    print("[SKIPPED] History cleanup cancelled")
-            else:
-                print("[INFO] No Blackbox entries in history")
+        response = input(
+            f"\nDo you want to remove {removed_count} entries from history? (yes/no): "
+        ).lower()
+        if response in ["yes", "y"]:
+            return True
 
-        except Exception as e:
-            print(f"[ERROR] Failed to clean history: {e}")
+        print("[SKIPPED] History cleanup cancelled")
+        return False
 
-    def verify_removal(self):
-        """Verify that only credentials were removed"""
+    def cleanup_blackbox_history(self):
+        """Clean up ONLY history entries related to Blackbox
+
+        Returns the apply_removal() result, or None when there was nothing
+        to clean or the cleanup was cancelled.
+        """
+        history_plan = self.find_blackbox_history()
+        if not history_plan or not self.confirm_history_cleanup(history_plan):
+            return None
+
+        result = self.apply_removal([], history_plan)
+        self.renderer.history(self.db_path, result)
+        return result
+
+    def verify_removal(self, removal=None, deep=False):
+        """Verify that only credentials were removed
+
+        With the result of apply_removal() the check is targeted: the
+        DELETE rowcount must match the rows seen inside the transaction and
+        an indexed lookup must find none of the removed keys. Without it, or
+        with deep=True, all keys are scanned again.
+        """
         print("\n[VERIFY] Verifying credential removal...")
 
-        remaining_keys = self.find_safe_blackbox_keys()
+        if removal is None or deep:
+            remaining_keys = self.find_safe_blackbox_keys()
+        else:
+            if removal["deleted_count"] != len(removal["removed"]):
+                print(
+                    f"[WARNING] Deleted {removal['deleted_count']} rows, "
+                    f"expected {len(removal['removed'])}"
+                )
+                return False
+            tables = {}
+            for table, key in removal["removed"] + removal["not_found"]:
+                tables.setdefault(table, []).append(key)
+            cursor = self.conn.cursor()
+            remaining_keys = []
+            for table, table_keys in tables.items():
+                cursor.execute(
+                    f"SELECT key FROM {quote_identifier(table)} "
+                    "WHERE key IN (SELECT value FROM json_each(?))",
+                    (json.dumps(table_keys),),
+                )
+                remaining_keys.extend((table, row[0]) for row in cursor)
+            remaining_keys.sort()
 
         if remaining_keys:
             print(f"[WARNING] Still have {len(remaining_keys)} Blackbox keys:")
-            for key in remaining_keys:
-                print(f"   - {key}")
+            for table, key in remaining_keys:
+                print(f"   - {format_key(table, key)}")
             return False
         else:
             print("[SUCCESS] ✅ All Blackbox credentials successfully removed!")
             print("[INFO] General Cursor data remains safe and untouched")
             return True
 
+    def compact_database(self):
+        """Give the pages freed by the removal back to the file system
+
+        Uses incremental vacuum when the database has auto_vacuum set to
+        INCREMENTAL. Otherwise it runs an in-place VACUUM, which rebuilds
+        the file inside one exclusive transaction: writes by an open editor
+        wait for the busy timeout instead of being lost, and readers keep a
+        valid file. Returns a dict with the method used, bytes reclaimed and
+        time taken.
+        """
+        result = {
+            "method": None,
+            "freelist_pages": 0,
+            "bytes_before": database_size(self.db_path),
+            "bytes_after": None,
+            "reclaimed_bytes": 0,
+            "seconds": 0.0,
+            "error": None,
+        }
+        started = time.perf_counter()
+        conn = None
+
+        print("\n[COMPACT] Reclaiming free space...")
+        try:
+            conn = self.open_write_connection()
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            result["freelist_pages"] = freelist
+            print(
+                f"[COMPACT] {freelist:,} free pages ({freelist * page_size:,} bytes)"
+            )
+
+            if freelist == 0:
+                result["method"] = "none"
+            elif auto_vacuum == 2:
+                result["method"] = "incremental_vacuum"
+                # execute() steps the pragma once (one page); run it as a script
+                conn.executescript("PRAGMA incremental_vacuum")
+            else:
+                result["method"] = "vacuum"
+                conn.execute("VACUUM")
+
+            if self.journal_mode == "wal":
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        except (sqlite3.Error, OSError) as e:
+            result["error"] = str(e)
+        finally:
+            if conn:
+                conn.close()
+
+        result["seconds"] = time.perf_counter() - started
+        result["bytes_after"] = database_size(self.db_path)
+        result["reclaimed_bytes"] = result["bytes_before"] - result["bytes_after"]
+
+        if result["error"]:
+            print(f"[ERROR] Compaction failed: {result['error']}")
+        else:
+            print(
+                f"[COMPACT] {result['method']}: {result['bytes_before']:,} -> "
+                f"{result['bytes_after']:,} bytes "
+                f"({result['reclaimed_bytes']:,} reclaimed in {result['seconds']:.2f}s)"
+            )
+        return result
+
+
+# Times an atomic apply re-clones the database when it changed meanwhile
+ATOMIC_ATTEMPTS = 3
+
+# ItemTable keys holding recently opened lists, checked in one query
+HISTORY_KEYS = ["history.recentlyOpenedPathsList", "history.entries"]
+
+# Entry fields that hold the URI or path of a history entry
+HISTORY_URI_FIELDS = {"folderUri", "fileUri", "configPath", "resource"}
+
+# Built-in rules: the Blackbox keys this script has always removed
+DEFAULT_RULES = {
+    "tools": [
+        {
+            "name": "Blackbox",
+            "keys": [
+                {"exact": "Blackboxapp.blackboxagent"},
+                {
+                    "exact": "workbench.view.extension.blackboxai-dev-ActivityBar.state.hidden"
+                },
+                {"contains": "blackboxapp.blackboxagent"},
+                {"contains": "blackboxai-dev."},
+                {"contains": "workbench.view.extension.blackboxai-dev"},
+            ],
+            "credentials": [
+                {
+                    "exact": "Blackboxapp.blackboxagent",
+                    "reason": "Main Blackbox credentials",
+                },
+                {"glob": "*blackboxai-dev*", "reason": "Blackbox Extension UI"},
+                {
+                    "json_fields": ["userId", "blackbox_userId", "apiProvider"],
+                    "reason": "Contains credential data",
+                },
+            ],
+            "preview_fields": ["userId", "blackbox_userId", "apiProvider", "installed"],
+            "history": ["blackbox", "blackboxai", "blackboxapp"],
+        }
+    ]
+}
+
+
+class CredentialRules:
+    """Credential rules of one or more tools, compiled into single matchers
+
+    Each tool has "keys" rules that select candidate keys, "credentials"
+    rules that confirm a key holds credentials, optional "preview_fields"
+    and "history" path patterns. A key rule is one of:
+
+        {"exact": "Key.name"}        exact key, case-sensitive
+        {"prefix": "key.prefix"}     start of the key, case-insensitive
+        {"contains": "key.part"}     text anywhere in the key, case-insensitive
+        {"glob": "*.key.*"}          fnmatch pattern, case-insensitive
+        {"regex": "pattern"}         regular expression searched in the key
+
+    Credential rules use the same forms plus {"json_fields": [...]}, which
+    matches JSON object values that contain any of the (dotted) fields.
+    Every credential rule may carry a "reason" shown in the analysis.
+    """
+
+    KEY_KINDS = ("exact", "prefix", "contains", "glob", "regex")
+
+    def __init__(self, config):
+        tools = config.get("tools") if isinstance(config, dict) else None
+        if not tools:
+            raise ValueError("rules need a non-empty 'tools' list")
+
+        self.tools = tools
+        self.exact_keys = []
+        self.prefixes = []
+        self.contains = []
+        self.needs_scan = False
+        self.history_patterns = []
+        self.key_rules = []
+        self.credential_rules = []
+        self.json_rules = []
+
+        key_parts = []
+        credential_parts = []
+        tool_credential_parts = {}
+        for tool in tools:
+            name = tool.get("name")
+            if not name:
+                raise ValueError("every tool needs a 'name'")
+
+            for rule in tool.get("keys", []):
+                kind, pattern = self.rule_kind(rule)
+                key_parts.append(self.compile_rule(kind, pattern, len(key_parts)))
+                self.key_rules.append(name)
+                self.add_lookup(kind, pattern)
+
+            for rule in tool.get("credentials", []):
+                reason = rule.get("reason", f"{name} credentials")
+                if "json_fields" in rule:
+                    self.json_rules.append((name, rule["json_fields"], reason))
+                    continue
+                kind, pattern = self.rule_kind(rule)
+                part = self.compile_rule(kind, pattern, len(credential_parts))
+                credential_parts.append(part)
+                tool_credential_parts.setdefault(name, []).append(part)
+                self.credential_rules.append((name, reason))
+
+            self.history_patterns.extend(p.lower() for p in tool.get("history", []))
+
+        # One alternation per rule set; the named group tells which rule hit
+        self.key_matcher = re.compile("|".join(key_parts) or "(?!)")
+        self.credential_matcher = re.compile("|".join(credential_parts) or "(?!)")
+        # Also per tool, so the rules of the key's own tool can be tried first
+        self.tool_credential_matchers = {
+            name: re.compile("|".join(parts))
+            for name, parts in tool_credential_parts.items()
+        }
+
+    def rule_kind(self, rule):
+        """Return (kind, pattern) of a key rule"""
+        kinds = [kind for kind in self.KEY_KINDS if kind in rule]
+        if len(kinds) != 1:
+            raise ValueError(
+                f"rule {rule} needs exactly one of: {', '.join(self.KEY_KINDS)}"
+            )
+        return kinds[0], rule[kinds[0]]
+
+    def compile_rule(self, kind, pattern, index):
+        """Compile one rule into a named alternative anchored at the key start"""
+        if kind == "exact":
+            source = re.escape(pattern) + r"\Z"
+        elif kind == "prefix":
+            source = f"(?i:{re.escape(pattern)})"
+        elif kind == "contains":
+            source = f"(?i:(?s:.*?){re.escape(pattern)})"
+        elif kind == "glob":
+            source = f"(?i:{fnmatch.translate(pattern)})"
+        else:
+            re.compile(pattern)
+            source = f"(?s:.*?)(?:{pattern})"
+        return f"(?P<r{index}>{source})"
+
+    def add_lookup(self, kind, pattern):
+        """Record how SQLite can find the keys of a rule using the key index"""
+        if kind == "exact":
+            self.exact_keys.append(pattern)
+            return
+        if kind == "glob":
+            pattern = re.split(r"[*?\[]", pattern, 1)[0]
+        lookups = self.contains if kind == "contains" else self.prefixes
+        # LIKE folds ASCII letters only, other text needs the matcher
+        if kind == "regex" or not pattern or not pattern.isascii():
+            self.needs_scan = True
+        elif pattern.lower() not in lookups:
+            lookups.append(pattern.lower())
+
+    def match_tool(self, key):
+        """Return the tool whose key rules select key, or None"""
+        match = self.key_matcher.match(key)
+        return self.key_rules[int(match.lastgroup[1:])] if match else None
+
+    def match_credential_key(self, key, tool=None):
+        """Return (tool, reason) of the credential rule matching key, or None
+
+        Rules of the given tool are tried first, then those of other tools.
+        """
+        matcher = self.tool_credential_matchers.get(tool)
+        match = matcher.match(key) if matcher else None
+        match = match or self.credential_matcher.match(key)
+        return self.credential_rules[int(match.lastgroup[1:])] if match else None
+
+    def match_json_fields(self, data, tool=None):
+        """Return (tool, reason) of the json_fields rule matching data, or None
+
+        Rules of the given tool are tried first, then those of other tools.
+        """
+        if not isinstance(data, dict):
+            return None
+        rules = sorted(self.json_rules, key=lambda rule: rule[0] != tool)
+        for name, fields, reason in rules:
+            if any(json_field_exists(data, field) for field in fields):
+                return name, reason
+        return None
+
+    def preview_fields(self, tool):
+        """Return the fields shown in the analysis preview of a tool"""
+        for entry in self.tools:
+            if entry["name"] == tool:
+                return entry.get("preview_fields", [])
+        return []
+
+
+def quote_identifier(name):
+    """Quote a table name for use in SQL"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def like_escape(text):
+    """Escape the LIKE wildcards in text (ESCAPE '\\')"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def qualified_name(schema, table):
+    """Quote a schema-qualified table name for use in SQL"""
+    return f"{quote_identifier(schema)}.{quote_identifier(table)}"
+
+
+def format_key(table, key):
+    """Show a key with its table; ItemTable keys are shown as before"""
+    return key if table == "ItemTable" else f"[{table}] {key}"
+
+
+def sniff_json_object(text):
+    """Decode the leading members of a JSON object that may be cut off
+
+    Members are decoded one at a time; the member cut off by the size
+    limit and everything after it are ignored. Returns the members found,
+    or None when the text is not a JSON object.
+    """
+    decoder = json.JSONDecoder()
+    whitespace = re.compile(r"\s*")
+    pos = whitespace.match(text).end()
+    if not text.startswith("{", pos):
+        return None
+
+    data = {}
+    pos += 1
+    while True:
+        pos = whitespace.match(text, pos).end()
+        try:
+            name, pos = decoder.raw_decode(text, pos)
+            pos = whitespace.match(text, pos).end()
+            if not text.startswith(":", pos):
+                return data
+            pos = whitespace.match(text, pos + 1).end()
+            value, pos = decoder.raw_decode(text, pos)
+        except ValueError:
+            return data
+        if isinstance(name, str):
+            data[name] = value
+        pos = whitespace.match(text, pos).end()
+        if not text.startswith(",", pos):
+            return data
+        pos += 1
+
+
+def json_field_exists(data, path):
+    """Check whether a dotted field path exists in nested JSON objects"""
+    for part in path.split("."):
+        if not isinstance(data, dict) or part not in data:
+            return False
+        data = data[part]
+    return True
+
+
+def history_entry_uris(entry):
+    """Collect the URIs and paths of one history entry
+
+    Covers folders, files and workspaces (workspace.configPath), nested
+    editor entries and plain string entries of older lists.
+    """
+    if isinstance(entry, str):
+        return [entry]
+    uris = []
+    if isinstance(entry, dict):
+        for name, value in entry.items():
+            if name in HISTORY_URI_FIELDS and isinstance(value, str):
+                uris.append(value)
+            elif isinstance(value, (dict, list)):
+                uris.extend(history_entry_uris(value))
+    elif isinstance(entry, list):
+        for item in entry:
+            if isinstance(item, (dict, list)):
+                uris.extend(history_entry_uris(item))
+    return uris
+
+
+def filter_history_value(text, patterns):
+    """Drop the history entries whose URIs contain one of the patterns
+
+    Returns the new value and the first URI of every removed entry, or
+    (None, []) when nothing matched; see filter_history_pieces(). The
+    caller still holds text while the new value is joined, so callers
+    that own large values should use filter_history_pieces() and drop
+    the original first.
+    """
+    pieces, removed = filter_history_pieces(text, patterns)
+    if not removed:
+        return None, []
+    return "".join(pieces), removed
+
+
+def filter_history_pieces(text, patterns):
+    """Drop the history entries whose URIs contain one of the patterns
+
+    The value is either an object with an "entries" array or a bare
+    array. The array is walked one entry at a time and only the current
+    entry is decoded. Kept entries are copied as runs of the original
+    text, so the rest of the value stays byte for byte unchanged. Entries
+    are only inspected where a case-insensitive search found a pattern,
+    and the walk stops after the last match. Returns the new value as a
+    list of pieces to join and the first URI of every removed entry, or
+    (None, []) when nothing matched. The pieces do not refer to text.
+    Raises ValueError for a value that is not a history list.
+    """
+    if isinstance(text, bytes):
+        text = text.decode("utf-8")
+    if not patterns:
+        return None, []
+
+    # Without escapes the raw text matches exactly where the decoded
+    # strings do; with escapes every entry has to be decoded
+    if "\\" in text:
+        hits = None
+    else:
+        search = re.compile("|".join(map(re.escape, patterns)), re.IGNORECASE)
+        hits = [match.start() for match in search.finditer(text)]
+        if not hits:
+            return None, []
+
+    decoder = json.JSONDecoder()
+    whitespace = re.compile(r"\s*")
+    pos = whitespace.match(text).end()
+
+    # Find the start of the entries array
+    if text.startswith("{", pos):
+        pos = whitespace.match(text, pos + 1).end()
+        while not text.startswith("}", pos):
+            name, pos = decoder.raw_decode(text, pos)
+            pos = whitespace.match(text, pos).end()
+            if not text.startswith(":", pos):
+                raise ValueError(f"expected ':' at offset {pos}")
+            pos = whitespace.match(text, pos + 1).end()
+            if name == "entries":
+                break
+            _, pos = decoder.raw_decode(text, pos)
+            pos = whitespace.match(text, pos).end()
+            if text.startswith(",", pos):
+                pos = whitespace.match(text, pos + 1).end()
+        else:
+            return None, []
+    if not text.startswith("[", pos):
+        raise ValueError(f"expected an entries array at offset {pos}")
+
+    # A removed entry is cut together with the separator in front of
+    # it, or behind it while nothing before it is kept, so the
+    # whitespace of the kept entries and of the array stays as it is
+    array_start = pos
+    pieces = []
+    keep_from = 0
+    kept_end = None
+    cut_to_next = False
+    removed = []
+    next_hit = 0
+    pos = whitespace.match(text, pos + 1).end()
+    while not text.startswith("]", pos):
+        if hits is not None:
+            while next_hit < len(hits) and hits[next_hit] < pos:
+                next_hit += 1
+            if next_hit == len(hits):
+                # No match past this point: keep everything that follows
+                break
+
+        start = pos
+        entry, pos = decoder.raw_decode(text, pos)
+        uris = []
+        if hits is None or hits[next_hit] < pos:
+            uris = history_entry_uris(entry)
+        if any(pattern in uri.lower() for uri in uris for pattern in patterns):
+            removed.append(uris[0])
+            if kept_end is None:
+                # Nothing kept yet: cut up to the next entry
+                if not cut_to_next:
+                    pieces.append(text[keep_from:start])
+                    cut_to_next = True
+            elif keep_from <= kept_end:
+                pieces.append(text[keep_from:kept_end])
+            keep_from = pos
+        else:
+            if cut_to_next:
+                keep_from = start
+                cut_to_next = False
+            kept_end = pos
+
+        # Compact JSON (as written by the editor) has no whitespace here
+        if text.startswith(",", pos) and not text[pos + 1 : pos + 2].isspace():
+            pos += 1
+            continue
+        pos = whitespace.match(text, pos).end()
+        if text.startswith(",", pos):
+            pos = whitespace.match(text, pos + 1).end()
+        elif not text.startswith("]", pos):
+            raise ValueError(f"expected ',' or ']' at offset {pos}")
+
+    if not removed:
+        return None, []
+    if text.startswith("]", pos):
+        if kept_end is None:
+            # Every entry was removed
+            pieces = [text[: array_start + 1]]
+            keep_from = pos
+    elif cut_to_next:
+        # The walk stopped early: the unchecked entries and the end of
+        # the value are copied as they are
+        keep_from = pos
+    pieces.append(text[keep_from:])
+    return pieces, removed
+
+
+def load_rules(rules_path):
+    """Load credential rules from a .json or .toml file"""
+    if rules_path.lower().endswith(".toml"):
+        if tomllib is None:
+            raise ValueError("TOML rule files need Python 3.11+, use JSON instead")
+        with open(rules_path, "rb") as f:
+            return CredentialRules(tomllib.load(f))
+
+    with open(rules_path, encoding="utf-8") as f:
+        return CredentialRules(json.load(f))
+
+
+def connect_read_only(db_path, timeout=2.0):
+    """Open a read-only connection (mode=ro URI) with a busy timeout"""
+    uri = f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro"
+    return sqlite3.connect(uri, uri=True, timeout=timeout)
+
+
+def processes_with_open_file(path):
+    """Return the PIDs of other processes that have path open (Linux)
+
+    Scans /proc/<pid>/fd; processes of other users cannot be inspected.
+    Returns an empty list where /proc is not available.
+    """
+    if not os.path.isdir("/proc/self/fd"):
+        return []
+    target = os.stat(path)
+    pids = []
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit() or int(pid) == os.getpid():
+            continue
+        fd_dir = os.path.join("/proc", pid, "fd")
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue
+        for fd in fds:
+            try:
+                stat = os.stat(os.path.join(fd_dir, fd))
+            except OSError:
+                continue
+            if (stat.st_dev, stat.st_ino) == (target.st_dev, target.st_ino):
+                pids.append(int(pid))
+                break
+    return pids
+
+
+def fsync_directory(directory):
+    """Make a rename in directory durable (best effort, not on Windows)"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def database_size(db_path):
+    """Size of a database on disk, including its WAL file if present"""
+    size = os.path.getsize(db_path)
+    if os.path.exists(db_path + "-wal"):
+        size += os.path.getsize(db_path + "-wal")
+    return size
+
+
+def encode_value(value):
+    """Encode a column value for a JSON journal (bytes become base64)"""
+    if isinstance(value, bytes):
+        return {"value_base64": base64.b64encode(value).decode("ascii")}
+    return {"value": value}
+
+
+def decode_value(entry):
+    """Decode a column value written by encode_value()"""
+    if "value_base64" in entry:
+        return base64.b64decode(entry["value_base64"])
+    return entry["value"]
+
+
+def value_digest(value):
+    """SHA-256 of a column value, used to detect changed rows"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    return hashlib.sha256(bytes(value)).hexdigest()
+
+
+class HumanRenderer:
+    """Render results as the console lines this script has always printed
+
+    Each result is formatted into one block and written with a single
+    call, so thousands of keys or databases cost a handful of writes (and
+    on a terminal, flushes) instead of one per line. Writes go to
+    sys.stdout unless a stream is given.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def write(self, lines):
+        (self.stream or sys.stdout).write("\n".join(lines) + "\n")
+
+    def analysis(self, db_path, records):
+        lines = [f"\n[ANALYSIS] Analysis of {len(records)} keys found:"]
+        for i, record in enumerate(records, 1):
+            status = "🔑 CREDENTIAL" if record["is_credential"] else "❓ UNCLEAR"
+            lines.append(f"\n   {i}. {format_key(record['table'], record['key'])}")
+            lines.append(f"      Status: {status}")
+            if record["tool"]:
+                lines.append(f"      Tool: {record['tool']}")
+            lines.append(f"      Reason: {record['reason']}")
+            if record["preview"]:
+                lines.append("      Preview:")
+                lines.extend(f"         {line}" for line in record["preview"].split("\n"))
+        self.write(lines)
+
+    def removal(self, db_path, result):
+        if result["error"]:
+            lines = [f"[ERROR] ❌ Removal rolled back, database unchanged: {result['error']}"]
+            lines.extend(f"   - {key}" for key in result["stale"])
+            self.write(lines)
+            return
+
+        lines = [
+            f"\n[SUCCESS] Successfully removed {len(result['removed'])} credential keys from database"
+        ]
+        if result["not_found"]:
+            lines.append(f"[NOT_FOUND] ❌ {len(result['not_found'])} keys already don't exist")
+        if result["history_error"]:
+            lines.append(f"[ERROR] Failed to clean history: {result['history_error']}")
+        elif result["history_removed"]:
+            lines.append(
+                f"[CLEANED] ✅ Successfully cleaned {len(result['history_removed'])} entries from history"
+            )
+        if result["journal_path"]:
+            lines.append(f"[JOURNAL] Undo journal saved at: {result['journal_path']}")
+        if result["swap_seconds"] is not None:
+            lines.append(
+                f"[ATOMIC] Clone checked and renamed over the database, "
+                f"swap window {result['swap_seconds'] * 1000:.1f} ms"
+            )
+        else:
+            lines.append(f"[LOCK] Write lock held for {result['lock_seconds'] * 1000:.1f} ms")
+        self.write(lines)
+
+    def history(self, db_path, result):
+        if result["error"] or result["history_error"]:
+            self.write(
+                [f"[ERROR] Failed to clean history: {result['error'] or result['history_error']}"]
+            )
+        else:
+            self.write(
+                [
+                    f"[CLEANED] ✅ Successfully cleaned {len(result['history_removed'])} entries from history"
+                ]
+            )
+
+    def fleet_entry(self, entry):
+        lines = [
+            f"   [{entry['status'].upper()}] {entry['path']} "
+            f"({entry['removed']} keys, {entry['timings'].get('total', 0):.2f}s)"
+        ]
+        if entry["error"]:
+            lines.append(f"      [ERROR] {entry['error']}")
+        self.write(lines)
+
+    def fleet_summary(self, report):
+        self.write(
+            [f"\n[FLEET] Finished in {report['total_seconds']:.2f}s: {report['summary']}"]
+        )
+
+
+class JsonLinesRenderer:
+    """Render results as JSON lines for other programs
+
+    One object per analyzed key ("key"), removal ("removal"), history
+    cleanup ("history"), fleet database ("database") and fleet run
+    ("fleet"). Each result is written with a single call.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def write(self, records):
+        (self.stream or sys.stdout).write(
+            "".join(
+                json.dumps(record, ensure_ascii=False, default=str) + "\n"
+                for record in records
+            )
+        )
+
+    def analysis(self, db_path, records):
+        self.write(
+            {
+                "event": "key",
+                "database": db_path,
+                "table": record["table"],
+                "key": record["key"],
+                "credential": record["is_credential"],
+                "tool": record["tool"],
+                "reason": record["reason"],
+                "preview": json.loads(record["preview"]) if record["preview"] else None,
+            }
+            for record in records
+        )
+
+    def removal(self, db_path, result):
+        record = {"event": "removal", "database": db_path}
+        record.update(result)
+        for field in ("removed", "not_found"):
+            record[field] = [{"table": table, "key": key} for table, key in result[field]]
+        self.write([record])
+
+    def history(self, db_path, result):
+        self.write(
+            [
+                {
+                    "event": "history",
+                    "database": db_path,
+                    "history_removed": result["history_removed"],
+                    "journal_path": result["journal_path"],
+                    "error": result["error"] or result["history_error"],
+                }
+            ]
+        )
+
+    def fleet_entry(self, entry):
+        self.write([dict(event="database", **entry)])
+
+    def fleet_summary(self, report):
+        self.write(
+            [
+                {
+                    "event": "fleet",
+                    "workers": report["workers"],
+                    "total_seconds": report["total_seconds"],
+                    "summary": report["summary"],
+                }
+            ]
+        )
+
+
+class SilentRenderer:
+    """Render nothing; results are only returned"""
+
+    def analysis(self, db_path, records):
+        pass
+
+    def removal(self, db_path, result):
+        pass
+
+    def history(self, db_path, result):
+        pass
+
+    def fleet_entry(self, entry):
+        pass
+
+    def fleet_summary(self, report):
+        pass
+
+
+# Renderers selectable with --output
+RENDERERS = {
+    "human": HumanRenderer,
+    "jsonl": JsonLinesRenderer,
+    "silent": SilentRenderer,
+}
+
+
+class BackupStore:
+    """Content-addressed store of compressed database snapshots
+
+    Snapshots are taken with the SQLite online backup API and saved gzip
+    compressed as objects/<sha256>.vscdb.gz, so identical snapshots are
+    stored only once. Every snapshot also gets a small JSON manifest in
+    snapshots/ recording its source file and creation time. Row-level undo
+    journals of each removal are kept in journals/.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.snapshots_dir = os.path.join(root, "snapshots")
+        self.journals_dir = os.path.join(root, "journals")
+
+    @staticmethod
+    def default_root(db_path):
+        """Backup directory used when none is given: next to the database"""
+        return os.path.join(os.path.dirname(os.path.abspath(db_path)), ".vscdb_backups")
+
+    def make_dirs(self, *paths):
+        """Create store directories that only their owner can open"""
+        for path in (self.root,) + paths:
+            os.makedirs(path, mode=0o700, exist_ok=True)
+
+    def object_path(self, digest):
+        """Path of the compressed snapshot with the given content hash"""
+        return os.path.join(self.objects_dir, f"{digest}.vscdb.gz")
+
+    def snapshot(self, db_path):
+        """Take a consistent snapshot of db_path and return its manifest"""
+        self.make_dirs(self.objects_dir, self.snapshots_dir)
+        source = os.path.abspath(db_path)
+
+        fd, temp_path = tempfile.mkstemp(suffix=".vscdb", dir=self.root)
+        os.close(fd)
+        try:
+            # Page-level copy that stays consistent even if the file is in use
+            src = connect_read_only(source)
+            dst = sqlite3.connect(temp_path)
+            try:
+                src.backup(dst)
+            finally:
+                dst.close()
+                src.close()
+
+            size = os.path.getsize(temp_path)
+            digest = self.file_digest(temp_path)
+            object_path = self.object_path(digest)
+            if not os.path.exists(object_path):
+                self.compress(temp_path, object_path)
+        finally:
+            os.remove(temp_path)
+
+        created_at = datetime.now()
+        source_hash = hashlib.sha1(source.encode("utf-8")).hexdigest()[:8]
+        manifest = {
+            "id": f"{created_at.strftime('%Y%m%d_%H%M%S_%f')}_{source_hash}",
+            "source": source,
+            "created_at": created_at.isoformat(),
+            "object": digest,
+            "size": size,
+            "compressed_size": os.path.getsize(object_path),
+        }
+        self.write_json(os.path.join(self.snapshots_dir, f"{manifest['id']}.json"), manifest, mode=0o600)
+        return manifest
+
+    def file_digest(self, path, chunk_size=1024 * 1024):
+        """SHA-256 of a file, read in chunks"""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def compress(self, source_path, object_path):
+        """Stream-compress a file into the store, replacing atomically"""
+        temp_path = f"{object_path}.tmp{os.getpid()}"
+        # Snapshots are full copies of the database, credentials included
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(source_path, "rb") as src, open(fd, "wb") as raw, gzip.GzipFile(
+            fileobj=raw, mode="wb", compresslevel=6
+        ) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(temp_path, object_path)
+
+    def write_json(self, path, data, mode=0o666):
+        """Write a JSON file through a temp file and an atomic rename
+
+        mode is the permission the file is created with (minus the umask).
+        """
+        temp_path = f"{path}.tmp{os.getpid()}"
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+        with open(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    def save_journal(self, journal):
+        """Save an undo journal, readable only by its owner, and return its path"""
+        self.make_dirs(self.journals_dir)
+        created_at = datetime.fromisoformat(journal["created_at"])
+        source_hash = hashlib.sha1(journal["database"].encode("utf-8")).hexdigest()[:8]
+        path = os.path.join(
+            self.journals_dir,
+            f"{created_at.strftime('%Y%m%d_%H%M%S_%f')}_{source_hash}.json",
+        )
+        # Journals hold the removed credentials themselves
+        self.write_json(path, journal, mode=0o600)
+        return path
+
+    def list_journals(self, db_path=None):
+        """List undo journal paths, newest first, optionally for one database"""
+        if not os.path.isdir(self.journals_dir):
+            return []
+
+        source = os.path.abspath(db_path) if db_path else None
+        journals = []
+        for entry in os.scandir(self.journals_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            if source is not None:
+                source_hash = hashlib.sha1(source.encode("utf-8")).hexdigest()[:8]
+                if not entry.name.endswith(f"_{source_hash}.json"):
+                    continue
+            journals.append(entry.path)
+        return sorted(journals, reverse=True)
+
+    def find_journal(self, db_path, journal):
+        """Find a journal by path, file name or ID, or the newest for 'latest'"""
+        if os.path.isfile(journal):
+            return journal
+        if journal == "latest":
+            journals = self.list_journals(db_path)
+            return journals[0] if journals else None
+        name = journal if journal.endswith(".json") else f"{journal}.json"
+        path = os.path.join(self.journals_dir, name)
+        return path if os.path.isfile(path) else None
+
+    def list_snapshots(self, db_path=None):
+        """List snapshot manifests, newest first, optionally for one database"""
+        if not os.path.isdir(self.snapshots_dir):
+            return []
+
+        source = os.path.abspath(db_path) if db_path else None
+        snapshots = []
+        for entry in os.scandir(self.snapshots_dir):
+            if not entry.name.endswith(".json"):
+                continue
+            with open(entry.path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if source is None or manifest["source"] == source:
+                snapshots.append(manifest)
+        snapshots.sort(key=lambda manifest: manifest["created_at"], reverse=True)
+        return snapshots
+
+    def prune(self, db_path, keep=None, keep_days=None):
+        """Apply the retention policy to snapshots and journals of db_path
+
+        keep limits the number of snapshots and of undo journals kept,
+        keep_days drops the ones older than that many days. Compressed
+        objects no longer referenced by any snapshot are deleted. Returns
+        the number of removed snapshots and journals.
+        """
+        if keep is None and keep_days is None:
+            return 0
+
+        cutoff = None
+        if keep_days is not None:
+            cutoff = datetime.now() - timedelta(days=keep_days)
+
+        removed = 0
+        for index, manifest in enumerate(self.list_snapshots(db_path)):
+            expired = keep is not None and index >= keep
+            expired = expired or (cutoff and manifest["created_at"] < cutoff.isoformat())
+            if expired:
+                os.remove(os.path.join(self.snapshots_dir, f"{manifest['id']}.json"))
+                removed += 1
+
+        if removed:
+            referenced = {manifest["object"] for manifest in self.list_snapshots()}
+            for entry in os.scandir(self.objects_dir):
+                digest = entry.name.split(".", 1)[0]
+                if entry.name.endswith(".vscdb.gz") and digest not in referenced:
+                    os.remove(entry.path)
+
+        for index, path in enumerate(self.list_journals(db_path)):
+            # Journal names start with their creation time
+            name = os.path.basename(path)
+            expired = keep is not None and index >= keep
+            expired = expired or (cutoff and name < cutoff.strftime("%Y%m%d_%H%M%S_%f"))
+            if expired:
+                os.remove(path)
+                removed += 1
+        return removed
+
+    def find_snapshot(self, db_path, snapshot_id):
+        """Find a snapshot manifest by ID, or the newest one for 'latest'"""
+        if snapshot_id == "latest":
+            snapshots = self.list_snapshots(db_path)
+            return snapshots[0] if snapshots else None
+        for manifest in self.list_snapshots():
+            if manifest["id"] == snapshot_id:
+                return manifest
+        return None
+
+    def restore(self, manifest, target_path):
+        """Restore a snapshot into target_path with the online backup API"""
+        fd, temp_path = tempfile.mkstemp(suffix=".vscdb", dir=self.root)
+        os.close(fd)
+        try:
+            with gzip.open(self.object_path(manifest["object"]), "rb") as src, open(
+                temp_path, "wb"
+            ) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+
+            src = sqlite3.connect(temp_path)
+            dst = sqlite3.connect(target_path)
+            try:
+                src.backup(dst)
+            finally:
+                dst.close()
+                src.close()
+        finally:
+            os.remove(temp_path)
+
+
+def list_backups(store, db_path):
+    """Print the snapshots available for a database"""
+    snapshots = store.list_snapshots(db_path)
+    if not snapshots and not store.list_journals(db_path):
+        print(f"[INFO] No backups found in: {store.root}")
+        return
+
+    print(f"[BACKUPS] {len(snapshots)} snapshots in {store.root}:")
+    for manifest in snapshots:
+        print(
+            f"   {manifest['id']}  {manifest['created_at'][:19]}  "
+            f"{manifest['size']:,} bytes ({manifest['compressed_size']:,} compressed)"
+        )
+
+    journals = store.list_journals(db_path)
+    if journals:
+        print(f"\n[JOURNALS] {len(journals)} undo journals:")
+        for path in journals:
+            print(f"   {os.path.basename(path)[:-5]}  {os.path.getsize(path):,} bytes")
+
+
+def restore_backup(store, db_path, snapshot_id):
+    """Restore a database from a snapshot after confirmation"""
+    manifest = store.find_snapshot(db_path, snapshot_id)
+    if not manifest:
+        print(f"[ERROR] Backup not found: {snapshot_id}")
+        return False
+
+    print(f"[RESTORE] Snapshot {manifest['id']} from {manifest['created_at'][:19]}")
+    response = input(f"\nOverwrite {db_path} with this backup? (yes/no): ").lower()
+    if response not in ["yes", "y"]:
+        print("[CANCELLED] Restore cancelled")
+        return False
+
+    try:
+        store.restore(manifest, db_path)
+        print(f"[SUCCESS] ✅ Database restored from backup: {manifest['id']}")
+        return True
+    except Exception as e:
+        print(f"[ERROR] Failed to restore backup: {e}")
+        return False
+
+
+def undo_journal(store, db_path, journal):
+    """Replay an undo journal into the database after confirmation"""
+    journal_path = store.find_journal(db_path, journal)
+    if not journal_path:
+        print(f"[ERROR] Undo journal not found: {journal}")
+        return False
+
+    with open(journal_path, encoding="utf-8") as f:
+        data = json.load(f)
+    if os.path.realpath(data["database"]) != os.path.realpath(db_path):
+        print(f"[ERROR] Journal {journal_path} was written for {data['database']}")
+        print(f"   Not applying it to {db_path}")
+        return False
+
+    print(f"[UNDO] Journal {journal_path} from {data['created_at'][:19]}")
+    print(
+        f"[UNDO] Restores {len(data['deleted'])} removed keys "
+        f"and {len(data['updated'])} updated values"
+    )
+    response = input(f"\nApply this journal to {db_path}? (yes/no): ").lower()
+    if response not in ["yes", "y"]:
+        print("[CANCELLED] Undo cancelled")
+        return False
+
+    remover = SafeBlackboxCredentialRemover(db_path, backup_dir=store.root)
+    try:
+        if not remover.connect():
+            return False
+        result = remover.apply_journal(data)
+    finally:
+        remover.close()
+
+    if result["error"]:
+        print(f"[ERROR] Failed to apply journal: {result['error']}")
+        return False
+    if result["conflicts"]:
+        print("[ERROR] Values changed since the journal was written, nothing restored:")
+        for key in result["conflicts"]:
+            print(f"   - {key}")
+        return False
+
+    print(f"[SUCCESS] ✅ Restored {len(result['restored'])} keys from undo journal")
+    return True
+
+
+def write_plan(
+    db_path, plan_path, include_history=True, backup_options=None, renderer=None
+):
+    """Analyze a database without prompting and save its change plan
+
+    Nothing is changed. The plan can be applied later with apply_plan_file(),
+    also to the live database when the analysis ran on a copy of it.
+    """
+    remover = SafeBlackboxCredentialRemover(
+        db_path, renderer=renderer, **(backup_options or {})
+    )
+    try:
+        if not remover.connect():
+            return None
+        potential_keys = remover.find_safe_blackbox_keys()
+        credential_keys, unclear_keys = [], []
+        if potential_keys:
+            credential_keys, unclear_keys = remover.display_analysis(potential_keys)
+        history_plan = remover.find_blackbox_history() if include_history else None
+        plan = remover.build_plan(credential_keys, unclear_keys, history_plan)
+    finally:
+        remover.close()
+
+    with open(plan_path, "w", encoding="utf-8") as f:
+        json.dump(plan, f, indent=2, ensure_ascii=False)
+    print(
+        f"\n[PLAN] {len(plan['keys'])} credential keys and "
+        f"{len(plan['history_removed'])} history entries saved to: {plan_path}"
+    )
+    print(f'[PLAN] To apply: python blackbox_logout_en.py "{db_path}" --apply {plan_path}')
+    return plan
+
+
+def load_plan(plan_path):
+    """Load a change plan written by write_plan()"""
+    with open(plan_path, encoding="utf-8") as f:
+        plan = json.load(f)
+    for field in ("database", "created_at", "keys", "history", "history_removed"):
+        if field not in plan:
+            raise ValueError(f"not a change plan, missing '{field}'")
+    return plan
+
+
+def apply_plan_file(
+    db_path,
+    plan,
+    backup_options=None,
+    snapshot=False,
+    deep_verify=False,
+    compact=False,
+    renderer=None,
+):
+    """Apply a loaded change plan to a database and verify it"""
+    remover = SafeBlackboxCredentialRemover(
+        db_path, renderer=renderer, **(backup_options or {})
+    )
+    try:
+        if snapshot and not remover.create_backup():
+            return None
+        if not remover.connect():
+            return None
+
+        print(
+            f"[PLAN] Plan from {plan['created_at'][:19]}: {len(plan['keys'])} "
+            f"credential keys and {len(plan['history_removed'])} history entries"
+        )
+        if os.path.abspath(db_path) != plan["database"]:
+            print(f"[INFO] Plan was written for {plan['database']}, value hashes are checked here")
+
+        result = remover.apply_plan(plan)
+        remover.renderer.removal(db_path, result)
+        if result["error"]:
+            return result
+
+        remover.verify_removal(result, deep=deep_verify)
+        if compact:
+            remover.compact_database()
+        if remover.journal_path:
+            journal_id = os.path.basename(remover.journal_path)[:-5]
+            print(f'[UNDO] To undo: python blackbox_logout_en.py "{db_path}" --undo {journal_id}')
+        return result
+    finally:
+        remover.close()
+
+
+class InotifySource:
+    """Wait for writes to a database and its -wal file with Linux inotify"""
+
+    name = "inotify"
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, db_path):
+        libc_path = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or not libc_path:
+            raise OSError("inotify is only available on Linux")
+        base_name = os.path.basename(db_path)
+        self.names = {base_name, base_name + "-wal", base_name + "-journal"}
+
+        # The directory is watched: SQLite creates and deletes -wal/-journal
+        libc = ctypes.CDLL(libc_path, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        directory = os.path.dirname(os.path.abspath(db_path))
+        mask = self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_TO | self.IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"inotify_add_watch failed for {directory}")
+
+    def wait(self, timeout=None):
+        """Return True once one of the files changed, False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None
+            if deadline is not None:
+                remaining = max(0.0, deadline - time.monotonic())
+            readable, _, _ = select.select([self.fd], [], [], remaining)
+            if not readable:
+                return False
+            if self.read_events():
+                return True
+
+    def read_events(self):
+        """Drain pending events; True if one of them concerns the database"""
+        changed = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                length = self.EVENT_HEADER.unpack_from(data, offset)[3]
+                offset += self.EVENT_HEADER.size
+                name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+                offset += length
+                changed = changed or name in self.names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingSource:
+    """Fallback for InotifySource that polls size and mtime of the files"""
+
+    name = "polling"
+
+    def __init__(self, db_path, interval=0.25):
+        self.paths = [db_path, db_path + "-wal", db_path + "-journal"]
+        self.interval = interval
+        self.signature = self.stat_files()
+
+    def stat_files(self):
+        signature = []
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                signature.append(None)
+        return signature
+
+    def wait(self, timeout=None):
+        """Return True once one of the files changed, False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            signature = self.stat_files()
+            if signature != self.signature:
+                self.signature = signature
+                return True
+            delay = self.interval
+            if deadline is not None:
+                delay = min(delay, deadline - time.monotonic())
+                if delay <= 0:
+                    return False
+            time.sleep(delay)
+
+    def close(self):
+        pass
+
+
+class CredentialWatcher:
+    """Remove credentials again as soon as the editor writes them back
+
+    Writes to the database and its -wal file are picked up with inotify,
+    or by polling where inotify is not available. A burst of writes is
+    debounced until it has been quiet for `debounce` seconds, but for at
+    most half of the latency budget. Each check first compares PRAGMA
+    data_version, which only changes when another connection committed,
+    and then runs the rule lookup of key_match_conditions(), so only
+    rule-matched values are read. Latency is measured from the first write
+    of a burst to the commit of the removal.
+    """
+
+    def __init__(
+        self,
+        remover,
+        include_history=True,
+        debounce=0.2,
+        latency_budget=1.0,
+        poll=False,
+        stats_path=None,
+    ):
+        self.remover = remover
+        self.include_history = include_history
+        self.debounce = debounce
+        self.latency_budget = latency_budget
+        self.poll = poll
+        self.stats_path = stats_path
+        self.data_version = None
+        self.inode = None
+        self.counters = {
+            "events": 0,
+            "checks": 0,
+            "skipped_checks": 0,
+            "removals": 0,
+            "keys_removed": 0,
+            "history_removed": 0,
+            "errors": 0,
+            "over_budget": 0,
+            "last_check_ms": None,
+            "last_latency_ms": None,
+            "max_latency_ms": None,
+            "avg_latency_ms": None,
+        }
+        self.latencies = 0
+        self.total_latency = 0.0
+
+    def open_source(self):
+        """Use inotify when possible, polling otherwise"""
+        if not self.poll:
+            try:
+                return InotifySource(self.remover.db_path)
+            except OSError as e:
+                print(f"[WATCH] inotify not available ({e}), polling instead")
+        return PollingSource(self.remover.db_path, min(0.25, self.latency_budget / 4))
+
+    def run(self):
+        """Watch until interrupted with Ctrl+C"""
+        if not self.remover.connect():
+            return False
+        self.inode = os.stat(self.remover.db_path).st_ino
+        source = self.open_source()
+        print(
+            f"[WATCH] Watching {self.remover.db_path} ({source.name}, "
+            f"debounce {self.debounce * 1000:.0f} ms, "
+            f"latency budget {self.latency_budget * 1000:.0f} ms)"
+        )
+        print("[WATCH] Press Ctrl+C to stop")
+
+        try:
+            # Credentials may already be back before the first write
+            self.check()
+            while True:
+                if not source.wait():
+                    continue
+                first_event = time.perf_counter()
+                self.counters["events"] += 1
+                deadline = first_event + self.latency_budget / 2
+                while True:
+                    quiet = min(self.debounce, deadline - time.perf_counter())
+                    if quiet <= 0 or not source.wait(quiet):
+                        break
+                    self.counters["events"] += 1
+                self.check(first_event)
+        except KeyboardInterrupt:
+            print("\n[WATCH] Stopped")
+        finally:
+            source.close()
+            self.write_stats()
+            self.print_counters()
+        return True
+
+    def check(self, first_event=None):
+        """Remove the rule-matched credentials if the database has changed"""
+        remover = self.remover
+        started = time.perf_counter()
+        try:
+            # The editor may replace the file; reopen the new one
+            inode = os.stat(remover.db_path).st_ino
+            if inode != self.inode:
+                remover.close()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    if not remover.connect():
+                        raise OSError(f"cannot open {remover.db_path}")
+                self.inode = inode
+                self.data_version = None
+
+            version = remover.conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self.data_version:
+                self.counters["skipped_checks"] += 1
+                return None
+            self.data_version = version
+            self.counters["checks"] += 1
+
+            records = remover.analyze_keys(remover.find_safe_blackbox_keys())
+            credential_keys = [
+                (record["table"], record["key"])
+                for record in records
+                if record["is_credential"]
+            ]
+            with contextlib.redirect_stdout(io.StringIO()):
+                history_plan = None
+                if self.include_history:
+                    history_plan = remover.find_blackbox_history()
+            if not credential_keys and not history_plan:
+                self.counters["last_check_ms"] = round(
+                    (time.perf_counter() - started) * 1000, 2
+                )
+                return None
+
+            result = remover.apply_removal(credential_keys, history_plan)
+            # Our own commit must not trigger another check
+            self.data_version = remover.conn.execute(
+                "PRAGMA data_version"
+            ).fetchone()[0]
+        except (sqlite3.Error, OSError) as e:
+            self.counters["errors"] += 1
+            print(f"[WATCH] [ERROR] Check failed: {e}")
+            return None
+
+        finished = time.perf_counter()
+        self.counters["last_check_ms"] = round((finished - started) * 1000, 2)
+        if result["error"]:
+            self.counters["errors"] += 1
+            print(f"[WATCH] [ERROR] Removal rolled back: {result['error']}")
+            return result
+
+        self.counters["removals"] += 1
+        self.counters["keys_removed"] += len(result["removed"])
+        self.counters["history_removed"] += len(result["history_removed"])
+        message = (
+            f"[WATCH] {datetime.now():%H:%M:%S} Removed {len(result['removed'])} keys"
+        )
+        if result["history_removed"]:
+            message += f" and {len(result['history_removed'])} history entries"
+
+        if first_event is not None:
+            latency_ms = (finished - first_event) * 1000
+            self.latencies += 1
+            self.total_latency += latency_ms
+            self.counters["last_latency_ms"] = round(latency_ms, 2)
+            self.counters["max_latency_ms"] = round(
+                max(latency_ms, self.counters["max_latency_ms"] or 0.0), 2
+            )
+            self.counters["avg_latency_ms"] = round(
+                self.total_latency / self.latencies, 2
+            )
+            message += f", latency {latency_ms:.0f} ms"
+            if latency_ms > self.latency_budget * 1000:
+                self.counters["over_budget"] += 1
+                message += " (over budget)"
+        print(message)
+        self.write_stats()
+        return result
+
+    def write_stats(self):
+        """Save the counters as JSON for monitoring (atomic replace)"""
+        if not self.stats_path:
+            return
+        stats = dict(
+            self.counters,
+            database=os.path.abspath(self.remover.db_path),
+            updated_at=datetime.now().isoformat(),
+        )
+        tmp_path = self.stats_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(stats, f, indent=2)
+            os.replace(tmp_path, self.stats_path)
+        except OSError as e:
+            print(f"[WATCH] [WARNING] Could not write stats: {e}")
+
+    def print_counters(self):
+        print("[WATCH] Counters:")
+        for name, value in self.counters.items():
+            print(f"   {name}: {value if value is not None else '-'}")
+
+
+def new_fleet_entry(db_path, status="clean", error=None):
+    """Return an empty fleet report entry for one database"""
+    return {
+        "path": db_path,
+        "status": status,
+        "removed": 0,
+        "not_found": 0,
+        "unclear": 0,
+        "history_removed": 0,
+        "reclaimed_bytes": 0,
+        "backup_path": None,
+        "journal_path": None,
+        "error": error,
+        "timings": {},
+    }
+
+
+def clean_database(db_path, include_history=True, backup_options=None):
+    """Clean one database without prompts and return a report dict
+
+    Used by fleet mode inside worker processes. Results are not rendered
+    and the remaining console output is captured, so parallel workers do
+    not interleave their logs.
+    """
+    report = new_fleet_entry(db_path)
+    options = dict(backup_options or {})
+    snapshot = options.pop("snapshot", False)
+    compact = options.pop("compact", False)
+    deep_verify = options.pop("deep_verify", False)
+    remover = SafeBlackboxCredentialRemover(
+        db_path, renderer=SilentRenderer(), **options
+    )
+    log = io.StringIO()
+    started = time.perf_counter()
+
+    def lap(step, since):
+        now = time.perf_counter()
+        report["timings"][step] = round(now - since, 4)
+        return now
+
+    try:
+        with contextlib.redirect_stdout(log):
+            step_started = time.perf_counter()
+            if snapshot and not remover.create_backup():
+                raise RuntimeError(log.getvalue().strip().splitlines()[-1])
+            if not remover.connect():
+                raise RuntimeError(log.getvalue().strip().splitlines()[-1])
+            report["backup_path"] = remover.backup_path
+            step_started = lap("backup", step_started)
+
+            potential_keys = remover.find_safe_blackbox_keys()
+            credential_keys, non_credential_keys = remover.display_analysis(
+                potential_keys
+            )
+            report["unclear"] = len(non_credential_keys)
+            step_started = lap("analyze", step_started)
+
+            result = remover.remove_safe_keys(
+                credential_keys, confirm=False, include_history=include_history
+            )
+            step_started = lap("remove", step_started)
+            if result["error"]:
+                raise RuntimeError(result["error"])
+
+            report["journal_path"] = result["journal_path"]
+            report["timings"]["lock"] = round(result["lock_seconds"], 4)
+            report["removed"] = len(result["removed"])
+            report["not_found"] = len(result["not_found"])
+            report["history_removed"] = len(result["history_removed"])
+            if result["history_error"]:
+                report["error"] = f"history: {result['history_error']}"
+
+            verified = remover.verify_removal(result, deep=deep_verify)
+            step_started = lap("verify", step_started)
+
+            if compact:
+                compacted = remover.compact_database()
+                lap("compact", step_started)
+                report["reclaimed_bytes"] = compacted["reclaimed_bytes"]
+                if compacted["error"] and not report["error"]:
+                    report["error"] = f"compact: {compacted['error']}"
+
+        if report["removed"] or report["history_removed"]:
+            report["status"] = "cleaned"
+        if not verified or report["error"]:
+            report["status"] = "warning"
+    except Exception as e:
+        report["status"] = "failed"
+        report["error"] = str(e)
+    finally:
+        remover.close()
+
+    report["timings"]["total"] = round(time.perf_counter() - started, 4)
+    return report
+
+
+def attach_limit():
+    """Return how many databases one connection can ATTACH"""
+    conn = sqlite3.connect(":memory:")
+    try:
+        return conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    except AttributeError:  # Python < 3.11: SQLite's compiled-in default
+        return 10
+    finally:
+        conn.close()
+
+
+def union_all(parts):
+    """Combine (sql, params) SELECT statements into one UNION ALL query"""
+    sql = " UNION ALL ".join(part_sql for part_sql, _ in parts)
+    return sql, [param for _, part_params in parts for param in part_params]
+
+
+def clean_database_group(db_paths, include_history=True, backup_options=None):
+    """Clean a group of databases ATTACHed to one connection
+
+    Meant for many small workspaceStorage databases, where opening a
+    connection and committing per file costs more than the work itself.
+    Table listing, key discovery, value reads, history reads and
+    verification each run as one UNION ALL query across the attached
+    schemas, and the deletes of the whole group are committed in a single
+    transaction. If the group cannot be committed, for example because
+    the editor keeps one of the files locked, every database of the group
+    is cleaned on its own with clean_database(). Returns one report dict
+    per database, with the timings of the whole group.
+    """
+    options = dict(backup_options or {})
+    snapshot = options.pop("snapshot", False)
+    compact = options.pop("compact", False)
+    deep_verify = options.pop("deep_verify", False)
+    rules_path = options.pop("rules_path", None)
+    rules = load_rules(rules_path) if rules_path else CredentialRules(DEFAULT_RULES)
+
+    removers = []
+    for db_path in db_paths:
+        remover = SafeBlackboxCredentialRemover(
+            db_path, renderer=SilentRenderer(), **options
+        )
+        remover.rules = rules
+        removers.append(remover)
+    schemas = [f"db{index}" for index in range(len(db_paths))]
+    reports = [new_fleet_entry(db_path) for db_path in db_paths]
+    timings = {}
+    log = io.StringIO()
+    started = time.perf_counter()
+    conn = None
+    committed = False
+
+    def lap(step, since):
+        now = time.perf_counter()
+        timings[step] = round(now - since, 4)
+        return now
+
+    def find_keys(cursor, tables):
+        if not tables:
+            return []
+        sources = [(schemas[index], table) for index, table in tables]
+        conditions = removers[0].key_match_conditions(sources)
+        parts = [
+            (
+                f"SELECT {index}, ?, key FROM {qualified_name(*source)} "
+                f"WHERE {conditions[source][0]}",
+                [table] + conditions[source][1],
+            )
+            for (index, table), source in zip(tables, sources)
+        ]
+        cursor.execute(*union_all(parts))
+        return cursor.fetchall()
+
+    def select_keys(cursor, columns, keys_by_table, extra_params=()):
+        parts = [
+            (
+                f"SELECT {index}, ?, {columns} FROM "
+                f"{qualified_name(schemas[index], table)} "
+                "WHERE key IN (SELECT value FROM json_each(?))",
+                [table, *extra_params, json.dumps(keys)],
+            )
+            for (index, table), keys in keys_by_table.items()
+        ]
+        if not parts:
+            return []
+        cursor.execute(*union_all(parts))
+        return cursor.fetchall()
+
+    def read_history(cursor, indexes):
+        parts = [
+            (
+                f"SELECT {index}, key, value FROM "
+                f"{qualified_name(schemas[index], 'ItemTable')} "
+                "WHERE key IN (SELECT value FROM json_each(?))",
+                [json.dumps(HISTORY_KEYS)],
+            )
+            for index in indexes
+        ]
+        cursor.execute(*union_all(parts))
+        history = {}
+        for index, key, value in cursor:
+            history.setdefault(index, []).append((key, value))
+        return history
+
+    try:
+        with contextlib.redirect_stdout(log):
+            step_started = time.perf_counter()
+            for remover, report in zip(removers, reports):
+                if snapshot and not remover.create_backup():
+                    raise RuntimeError(log.getvalue().strip().splitlines()[-1])
+                report["backup_path"] = remover.backup_path
+
+            conn = sqlite3.connect(
+                ":memory:", timeout=removers[0].busy_timeout, uri=True
+            )
+            removers[0].register_functions(conn)
+            cursor = conn.cursor()
+            for schema, db_path in zip(schemas, db_paths):
+                # mode=rw: never create a database that has disappeared
+                uri = "file:" + pathname2url(os.path.abspath(db_path)) + "?mode=rw"
+                cursor.execute(f"ATTACH DATABASE ? AS {schema}", (uri,))
+            step_started = lap("backup", step_started)
+
+            # 1. Key/value tables of every schema
+            cursor.execute(
+                *union_all(
+                    [
+                        (
+                            f"SELECT {index}, m.name FROM {schema}.sqlite_master AS m "
+                            "WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%' "
+                            "AND (SELECT count(*) FROM pragma_table_info(m.name, ?) "
+                            "AS c WHERE lower(c.name) IN ('key', 'value')) = 2",
+                            [schema],
+                        )
+                        for index, schema in enumerate(schemas)
+                    ]
+                )
+            )
+            tables = sorted(cursor.fetchall())
+
+            # 2. Matching keys and the head of their values
+            keys_by_table = {}
+            for index, table, key in find_keys(cursor, tables):
+                keys_by_table.setdefault((index, table), []).append(key)
+            limit = removers[0].max_sniff_bytes
+            credential_keys = {}
+            for index, table, key, data, truncated in select_keys(
+                cursor,
+                "key, CASE WHEN typeof(value) IN ('text', 'blob') "
+                "THEN substr(CAST(value AS BLOB), 1, ?) END, "
+                "length(CAST(value AS BLOB)) > ?",
+                keys_by_table,
+                (limit, limit),
+            ):
+                text = data.decode("utf-8", "ignore") if data is not None else None
+                analysis = removers[index].analyze_key(key, text, bool(truncated))
+                if analysis["is_credential"]:
+                    credential_keys.setdefault((index, table), []).append(key)
+                else:
+                    reports[index]["unclear"] += 1
+
+            # 3. History of the schemas that have an ItemTable
+            history_plans = {}
+            history_schemas = [
+                index for index, table in tables if table == "ItemTable"
+            ]
+            if include_history and history_schemas:
+                history = read_history(cursor, history_schemas)
+                for index, rows in history.items():
+                    # Hand the rows over one at a time, so every value can
+                    # be freed as soon as it has been filtered
+                    rows.reverse()
+                    plan = removers[index].plan_history_cleanup(
+                        rows.pop() for _ in range(len(rows))
+                    )
+                    if plan:
+                        history_plans[index] = plan
+            step_started = lap("analyze", step_started)
+
+            # 4. One write transaction for the whole group
+            removers[0].begin_immediate(conn)
+            locked_at = time.perf_counter()
+
+            deleted_rows = {}
+            for index, table, key, value in select_keys(
+                cursor, "key, value", credential_keys
+            ):
+                deleted_rows.setdefault(index, []).append((table, key, value))
+
+            updated_rows = {}
+            if history_plans:
+                history = read_history(cursor, history_plans)
+                for index, plan in history_plans.items():
+                    current = dict(history.get(index, []))
+                    rows = [
+                        (update["key"], current[update["key"]], update["value"])
+                        for update in plan["updates"]
+                        if update["key"] in current
+                        and value_digest(current[update["key"]])
+                        == update["before_sha256"]
+                    ]
+                    if len(rows) == len(plan["updates"]):
+                        updated_rows[index] = rows
+                for index in list(history_plans):
+                    if index not in updated_rows:
+                        del history_plans[index]
+                        reports[index]["error"] = (
+                            "history: history changed since analysis, skipped"
+                        )
+
+            for index in set(deleted_rows) | set(updated_rows):
+                reports[index]["journal_path"] = removers[index].write_journal(
+                    deleted_rows.get(index, []), updated_rows.get(index, [])
+                )
+
+            deleted_count = {}
+            for (index, table), keys in credential_keys.items():
+                cursor.execute(
+                    f"DELETE FROM {qualified_name(schemas[index], table)} "
+                    "WHERE key IN (SELECT value FROM json_each(?))",
+                    (json.dumps(keys),),
+                )
+                deleted_count[index] = deleted_count.get(index, 0) + cursor.rowcount
+            for index, plan in history_plans.items():
+                cursor.executemany(
+                    f"UPDATE {qualified_name(schemas[index], 'ItemTable')} "
+                    "SET value = ? WHERE key = ?",
+                    [(update["value"], update["key"]) for update in plan["updates"]],
+                )
+            conn.commit()
+            committed = True
+            timings["lock"] = round(time.perf_counter() - locked_at, 4)
+            step_started = lap("remove", step_started)
+
+            for index, rows in deleted_rows.items():
+                reports[index]["removed"] = len(rows)
+            for (index, table), keys in credential_keys.items():
+                reports[index]["not_found"] += len(keys)
+            for index, report in enumerate(reports):
+                report["not_found"] -= report["removed"]
+                if index in history_plans:
+                    report["history_removed"] = len(
+                        history_plans[index]["removed_entries"]
+                    )
+
+            # 5. Verify: rowcounts plus one point lookup query for the group
+            if deep_verify:
+                remaining = find_keys(cursor, tables)
+            else:
+                remaining = select_keys(cursor, "key", credential_keys)
+            unverified = {row[0] for row in remaining}
+            unverified.update(
+                index
+                for index, report in enumerate(reports)
+                if deleted_count.get(index, 0) != report["removed"]
+            )
+            step_started = lap("verify", step_started)
+
+            if compact:
+                for remover, report in zip(removers, reports):
+                    compacted = remover.compact_database()
+                    report["reclaimed_bytes"] = compacted["reclaimed_bytes"]
+                    if compacted["error"] and not report["error"]:
+                        report["error"] = f"compact: {compacted['error']}"
+                lap("compact", step_started)
+
+        for index, report in enumerate(reports):
+            if report["removed"] or report["history_removed"]:
+                report["status"] = "cleaned"
+            if index in unverified or report["error"]:
+                report["status"] = "warning"
+    except Exception as e:
+        if conn and not committed:
+            conn.rollback()
+            conn.close()
+            conn = None
+            for remover, report in zip(removers, reports):
+                remover.discard_journal(report["journal_path"])
+            return [
+                clean_database(db_path, include_history, backup_options)
+                for db_path in db_paths
+            ]
+        for report in reports:
+            report["status"] = "failed"
+            report["error"] = str(e)
+    finally:
+        if conn:
+            conn.close()
+
+    timings["total"] = round(time.perf_counter() - started, 4)
+    for report in reports:
+        report["timings"] = dict(timings)
+    return reports
+
+
+EDITOR_NAMES = ["Code", "Code - Insiders", "VSCodium", "Cursor"]
+
+
+def editor_config_roots():
+    """Return the directories that hold per-editor settings on this platform"""
+    if os.name == "nt":
+        return [os.environ.get("APPDATA") or os.path.expanduser("~/AppData/Roaming")]
+    if sys.platform == "darwin":
+        return [os.path.expanduser("~/Library/Application Support")]
+    return [os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")]
+
+
+def inventory_cache_path():
+    """Location of the cached database inventory (XDG cache directory)"""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(cache_home, "blackbox_logout", "inventory.json")
+
+
+def load_inventory_cache(cache_path):
+    """Read the inventory cache, an empty one if it is missing or corrupt"""
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+def save_inventory_cache(cache_path, cache):
+    """Write the inventory cache atomically (failures are not fatal)"""
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"[WARNING] Could not save inventory cache: {e}")
+
+
+def list_workspace_folders(storage_dir):
+    """Return the workspace folders of a workspaceStorage directory"""
+    try:
+        with os.scandir(storage_dir) as entries:
+            return [
+                entry.path
+                for entry in entries
+                if entry.is_dir(follow_symlinks=False)
+            ]
+    except OSError:
+        return []
+
+
+def discover_databases(use_cache=True, cache_path=None):
+    """Find the global and workspace state.vscdb files of every installed editor
+
+    workspaceStorage directories are listed with os.scandir in a thread pool.
+    The folder listing of a directory whose mtime has not changed since the
+    last run (no workspace added or removed) is taken from the inventory
+    cache instead. The state.vscdb of every folder is always checked in the
+    same pool, because an editor creates it inside an existing folder
+    without changing the directory mtime.
+    """
+    cache_path = cache_path or inventory_cache_path()
+    cache = load_inventory_cache(cache_path) if use_cache else {}
+    cached_storage = cache.get("storage", {})
+
+    databases = []
+    storage_dirs = []
+    for root in editor_config_roots():
+        for editor in EDITOR_NAMES:
+            user_dir = os.path.join(root, editor, "User")
+            global_db = os.path.join(user_dir, "globalStorage", "state.vscdb")
+            if os.path.isfile(global_db):
+                databases.append(
+                    {"editor": editor, "scope": "global", "path": global_db}
+                )
+            storage_dir = os.path.join(user_dir, "workspaceStorage")
+            try:
+                mtime_ns = os.stat(storage_dir).st_mtime_ns
+            except OSError:
+                continue
+            storage_dirs.append((editor, storage_dir, mtime_ns))
+
+    inventory = {}
+    stale = []
+    for editor, storage_dir, mtime_ns in storage_dirs:
+        entry = cached_storage.get(storage_dir)
+        if entry and entry.get("mtime_ns") == mtime_ns and "folders" in entry:
+            inventory[storage_dir] = entry
+        else:
+            stale.append((storage_dir, mtime_ns))
+
+    workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        if stale:
+            listings = pool.map(list_workspace_folders, [d for d, _ in stale])
+            for (storage_dir, mtime_ns), folders in zip(stale, listings):
+                inventory[storage_dir] = {"mtime_ns": mtime_ns, "folders": sorted(folders)}
+            save_inventory_cache(
+                cache_path,
+                {"updated_at": datetime.now().isoformat(), "storage": inventory},
+            )
+
+        candidates = [
+            (editor, os.path.join(folder, "state.vscdb"))
+            for editor, storage_dir, _ in storage_dirs
+            for folder in inventory[storage_dir]["folders"]
+        ]
+        found = pool.map(os.path.isfile, [path for _, path in candidates])
+        databases.extend(
+            {"editor": editor, "scope": "workspace", "path": path}
+            for (editor, path), exists in zip(candidates, found)
+            if exists
+        )
+    databases.sort(key=lambda entry: (entry["editor"], entry["scope"], entry["path"]))
+    return databases
+
+
+def print_inventory(databases):
+    """Show the discovered editor databases"""
+    global_count = sum(1 for entry in databases if entry["scope"] == "global")
+    print(
+        f"[DISCOVER] Found {len(databases)} databases "
+        f"({global_count} global, {len(databases) - global_count} workspace)"
+    )
+    for entry in databases:
+        print(f"   [{entry['editor']}] {entry['scope']:<9} {entry['path']}")
+
+
+def expand_database_paths(patterns):
+    """Expand file paths and glob patterns into a sorted list of databases"""
+    paths = set()
+    for pattern in patterns:
+        matches = glob.glob(os.path.expanduser(pattern), recursive=True)
+        if not matches and os.path.exists(pattern):
+            matches = [pattern]
+        paths.update(os.path.abspath(path) for path in matches if os.path.isfile(path))
+    return sorted(paths)
+
+
+def write_fleet_report(report, report_path):
+    """Save a fleet report as JSON or CSV, based on the file extension"""
+    if report_path.lower().endswith(".csv"):
+        timing_columns = [
+            "backup",
+            "analyze",
+            "remove",
+            "lock",
+            "verify",
+            "compact",
+            "total",
+        ]
+        columns = [
+            "path",
+            "status",
+            "removed",
+            "not_found",
+            "unclear",
+            "history_removed",
+            "reclaimed_bytes",
+            "backup_path",
+            "journal_path",
+            "error",
+        ]
+        with open(report_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns + [f"{step}_seconds" for step in timing_columns])
+            for entry in report["databases"]:
+                writer.writerow(
+                    [entry[column] for column in columns]
+                    + [entry["timings"].get(step, "") for step in timing_columns]
+                )
+    else:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def run_fleet(
+    patterns,
+    workers=None,
+    report_path=None,
+    include_history=True,
+    backup_options=None,
+    group_size=None,
+    renderer=None,
+):
+    """Clean many databases in parallel without prompts
+
+    With group_size, databases are cleaned in groups ATTACHed to one
+    connection (see clean_database_group); 0 means SQLite's attach limit.
+    Every database and the final summary go to renderer.
+    """
+    renderer = renderer or HumanRenderer()
+    db_paths = expand_database_paths(patterns)
+    if not db_paths:
+        print("[ERROR] No database files matched the given paths")
+        return None
+
+    if group_size is None:
+        groups = [[path] for path in db_paths]
+    else:
+        limit = attach_limit()
+        group_size = min(group_size or limit, limit)
+        groups = [
+            db_paths[start : start + group_size]
+            for start in range(0, len(db_paths), group_size)
+        ]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(groups)))
+    if group_size is None:
+        print(f"[FLEET] Cleaning {len(db_paths)} databases with {workers} workers")
+    else:
+        print(
+            f"[FLEET] Cleaning {len(db_paths)} databases in {len(groups)} groups "
+            f"of up to {group_size} with {workers} workers"
+        )
+
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for group in groups:
+            if group_size is None:
+                future = executor.submit(
+                    clean_database, group[0], include_history, backup_options
+                )
+            else:
+                future = executor.submit(
+                    clean_database_group, group, include_history, backup_options
+                )
+            futures[future] = group
+        for future in as_completed(futures):
+            try:
+                entries = future.result()
+                if group_size is None:
+                    entries = [entries]
+            except Exception as e:
+                entries = [
+                    new_fleet_entry(path, status="failed", error=str(e))
+                    for path in futures[future]
+                ]
+            for entry in entries:
+                results.append(entry)
+                renderer.fleet_entry(entry)
+
+    results.sort(key=lambda entry: entry["path"])
+    summary = {}
+    for entry in results:
+        summary[entry["status"]] = summary.get(entry["status"], 0) + 1
+
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "workers": workers,
+        "total_seconds": round(time.perf_counter() - started, 4),
+        "summary": summary,
+        "databases": results,
+    }
+
+    renderer.fleet_summary(report)
+    if report_path:
+        write_fleet_report(report, report_path)
+        print(f"[REPORT] Report saved to: {report_path}")
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="SAFE script for removing ONLY Blackbox credentials",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        fromfile_prefix_chars="@",
+        epilog="""
+Usage examples:
+  python blackbox_logout_en.py
+  python blackbox_logout_en.py /path/to/state.vscdb
+  python blackbox_logout_en.py --fleet "/home/*/.config/Cursor/User/globalStorage/state.vscdb"
+  python blackbox_logout_en.py --fleet @databases.txt --workers 8 --report report.csv
+  python blackbox_logout_en.py --discover
+  python blackbox_logout_en.py --discover --fleet --report report.csv
+  python blackbox_logout_en.py --discover --fleet --batch --report report.csv
+  python blackbox_logout_en.py state.vscdb --rules credential_rules.example.json
+  python blackbox_logout_en.py state.vscdb --watch --latency-budget 0.5 --stats watch.json
+        """,
+    )
+    parser.add_argument("db_path", nargs="?", help="Path to state.vscdb file")
+    parser.add_argument(
+        "--rules",
+        metavar="FILE",
+        help="Credential rules (.json or .toml) of the tools to log out (default: Blackbox)",
+    )
+    parser.add_argument(
+        "--fleet",
+        nargs="*",
+        metavar="PATH",
+        help="Clean many databases (paths or glob patterns) without prompts",
+    )
+    parser.add_argument(
+        "--discover",
+        action="store_true",
+        help="Find the global and workspace databases of Code, Code - Insiders, "
+        "VSCodium and Cursor (add --fleet to clean all of them)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Rescan editor folders instead of using the cached inventory",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Maximum number of parallel worker processes (default: CPU count)",
+    )
+    parser.add_argument(
+        "--batch",
+        nargs="?",
+        type=int,
+        const=0,
+        metavar="N",
+        help="Fleet mode: ATTACH up to N databases to one connection and commit "
+        "them together (default N: SQLite's attach limit)",
+    )
+    parser.add_argument(
+        "--report", metavar="FILE", help="Save fleet report to a .json or .csv file"
+    )
+    parser.add_argument(
+        "--no-history",
+        action="store_true",
+        help="Do not clean Blackbox entries from history in fleet, watch and plan mode",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and remove credentials again whenever they reappear",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=0.2,
+        metavar="SECONDS",
+        help="Watch mode: wait for writes to be quiet this long (default: 0.2)",
+    )
+    parser.add_argument(
+        "--latency-budget",
+        type=float,
+        default=1.0,
+        metavar="SECONDS",
+        help="Watch mode: maximum time from a write to the removal (default: 1.0)",
+    )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="Watch mode: poll the files instead of using inotify",
+    )
+    parser.add_argument(
+        "--stats",
+        metavar="FILE",
+        help="Watch mode: keep the counters up to date in this JSON file",
+    )
+    parser.add_argument(
+        "--atomic",
+        action="store_true",
+        help="Apply changes to a checked copy and rename it over the database "
+        "(editor must be closed)",
+    )
+    parser.add_argument(
+        "--snapshot",
+        action="store_true",
+        help="Also take a full compressed snapshot before changes",
+    )
+    parser.add_argument(
+        "--deep-verify",
+        action="store_true",
+        help="Verify by scanning all keys again instead of the removed keys only",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Reclaim the space freed by the removal (VACUUM) afterwards",
+    )
+    parser.add_argument(
+        "--backup-dir",
+        metavar="DIR",
+        help="Backup store directory (default: .vscdb_backups next to the database)",
+    )
+    parser.add_argument(
+        "--keep-backups", type=int, metavar="N", help="Keep only the N newest backups"
+    )
+    parser.add_argument(
+        "--keep-days", type=float, metavar="D", help="Delete backups older than D days"
+    )
+    parser.add_argument(
+        "--list-backups", action="store_true", help="List backups of the database"
+    )
+    parser.add_argument(
+        "--restore",
+        metavar="SNAPSHOT",
+        help="Restore the database from a backup ID (or 'latest')",
+    )
+    parser.add_argument(
+        "--undo",
+        metavar="JOURNAL",
+        help="Undo a removal from its journal (path, ID or 'latest')",
+    )
+    parser.add_argument(
+        "--output",
+        choices=sorted(RENDERERS),
+        default="human",
+        help="How results are shown: human (default), jsonl (JSON lines on "
+        "stdout, log on stderr) or silent",
+    )
+    parser.add_argument(
+        "--plan",
+        metavar="FILE",
+        help="Analyze without prompting and save the change plan to FILE, nothing is changed",
+    )
+    parser.add_argument(
+        "--apply",
+        metavar="FILE",
+        help="Apply a plan saved with --plan, refused if any value changed since",
+    )
+    args = parser.parse_args()
+
+    # Silent output hides the yes/no prompts too, which would then wait forever
+    prompts = args.restore or args.undo
+    unattended = args.fleet is not None or args.plan or args.apply or args.watch
+    if args.output == "silent" and (prompts or not (unattended or args.discover or args.list_backups)):
+        parser.error(
+            "--output silent needs a mode without prompts: "
+            "--fleet, --plan, --apply, --watch, --discover or --list-backups"
+        )
+    return args
+
 
 def main():
+    args = parse_args()
+
+    if args.output == "human":
+        run(args, HumanRenderer())
+        return
+
+    # stdout only carries rendered results; log lines go to stderr, or
+    # nowhere in silent mode
+    if args.output == "jsonl":
+        renderer = JsonLinesRenderer(sys.stdout)
+        with contextlib.redirect_stdout(sys.stderr):
+            run(args, renderer)
+    else:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            run(args, SilentRenderer())
+
+
+def run(args, renderer):
+    """Run the command line, rendering results with renderer"""
     print("=" * 80)
     print("[SAFE BLACKBOX CREDENTIAL REMOVER]")
     print("SAFE script for removing ONLY Blackbox credentials")
     print("=" * 80)
 
+    backup_options = {
+        "backup_dir": args.backup_dir,
+        "keep_backups": args.keep_backups,
+        "keep_days": args.keep_days,
+        "rules_path": args.rules,
+        "atomic": args.atomic,
+    }
+
+    if args.rules:
+        try:
+            rules = load_rules(args.rules)
+        except (OSError, ValueError, re.error) as e:
+            print(f"[ERROR] Invalid rules file {args.rules}: {e}")
+            return
+        tool_names = ", ".join(tool["name"] for tool in rules.tools)
+        print(f"[RULES] Loaded rules for: {tool_names}")
+
+    plan = None
+    if args.apply:
+        try:
+            plan = load_plan(args.apply)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] Invalid plan file {args.apply}: {e}")
+            return
+        # Without a path, apply to the database the plan was written for
+        if not args.db_path:
+            args.db_path = plan["database"]
+
+    discovered = []
+    if args.discover:
+        discovered = discover_databases(use_cache=not args.no_cache)
+        print_inventory(discovered)
+        if args.fleet is None:
+            return
+
+    if args.atomic and args.batch is not None:
+        print("[INFO] --atomic cleans every database on its own, --batch ignored")
+        args.batch = None
+
+    if args.fleet is not None:
+        run_fleet(
+            args.fleet + [entry["path"] for entry in discovered],
+            args.workers,
+            args.report,
+            not args.no_history,
+            dict(
+                backup_options,
+                snapshot=args.snapshot,
+                compact=args.compact,
+                deep_verify=args.deep_verify,
+            ),
+            args.batch,
+            renderer,
+        )
+        return
+
     # Only look for files in the same directory as the script
     script_dir = os.path.dirname(os.path.abspath(__file__))
     local_paths = [
@@ -308,8 +3317,8 @@ def main():
 
     # Determine database file
     db_path = None
-    if len(sys.argv) > 1:
-        provided_path = sys.argv[1]
+    if args.db_path:
+        provided_path = args.db_path
         if os.path.exists(provided_path):
             db_path = provided_path
         else:
@@ -325,15 +3334,59 @@ def main():
         print("[ERROR] state.vscdb file not found in script directory!")
         print("[INFO] This script only works with local files for security")
         print("[SOLUTION] Copy state.vscdb file to this directory first")
+        print("[TIP] Use --discover to find the editor databases of this user")
         return
 
     print(f"[DATABASE] Using file: {db_path}")
 
+    store = BackupStore(args.backup_dir or BackupStore.default_root(db_path))
+    if args.list_backups:
+        list_backups(store, db_path)
+        return
+    if args.restore:
+        restore_backup(store, db_path, args.restore)
+        return
+    if args.undo:
+        undo_journal(store, db_path, args.undo)
+        return
+    if args.plan:
+        write_plan(db_path, args.plan, not args.no_history, backup_options, renderer)
+        return
+    if plan:
+        apply_plan_file(
+            db_path,
+            plan,
+            backup_options,
+            snapshot=args.snapshot,
+            deep_verify=args.deep_verify,
+            compact=args.compact,
+            renderer=renderer,
+        )
+        return
+
+    if args.watch:
+        remover = SafeBlackboxCredentialRemover(
+            db_path, renderer=renderer, **backup_options
+        )
+        watcher = CredentialWatcher(
+            remover,
+            include_history=not args.no_history,
+            debounce=args.debounce,
+            latency_budget=args.latency_budget,
+            poll=args.poll,
+            stats_path=args.stats,
+        )
+        try:
+            watcher.run()
+        finally:
+            remover.close()
+        return
+
     # Warning for safe mode
     print("\n[SAFE MODE] Safe Mode Active:")
     print("1. Only removes VERIFIED Blackbox credentials")
     print("2. General Cursor data (history, UI, other extensions) will NOT be removed")
-    print("3. Automatic backup will be created")
+    print("3. Undo journal of every change will be saved (full backup with --snapshot)")
     print("4. Detailed analysis before removal")
 
     response = input("\nDo you want to continue with safe analysis? (yes/no): ").lower()
@@ -342,11 +3395,11 @@ def main():
         return
 
     # Initialize remover
-    remover = SafeBlackboxCredentialRemover(db_path)
+    remover = SafeBlackboxCredentialRemover(db_path, renderer=renderer, **backup_options)
 
     try:
-        # Create backup
-        if not remover.create_backup():
+        # Create full backup (the undo journal is always written)
+        if args.snapshot and not remover.create_backup():
             return
 
         # Connect to database
@@ -366,42 +3419,41 @@ def main():
 
         if non_credential_keys:
             print(f"\n[WARNING] Found {len(non_credential_keys)} UNCLEAR keys:")
-            for key in non_credential_keys:
-                print(f"   ❓ {key}")
+            for table, key in non_credential_keys:
+                print(f"   ❓ {format_key(table, key)}")
             print("[SAFE] These keys will NOT be removed for safety")
 
         if not credential_keys:
             print("\n[INFO] No clear credentials identified for removal")
             return
 
-        # Remove only credential keys
-        if remover.remove_safe_keys(credential_keys):
-            # Clean history (optional)
-            remover.cleanup_blackbox_history()
-
+        # Remove only credential keys (and history entries) in one transaction
+        result = remover.remove_safe_keys(credential_keys)
+        if result and not result["error"]:
             # Verify removal
-            success = remover.verify_removal()
+            success = remover.verify_removal(result, deep=args.deep_verify)
+
+            # Shrink the file so the editor loads a smaller state database
+            if args.compact:
+                remover.compact_database()
 
             if success:
                 print(
                     f"\n[COMPLETED] ✅ Blackbox credentials successfully removed safely!"
                 )
-                print(f"[BACKUP] Backup file saved at: {remover.backup_path}")
+                if remover.backup_path:
+                    print(f"[BACKUP] Backup file saved at: {remover.backup_path}")
+                if remover.journal_path:
+                    journal_id = os.path.basename(remover.journal_path)[:-5]
+                    print(
+                        f'[UNDO] To undo: python blackbox_logout_en.py "{db_path}" --undo {journal_id}'
+                    )
                 print(f"[CLEANED] Cleaned file: {db_path}")
 
-                print("\n[NEXT_STEPS] To apply changes to Cursor:")
-                print("1. Close Cursor/VSCode if still open")
-                print("2. Copy the cleaned file to original location:")
-                print(f"   FROM: {db_path}")
-                print(
-                    f"   TO: C:\\Users\\{os.getenv('USERNAME', 'Home')}\\AppData\\Roaming\\Cursor\\User\\globalStorage\\state.vscdb"
-                )
-                print("3. Open Cursor/VSCode")
-                print("4. Blackbox extension will appear in logged out state")
-
-                print("\n[COPY COMMAND]:")
-                original_location = f"C:\\Users\\{os.getenv('USERNAME', 'Home')}\\AppData\\Roaming\\Cursor\\User\\globalStorage\\state.vscdb"
-                print(f'   copy "{db_path}" "{original_location}"')
+                print("\n[NEXT_STEPS] Changes are already applied to the database:")
+                print("1. No need to close Cursor/VSCode or copy files back")
+                print("2. Blackbox extension will appear in logged out state")
+                print("3. If the editor is open, run 'Developer: Reload Window' once")
 
     except Exception as e:
         print(f"[ERROR] An error occurred: {e}")
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 Script sederhana untuk membaca file state.vscdb dengan cepat
-Penggunaan: python quick_reader.py [path_ke_file] [kata_kunci_pencarian]
+Penggunaan: python quick_reader.py [path_ke_file] [kata_kunci_pencarian] [--index]
 """
 
 import sqlite3
@@ -9,9 +9,21 @@ import json
 import sys
 import os
 
+try:
+    from vscdb_converter import open_search_index, preview_json, preview_select
+except ImportError:  # vscdb_converter.py tidak ada di samping script ini: tanpa --index, preview penuh
+    open_search_index = preview_json = preview_select = None
 
-def format_json_value(value):
-    """Format nilai JSON agar lebih mudah dibaca"""
+
+def format_json_value(value, max_length=None):
+    """Format nilai JSON agar lebih mudah dibaca
+
+    Dengan max_length dan vscdb_converter.py di sebelah script ini, hanya
+    sekitar max_length karakter yang diformat (lihat preview_json di sana).
+    """
+    if max_length and preview_json and isinstance(value, str):
+        formatted = preview_json(value, max_length)
+        return value if formatted is None else formatted
     try:
         if isinstance(value, str) and value.strip().startswith(("{", "[")):
             parsed = json.loads(value)
@@ -21,7 +33,7 @@ def format_json_value(value):
     return str(value)
 
 
-def read_vscdb_file(file_path, search_term=None):
+def read_vscdb_file(file_path, search_term=None, use_index=False):
     """Baca file state.vscdb dan tampilkan dalam format yang mudah dibaca"""
 
     if not os.path.exists(file_path):
@@ -37,6 +49,14 @@ def read_vscdb_file(file_path, search_term=None):
         print(f"[SIZE] Ukuran: {os.path.getsize(file_path):,} bytes")
         print("=" * 80)
 
+        # Cari lewat index sidecar vscdb_converter.py jika diminta
+        search_index = None
+        if search_term and use_index:
+            if open_search_index:
+                search_index = open_search_index(file_path)
+            else:
+                print("[WARNING] --index membutuhkan vscdb_converter.py, mencari tanpa index")
+
         # Dapatkan daftar tabel
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
         tables = [table[0] for table in cursor.fetchall()]
@@ -56,16 +76,26 @@ def read_vscdb_file(file_path, search_term=None):
             # Dapatkan struktur kolom
             cursor.execute(f"PRAGMA table_info({table_name})")
             columns = [col[1] for col in cursor.fetchall()]
+            # Value teks yang panjang hanya dibaca sejauh yang ditampilkan preview
+            select = preview_select(columns) if preview_select else "*"
 
             # Query data
             if search_term:
                 # Cari berdasarkan kata kunci
                 conditions = []
                 for col in columns:
-                    conditions.append(f"LOWER({col}) LIKE LOWER('%{search_term}%')")
-                query = f"SELECT * FROM {table_name} WHERE {' OR '.join(conditions)}"
-                cursor.execute(query)
-                rows = cursor.fetchall()
+                    conditions.append(f"LOWER({col}) LIKE LOWER(?)")
+                condition = " OR ".join(conditions)
+                params = [f"%{search_term}%"] * len(columns)
+                rows = None
+                if search_index:
+                    rows = search_index.search(
+                        table_name, search_term, condition, params, select
+                    )
+                if rows is None:
+                    query = f"SELECT {select} FROM {table_name} WHERE {condition}"
+                    cursor.execute(query, params)
+                    rows = cursor.fetchall()
 
                 if rows:
                     print(
@@ -76,7 +106,7 @@ def read_vscdb_file(file_path, search_term=None):
                     continue
             else:
                 # Ambil semua data (maksimal 20 record untuk preview)
-                cursor.execute(f"SELECT * FROM {table_name} LIMIT 20")
+                cursor.execute(f"SELECT {select} FROM {table_name} LIMIT 20")
                 rows = cursor.fetchall()
                 if len(rows) == 20:
                     print("[PREVIEW] Menampilkan 20 record pertama:")
@@ -93,7 +123,7 @@ def read_vscdb_file(file_path, search_term=None):
                         print(f"   {col_name}: NULL")
                     elif len(str(value)) > 200:
                         # Untuk nilai yang panjang, coba format sebagai JSON
-                        formatted_value = format_json_value(value)
+                        formatted_value = format_json_value(value, 500)
                         if len(formatted_value) > 500:
                             print(f"   {col_name}: {formatted_value[:500]}...")
                             print("   [DIPOTONG - terlalu panjang]")
@@ -105,6 +135,8 @@ def read_vscdb_file(file_path, search_term=None):
                         print(f"   {col_name}: {value}")
 
         conn.close()
+        if search_index:
+            search_index.close()
         print(f"\n[DONE] Selesai membaca file {file_path}")
 
     except Exception as e:
@@ -120,10 +152,20 @@ def main():
         "./state.vscdb",
         "./state(2).vscdb",
     ]
+    # Global storage Cursor, VS Code dan VSCodium di Linux (XDG)
+    config_home = os.getenv("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    for editor in ("Cursor", "Code", "Code - Insiders", "VSCodium"):
+        default_paths.append(
+            os.path.join(config_home, editor, "User", "globalStorage", "state.vscdb")
+        )
+
+    # --index boleh di posisi mana saja; sisanya posisional
+    use_index = "--index" in sys.argv[1:]
+    args = [arg for arg in sys.argv[1:] if arg != "--index"]
 
     # Tentukan file path
-    if len(sys.argv) > 1:
-        file_path = sys.argv[1]
+    if len(args) > 0:
+        file_path = args[0]
     else:
         file_path = None
         for path in default_paths:
@@ -134,7 +176,7 @@ def main():
         if not file_path:
             print("[SEARCH] File state.vscdb tidak ditemukan di lokasi default.")
             print(
-                "[USAGE] Penggunaan: python quick_reader.py [path_ke_file] [kata_kunci]"
+                "[USAGE] Penggunaan: python quick_reader.py [path_ke_file] [kata_kunci] [--index]"
             )
             print("\n[PATHS] Lokasi yang dicoba:")
             for path in default_paths:
@@ -142,7 +184,7 @@ def main():
             return
 
     # Tentukan kata kunci pencarian
-    search_term = sys.argv[2] if len(sys.argv) > 2 else None
+    search_term = args[1] if len(args) > 1 else None
 
     if search_term:
         print(f"[SEARCH] Mencari data yang mengandung: '{search_term}'")
@@ -150,7 +192,7 @@ def main():
         print("[PREVIEW] Membaca semua data (preview)")
 
     # Baca file
-    read_vscdb_file(file_path, search_term)
+    read_vscdb_file(file_path, search_term, use_index)
 
 
 if __name__ == "__main__":
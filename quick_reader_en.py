@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 Simple script for quickly reading state.vscdb files
-Usage: python quick_reader_en.py [path_to_file] [search_keyword]
+Usage: python quick_reader_en.py [path_to_file] [search_keyword] [--index]
 """
 
 import sqlite3
@@ -9,9 +9,21 @@ import json
 import sys
 import os
 
+try:
+    from vscdb_converter_en import open_search_index, preview_json, preview_select
+except ImportError:  # vscdb_converter_en.py is not next to this script: no --index, full previews
+    open_search_index = preview_json = preview_select = None
 
-def format_json_value(value):
-    """Format JSON values for better readability"""
+
+def format_json_value(value, max_length=None):
+    """Format JSON values for better readability
+
+    With max_length and vscdb_converter_en.py next to this script, only
+    about max_length characters are formatted (see preview_json there).
+    """
+    if max_length and preview_json and isinstance(value, str):
+        formatted = preview_json(value, max_length)
+        return value if formatted is None else formatted
     try:
         if isinstance(value, str) and value.strip().startswith(("{", "[")):
             parsed = json.loads(value)
@@ -21,7 +33,7 @@ def format_json_value(value):
     return str(value)
 
 
-def read_vscdb_file(file_path, search_term=None):
+def read_vscdb_file(file_path, search_term=None, use_index=False):
     """Read state.vscdb file and display in an easy-to-read format"""
 
     if not os.path.exists(file_path):
@@ -37,6 +49,14 @@ def read_vscdb_file(file_path, search_term=None):
         print(f"[SIZE] Size: {os.path.getsize(file_path):,} bytes")
         print("=" * 80)
 
+        # Search through the sidecar index of vscdb_converter_en.py if asked
+        search_index = None
+        if search_term and use_index:
+            if open_search_index:
+                search_index = open_search_index(file_path)
+            else:
+                print("[WARNING] --index needs vscdb_converter_en.py, searching without it")
+
         # Get list of tables
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
         tables = [table[0] for table in cursor.fetchall()]
@@ -56,16 +76,26 @@ def read_vscdb_file(file_path, search_term=None):
             # Get column structure
             cursor.execute(f"PRAGMA table_info({table_name})")
             columns = [col[1] for col in cursor.fetchall()]
+            # Long text values are only read as far as the preview shows
+            select = preview_select(columns) if preview_select else "*"
 
             # Query data
             if search_term:
                 # Search by keyword
                 conditions = []
                 for col in columns:
-                    conditions.append(f"LOWER({col}) LIKE LOWER('%{search_term}%')")
-                query = f"SELECT * FROM {table_name} WHERE {' OR '.join(conditions)}"
-                cursor.execute(query)
-                rows = cursor.fetchall()
+                    conditions.append(f"LOWER({col}) LIKE LOWER(?)")
+                condition = " OR ".join(conditions)
+                params = [f"%{search_term}%"] * len(columns)
+                rows = None
+                if search_index:
+                    rows = search_index.search(
+                        table_name, search_term, condition, params, select
+                    )
+                if rows is None:
+                    query = f"SELECT {select} FROM {table_name} WHERE {condition}"
+                    cursor.execute(query, params)
+                    rows = cursor.fetchall()
 
                 if rows:
                     print(f"[SEARCH] Found {len(rows)} results for '{search_term}':")
@@ -74,7 +104,7 @@ def read_vscdb_file(file_path, search_term=None):
                     continue
             else:
                 # Get all data (maximum 20 records for preview)
-                cursor.execute(f"SELECT * FROM {table_name} LIMIT 20")
+                cursor.execute(f"SELECT {select} FROM {table_name} LIMIT 20")
                 rows = cursor.fetchall()
                 if len(rows) == 20:
                     print("[PREVIEW] Showing first 20 records:")
@@ -91,7 +121,7 @@ def read_vscdb_file(file_path, search_term=None):
                         print(f"   {col_name}: NULL")
                     elif len(str(value)) > 200:
                         # For long values, try to format as JSON
-                        formatted_value = format_json_value(value)
+                        formatted_value = format_json_value(value, 500)
                         if len(formatted_value) > 500:
                             print(f"   {col_name}: {formatted_value[:500]}...")
                             print("   [TRUNCATED - too long]")
@@ -103,6 +133,8 @@ def read_vscdb_file(file_path, search_term=None):
                         print(f"   {col_name}: {value}")
 
         conn.close()
+        if search_index:
+            search_index.close()
         print(f"\n[DONE] Finished reading file {file_path}")
 
     except Exception as e:
@@ -118,10 +150,20 @@ def main():
         "./state.vscdb",
         "./state(2).vscdb",
     ]
+    # Global storage of Cursor, VS Code and VSCodium on Linux (XDG)
+    config_home = os.getenv("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    for editor in ("Cursor", "Code", "Code - Insiders", "VSCodium"):
+        default_paths.append(
+            os.path.join(config_home, editor, "User", "globalStorage", "state.vscdb")
+        )
+
+    # --index can appear anywhere; the rest are positional
+    use_index = "--index" in sys.argv[1:]
+    args = [arg for arg in sys.argv[1:] if arg != "--index"]
 
     # Determine file path
-    if len(sys.argv) > 1:
-        file_path = sys.argv[1]
+    if len(args) > 0:
+        file_path = args[0]
     else:
         file_path = None
         for path in default_paths:
@@ -131,14 +173,16 @@ def main():
 
         if not file_path:
             print("[SEARCH] state.vscdb file not found in default locations.")
-            print("[USAGE] Usage: python quick_reader_en.py [path_to_file] [keyword]")
+            print(
+                "[USAGE] Usage: python quick_reader_en.py [path_to_file] [keyword] [--index]"
+            )
             print("\n[PATHS] Locations tried:")
             for path in default_paths:
                 print(f"   - {path}")
             return
 
     # Determine search keyword
-    search_term = sys.argv[2] if len(sys.argv) > 2 else None
+    search_term = args[1] if len(args) > 1 else None
 
     if search_term:
         print(f"[SEARCH] Searching for data containing: '{search_term}'")
@@ -146,7 +190,7 @@ def main():
         print("[PREVIEW] Reading all data (preview)")
 
     # Read file
-    read_vscdb_file(file_path, search_term)
+    read_vscdb_file(file_path, search_term, use_index)
 
 
 if __name__ == "__main__":
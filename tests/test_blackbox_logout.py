@@ -0,0 +1,260 @@
+"""
+Tests for blackbox_logout_en.py: history filtering, undo journals and change plans
+Usage: python -m pytest -q tests
+"""
+
+import json
+import os
+import random
+import shutil
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blackbox_logout_en import (
+    CredentialRules,
+    SafeBlackboxCredentialRemover,
+    filter_history_value,
+    load_plan,
+    undo_journal,
+)
+
+PATTERNS = ["blackbox", "blackboxai", "blackboxapp"]
+
+
+def history_entries(seed, count=200):
+    """Random history entries and whether each one should be removed"""
+    rng = random.Random(seed)
+    entries = []
+    for index in range(count):
+        name = rng.choice(["project", "BlackBoxAI-dev", "notes", "Blackboxapp", "ünïcode"])
+        field = rng.choice(["folderUri", "fileUri", "workspace"])
+        uri = f"file:///home/user/{name}/{index}"
+        if field == "workspace":
+            entry = {"workspace": {"id": str(index), "configPath": uri}}
+        else:
+            entry = {field: uri, "label": f"entry \"{index}\"\n"}
+        entries.append((entry, "blackbox" in name.lower()))
+    return entries
+
+
+def make_database(path, rows):
+    """Create a state.vscdb-like database holding (key, value) rows"""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE ItemTable (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
+    conn.executemany("INSERT INTO ItemTable VALUES (?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def read_rows(path):
+    """All (key, value) rows of ItemTable, sorted by key"""
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT key, value FROM ItemTable ORDER BY key").fetchall()
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def database(tmp_path):
+    """A database with Blackbox credentials, other keys and a history list"""
+    entries = history_entries(seed=1, count=20)
+    path = str(tmp_path / "state.vscdb")
+    make_database(
+        path,
+        [
+            ("Blackboxapp.blackboxagent", '{"userId": "1", "apiProvider": "x"}'),
+            ("memento/webviewView.blackboxai-dev.chat", "{}"),
+            ("workbench.panel.state", '{"open": true}'),
+            (
+                "history.recentlyOpenedPathsList",
+                json.dumps({"entries": [entry for entry, _ in entries]}),
+            ),
+        ],
+    )
+    return path
+
+
+def open_remover(path, tmp_path):
+    remover = SafeBlackboxCredentialRemover(path, backup_dir=str(tmp_path / "backups"))
+    assert remover.connect()
+    return remover
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("wrapped", [True, False])
+def test_filter_history_matches_json_round_trip(seed, indent, wrapped):
+    entries = history_entries(seed)
+    data = [entry for entry, _ in entries]
+    if wrapped:
+        data = {"version": 1, "entries": data, "after": ["kept"]}
+    text = json.dumps(data, indent=indent, ensure_ascii=seed % 2 == 0)
+
+    new_text, removed = filter_history_value(text, PATTERNS)
+
+    kept = [entry for entry, drop in entries if not drop]
+    expected = {"version": 1, "entries": kept, "after": ["kept"]} if wrapped else kept
+    assert new_text == json.dumps(expected, indent=indent, ensure_ascii=seed % 2 == 0)
+    assert len(removed) == sum(drop for _, drop in entries)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        (
+            '{"entries":[{"folderUri":"file:///a/blackbox"},{"fileUri":"file:///b"},'
+            '{"workspace":{"id":"1","configPath":"file:///c/BlackBoxAI/x"}},'
+            '{"folderUri":"file:///d"}],"v":1}',
+            '{"entries":[{"fileUri":"file:///b"},{"folderUri":"file:///d"}],"v":1}',
+        ),
+        (
+            '[\n  {"folderUri": "file:///b"},\n  {"folderUri": "file:///c"},\n'
+            '  {"fileUri": "file:///Blackboxapp/d"}\n]\n',
+            '[\n  {"folderUri": "file:///b"},\n  {"folderUri": "file:///c"}\n]\n',
+        ),
+    ],
+)
+def test_filter_history_without_escapes_keeps_the_rest_of_the_text(text, expected):
+    assert "\\" not in text
+    new_text, removed = filter_history_value(text, PATTERNS)
+    assert new_text == expected
+    assert all("blackbox" in uri.lower() for uri in removed)
+
+
+def test_filter_history_without_matches_keeps_the_value():
+    text = json.dumps({"entries": [{"folderUri": "file:///home/user/project"}]})
+    assert filter_history_value(text, PATTERNS) == (None, [])
+
+
+def test_filter_history_rejects_other_values():
+    with pytest.raises(ValueError):
+        filter_history_value('{"entries": {"folderUri": "blackbox"}}', PATTERNS)
+
+
+def test_key_discovery_matches_the_rules(tmp_path):
+    rng = random.Random(0)
+    keys = {
+        "".join(rng.choice("gitGIT.coCO-xX'%_") for _ in range(rng.randint(1, 10)))
+        for _ in range(5000)
+    }
+    keys |= {"GIT.co.x", "git.co", "memento/Git.Co.x", "x-Git.co", "a'b%c"}
+    path = str(tmp_path / "keys.vscdb")
+    make_database(path, [(key, "{}") for key in keys])
+    rules = CredentialRules(
+        {
+            "tools": [
+                {
+                    "name": "Tool",
+                    "keys": [
+                        {"prefix": "git.co"},
+                        {"prefix": "a'b%"},
+                        {"contains": "-git"},
+                        {"glob": "o?.*"},
+                    ],
+                }
+            ]
+        }
+    )
+    remover = open_remover(path, tmp_path)
+    remover.rules = rules
+    found = [key for _, key in remover.find_safe_blackbox_keys()]
+    remover.close()
+
+    assert not rules.needs_scan
+    assert found == sorted(key for key in keys if rules.match_tool(key))
+    assert "GIT.co.x" in found and "x-Git.co" in found and "a'b%c" in found
+    assert "memento/Git.Co.x" not in found
+
+
+def test_undo_journal_restores_removed_rows(database, tmp_path):
+    before = read_rows(database)
+    remover = open_remover(database, tmp_path)
+    keys = remover.find_safe_blackbox_keys()
+    result = remover.apply_removal(keys, remover.find_blackbox_history())
+    remover.close()
+
+    assert result["error"] is None
+    assert len(result["removed"]) == 2
+    assert result["history_removed"]
+    assert read_rows(database) != before
+    if os.name == "posix":
+        assert os.stat(result["journal_path"]).st_mode & 0o777 == 0o600
+
+    with open(result["journal_path"], encoding="utf-8") as f:
+        journal = json.load(f)
+    remover = open_remover(database, tmp_path)
+    undo = remover.apply_journal(journal)
+    remover.close()
+
+    assert undo["error"] is None and not undo["conflicts"]
+    assert read_rows(database) == before
+
+
+def test_undo_journal_refuses_another_database(database, tmp_path, monkeypatch):
+    remover = open_remover(database, tmp_path)
+    keys = remover.find_safe_blackbox_keys()
+    result = remover.apply_removal(keys, remover.find_blackbox_history())
+    remover.close()
+    other = str(tmp_path / "other.vscdb")
+    shutil.copyfile(database, other)
+    before = read_rows(other)
+
+    monkeypatch.setattr("builtins.input", lambda prompt: pytest.fail(prompt))
+    assert not undo_journal(remover.backup_store, other, result["journal_path"])
+    assert read_rows(other) == before
+
+
+def test_stale_plan_is_refused(database, tmp_path):
+    remover = open_remover(database, tmp_path)
+    keys = remover.find_safe_blackbox_keys()
+    plan = remover.build_plan(keys, [], remover.find_blackbox_history())
+
+    conn = sqlite3.connect(database)
+    conn.execute(
+        "UPDATE ItemTable SET value = '{\"userId\": \"2\"}' "
+        "WHERE key = 'Blackboxapp.blackboxagent'"
+    )
+    conn.commit()
+    conn.close()
+    before = read_rows(database)
+
+    result = remover.apply_plan(plan)
+    remover.close()
+
+    assert result["stale"] == ["Blackboxapp.blackboxagent"]
+    assert result["journal_path"] is None
+    assert read_rows(database) == before
+    assert remover.backup_store.list_journals(database) == []
+
+
+def test_load_plan_requires_every_field(database, tmp_path):
+    remover = open_remover(database, tmp_path)
+    plan = remover.build_plan(remover.find_safe_blackbox_keys(), [], None)
+    remover.close()
+    del plan["created_at"]
+    plan_path = tmp_path / "plan.json"
+    plan_path.write_text(json.dumps(plan), encoding="utf-8")
+
+    with pytest.raises(ValueError, match="created_at"):
+        load_plan(str(plan_path))
+
+
+@pytest.mark.skipif(os.name != "posix", reason="POSIX file modes")
+def test_backup_store_is_private(database, tmp_path):
+    remover = open_remover(database, tmp_path)
+    manifest = remover.backup_store.snapshot(database)
+    remover.close()
+
+    store = remover.backup_store
+    for path in (store.root, store.objects_dir, store.snapshots_dir):
+        assert os.stat(path).st_mode & 0o777 == 0o700
+    for path in (
+        store.object_path(manifest["object"]),
+        os.path.join(store.snapshots_dir, f"{manifest['id']}.json"),
+    ):
+        assert os.stat(path).st_mode & 0o777 == 0o600
@@ -0,0 +1,183 @@
+"""
+Tests for vscdb_converter_en.py: the sidecar search index and value previews
+Usage: python -m pytest -q tests
+"""
+
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vscdb_converter_en import (
+    PREVIEW_PREFIX_CHARS,
+    VSCDBConverter,
+    export_shard,
+    preview_json,
+    preview_select,
+)
+
+TERMS = ["blackbox", "BlackBox", "bubble:1", "userId", "é", "new value", "zzz", "%", "b_b", "k"]
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """A state.vscdb-like database; the search index goes to tmp_path"""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    path = str(tmp_path / "state.vscdb")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE ItemTable (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
+    conn.execute("CREATE TABLE cursorDiskKV (key TEXT UNIQUE ON CONFLICT REPLACE, value BLOB)")
+    conn.executemany(
+        "INSERT INTO ItemTable VALUES (?, ?)",
+        [
+            ("Blackboxapp.blackboxagent", '{"userId": "1"}'),
+            ("k1", '{"a": [1, 2, {"b": "é"}]}'),
+            ("k2", b"\x00\x01blob"),
+            ("k3", None),
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO cursorDiskKV VALUES (?, ?)",
+        [
+            (f"bubble:{i}", json.dumps({"i": i, "t": "blackbox" if i % 7 == 0 else "x"}))
+            for i in range(500)
+        ],
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+def search_everything(path, use_index):
+    """Search results of every term in every table, with or without the index"""
+    converter = VSCDBConverter(path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        converter.connect()
+        if use_index and not converter.open_search_index():
+            pytest.skip("SQLite without FTS5 trigram tokenizer")
+    try:
+        return {
+            (table, term): sorted(converter.search_data(table, term), key=repr)
+            for table in converter.get_tables()
+            for term in TERMS
+        }
+    finally:
+        converter.close()
+
+
+def assert_index_matches_scan(path):
+    assert search_everything(path, use_index=True) == search_everything(path, use_index=False)
+
+
+def change(path, *statements):
+    conn = sqlite3.connect(path)
+    for statement in statements:
+        conn.execute(statement)
+    conn.commit()
+    conn.close()
+
+
+def test_index_search_matches_scan_after_changes(database):
+    assert_index_matches_scan(database)
+
+    change(
+        database,
+        "INSERT INTO cursorDiskKV VALUES ('bubble:1', '{\"t\": \"BlackBox new value\"}')",
+        "DELETE FROM ItemTable WHERE key = 'k1'",
+    )
+    assert_index_matches_scan(database)
+
+    change(database, "DELETE FROM cursorDiskKV WHERE rowid % 2 = 0")
+    assert_index_matches_scan(database)
+
+    # In place, same length: the rowid and the size stay the same
+    change(database, "UPDATE cursorDiskKV SET value = replace(value, '\"x\"', '\"zzz\"')")
+    change(database, "UPDATE cursorDiskKV SET value = replace(value, '\"blackbox\"', '\"xxxxxxxx\"')")
+    assert_index_matches_scan(database)
+
+    # The max rowid is deleted and handed out again in the same commit
+    change(
+        database,
+        "DELETE FROM ItemTable WHERE rowid = (SELECT max(rowid) FROM ItemTable)",
+        "INSERT INTO ItemTable VALUES ('reused', 'blackbox new value')",
+    )
+    assert_index_matches_scan(database)
+
+    # Same size, changed only at one end of a long value
+    change(database, f"INSERT INTO ItemTable VALUES ('long', '{'x' * 10000}blackbox!')")
+    assert_index_matches_scan(database)
+    change(database, "UPDATE ItemTable SET value = replace(value, 'blackbox!', 'new value') WHERE key = 'long'")
+    assert_index_matches_scan(database)
+
+
+def test_export_shard_quotes_the_table_name(tmp_path):
+    path = str(tmp_path / "odd.vscdb")
+    table = 'odd "table" name'
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE "odd ""table"" name" (key TEXT, value BLOB)')
+    conn.executemany('INSERT INTO "odd ""table"" name" VALUES (?, ?)', [(f"k{i}", "v") for i in range(5)])
+    conn.commit()
+    conn.close()
+
+    converter = VSCDBConverter(path)
+    with contextlib.redirect_stdout(io.StringIO()):
+        converter.connect()
+    try:
+        shards = converter.plan_shards(table, 2)
+    finally:
+        converter.close()
+    assert shards == [(None, 2), (2, 4), (4, None)]
+
+    part_path = tmp_path / "odd.part"
+    count = export_shard(
+        {
+            "db_path": path,
+            "table": table,
+            "columns": ["key", "value"],
+            "low": 2,
+            "high": None,
+            "condition": None,
+            "condition_params": [],
+            "output_format": "jsonl",
+            "compress": None,
+            "header": None,
+            "pretty": False,
+            "part_path": str(part_path),
+        }
+    )
+    lines = [json.loads(line) for line in part_path.read_text(encoding="utf-8").splitlines()]
+    assert count == 3
+    assert [line["data"]["key"] for line in lines] == ["k2", "k3", "k4"]
+    assert {line["table"] for line in lines} == {table}
+
+
+@pytest.mark.parametrize("size", [10, 1000, 20000])
+def test_preview_json_is_a_prefix_of_the_full_format(size):
+    data = {"items": [{"id": i, "text": f"é \"{i}\"\n", "n": [1.5, -0.0, None]} for i in range(size)]}
+    text = json.dumps(data)
+    full = json.dumps(data, indent=2, ensure_ascii=False)
+
+    preview = preview_json(text, 100)
+
+    assert full.startswith(preview)
+    assert len(preview) > 100 or preview == full
+
+
+def test_preview_select_bounds_text_and_blob_values(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "values.db"))
+    conn.execute("CREATE TABLE t (text_value, blob_value, number)")
+    conn.execute("INSERT INTO t VALUES (?, ?, 7)", ("é" * 100000, b"\x00" * 100000))
+    text_value, blob_value, number = conn.execute(
+        f"SELECT {preview_select(['text_value', 'blob_value', 'number'])} FROM t"
+    ).fetchone()
+    conn.close()
+
+    assert text_value == "é" * (PREVIEW_PREFIX_CHARS + 1)
+    assert blob_value == b"\x00" * (PREVIEW_PREFIX_CHARS + 1)
+    assert number == 7
@@ -7,21 +7,930 @@ Author: AI Assistant
 import sqlite3
 import json
 import argparse
+import bz2
+import contextlib
+import csv
+import functools
+import gzip
+import hashlib
+import io
+import itertools
+import lzma
 import os
+import re
+import shlex
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from json.decoder import WHITESPACE, scanstring
+from json.scanner import NUMBER_RE
 from pathlib import Path
+from urllib.request import pathname2url
 import sys
 
 
+# Jumlah baris yang diambil per putaran saat export; memory dibatasi
+# sebanyak record ini, sebesar apa pun databasenya
+EXPORT_CHUNK_ROWS = 500
+
+# Format untuk --export: satu dokumen JSON, JSON Lines (satu record per
+# baris, siap untuk grep, split atau dimuat paralel) dan CSV
+EXPORT_FORMATS = ["json", "jsonl", "csv"]
+
+# Compressor untuk --compress, semuanya dari standard library, beserta
+# suffix yang ditambahkan ke nama output. gzip memakai level 6 seperti
+# gzip(1); default 9 beberapa kali lebih lambat demi beberapa persen saja
+COMPRESSORS = {
+    "gzip": (lambda *args, **kwargs: gzip.open(*args, compresslevel=6, **kwargs), ".gz"),
+    "xz": (lzma.open, ".xz"),
+    "bz2": (bz2.open, ".bz2"),
+}
+
+# Export paralel membagi tabel menjadi rentang rowid, sekitar sebanyak ini
+# per worker agar semua worker selesai berdekatan, tetapi tidak pernah lebih
+# kecil dari EXPORT_SHARD_MIN_ROWS baris, di bawahnya satu part lebih mahal
+# daripada manfaatnya
+SHARDS_PER_WORKER = 4
+EXPORT_SHARD_MIN_ROWS = 20000
+
+# Dinaikkan jika susunan index pencarian sidecar berubah; index dengan
+# versi lain dibangun ulang
+SEARCH_INDEX_VERSION = 3
+
+# Byte dari awal dan dari akhir setiap kolom yang membentuk tanda
+# perubahan sebuah baris yang diindex, bersama ukuran barisnya
+SIGNATURE_EDGE_BYTES = 16
+
+# Jumlah karakter value yang dipakai untuk membuat preview (bytes untuk BLOB).
+# Value yang lebih panjang hanya dibaca sejauh ini (substr() di query
+# tampilan), dan teks diformat oleh tokenizer yang berhenti begitu preview
+# sudah cukup panjang
+PREVIEW_PREFIX_CHARS = 8192
+
+
+def iter_indented_json(text, complete=True):
+    """Hasilkan json.dumps(json.loads(text), indent=2, ensure_ascii=False) per potongan
+
+    text hanya di-tokenize sejauh potongan yang diambil, sehingga berhenti
+    lebih awal hanya membayar yang sudah dibaca. Melempar ValueError di
+    tempat json.loads gagal, kecuali key duplikat yang semuanya dipertahankan.
+    Dengan complete=False text adalah awal dari value yang lebih panjang:
+    string yang terpotong di ujungnya dihasilkan sejauh yang ada sebelum
+    ValueError dilempar.
+    """
+    skip = WHITESPACE.match
+    pos = skip(text, 0).end()
+    closers = []
+    expect_key = False
+    while True:
+        if expect_key:
+            if text[pos : pos + 1] != '"':
+                raise ValueError(f"Diharapkan nama property di {pos}")
+            try:
+                key, pos = scanstring(text, pos + 1)
+            except ValueError:
+                if complete:
+                    raise
+                yield json.dumps(partial_string(text, pos + 1), ensure_ascii=False)[:-1]
+                raise
+            yield json.dumps(key, ensure_ascii=False) + ": "
+            pos = skip(text, pos).end()
+            if text[pos : pos + 1] != ":":
+                raise ValueError(f"Diharapkan ':' di {pos}")
+            pos = skip(text, pos + 1).end()
+            expect_key = False
+
+        char = text[pos : pos + 1]
+        if char in ("{", "["):
+            closer = "}" if char == "{" else "]"
+            pos = skip(text, pos + 1).end()
+            if pos == len(text):
+                raise ValueError(f"Diharapkan value di {pos}")
+            if text[pos : pos + 1] == closer:
+                pos += 1
+                yield char + closer
+            else:
+                closers.append(closer)
+                yield char + "\n" + "  " * len(closers)
+                expect_key = closer == "}"
+                continue
+        elif char == '"':
+            try:
+                string, pos = scanstring(text, pos + 1)
+            except ValueError:
+                if complete:
+                    raise
+                yield json.dumps(partial_string(text, pos + 1), ensure_ascii=False)[:-1]
+                raise
+            yield json.dumps(string, ensure_ascii=False)
+        else:
+            for literal in ("null", "true", "false"):
+                if text.startswith(literal, pos):
+                    pos += len(literal)
+                    yield literal
+                    break
+            else:
+                match = NUMBER_RE.match(text, pos)
+                # Angka yang menyentuh ujung text mungkin berlanjut setelahnya
+                if (
+                    match
+                    and text[match.end() : match.end() + 1] not in (".", "e", "E")
+                    and (complete or match.end() < len(text))
+                ):
+                    integer, frac, exp = match.groups()
+                    if frac or exp:
+                        number = float(integer + (frac or "") + (exp or ""))
+                    else:
+                        number = int(integer)
+                    pos = match.end()
+                    yield json.dumps(number)
+                else:
+                    for literal in ("NaN", "Infinity", "-Infinity"):
+                        if text.startswith(literal, pos):
+                            pos += len(literal)
+                            yield literal
+                            break
+                    else:
+                        raise ValueError(f"Diharapkan value di {pos}")
+
+        # Setelah value: item berikutnya, akhir container, atau akhir teks
+        while True:
+            pos = skip(text, pos).end()
+            if not closers:
+                if pos != len(text):
+                    raise ValueError(f"Data berlebih di {pos}")
+                return
+            char = text[pos : pos + 1]
+            if char == closers[-1]:
+                closers.pop()
+                pos += 1
+                yield "\n" + "  " * len(closers) + char
+            elif char == ",":
+                pos = skip(text, pos + 1).end()
+                yield ",\n" + "  " * len(closers)
+                expect_key = closers[-1] == "}"
+                break
+            else:
+                raise ValueError(f"Diharapkan pemisah ',' di {pos}")
+
+
+def partial_string(text, start):
+    """Bagian yang sudah di-decode dari string JSON yang terpotong di ujung text"""
+    # Buang escape sequence yang terpotong di tengah
+    for cut in range(len(text), max(start, len(text) - 6) - 1, -1):
+        try:
+            string = scanstring(text[:cut] + '"', start)[0]
+        except ValueError:
+            continue
+        if string and "\ud800" <= string[-1] <= "\udbff":
+            string = string[:-1]
+        return string
+    raise ValueError(f"String tidak valid di {start}")
+
+
+def preview_json(text, max_length):
+    """JSON ber-indentasi dari text untuk preview, atau None jika text bukan JSON
+
+    Mengembalikan minimal max_length + 1 karakter dari hasil json.dumps(
+    json.loads(text), indent=2, ensure_ascii=False), atau semuanya jika
+    lebih pendek. Text sampai PREVIEW_PREFIX_CHARS karakter di-parse utuh.
+    Text yang lebih panjang diformat dari PREVIEW_PREFIX_CHARS karakter
+    pertamanya dengan iter_indented_json(), berhenti di panjang preview,
+    sehingga biayanya tidak bertambah seiring besar value; error setelah
+    titik itu tidak terdeteksi.
+    """
+    head = text[:PREVIEW_PREFIX_CHARS]
+    if not head.strip().startswith(("{", "[")):
+        return None
+    try:
+        if len(text) <= PREVIEW_PREFIX_CHARS:
+            return json.dumps(json.loads(text), indent=2, ensure_ascii=False)
+
+        pieces, size = [], 0
+        for piece in iter_indented_json(head, complete=False):
+            pieces.append(piece)
+            size += len(piece)
+            if size > max_length:
+                break
+        return "".join(pieces)
+    except (ValueError, RecursionError):
+        return None
+
+
+def preview_select(columns):
+    """Daftar SELECT yang membaca maksimal PREVIEW_PREFIX_CHARS + 1 karakter tiap kolom
+
+    Teks dipotong per karakter dan BLOB per byte. Value yang terpotong
+    menyimpan satu karakter lebih dari prefix, sehingga lebih panjang dari
+    preview mana pun dan ditampilkan sebagai terpotong.
+    """
+    return ", ".join(
+        f"CASE WHEN typeof({col}) IN ('text', 'blob') "
+        f"THEN substr({col}, 1, {PREVIEW_PREFIX_CHARS + 1}) ELSE {col} END"
+        for col in map(quote_identifier, columns)
+    )
+
+
+def format_value(value, max_length=100):
+    """Format nilai untuk ditampilkan dengan lebih rapi"""
+    if value is None:
+        return "NULL"
+
+    value_str = str(value)
+
+    # Coba parse sebagai JSON untuk formatting yang lebih baik
+    formatted = preview_json(value_str, max_length)
+    if formatted is not None:
+        if len(formatted) > max_length:
+            return formatted[:max_length] + "...\n[JSON DIPOTONG]"
+        return formatted
+
+    # Jika terlalu panjang, potong
+    if len(value_str) > max_length:
+        return value_str[:max_length] + "...[DIPOTONG]"
+
+    return value_str
+
+
+def export_record(columns, row):
+    """Ubah baris menjadi record export, value teks JSON di-parse"""
+    record = {}
+    for col, value in zip(columns, row):
+        # Coba parse JSON values
+        if isinstance(value, str) and value.strip().startswith(("{", "[")):
+            try:
+                record[col] = json.loads(value)
+            except:
+                record[col] = value
+        else:
+            record[col] = value
+    return record
+
+
+def connect_read_only(db_path):
+    """Buka koneksi read-only (URI mode=ro)"""
+    uri = f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro"
+    return sqlite3.connect(uri, uri=True)
+
+
+def fetch_rows(cursor):
+    """Hasilkan baris dari cursor yang sudah dieksekusi, EXPORT_CHUNK_ROWS sekaligus"""
+    while True:
+        rows = cursor.fetchmany(EXPORT_CHUNK_ROWS)
+        if not rows:
+            return
+        yield from rows
+
+
+def encode_json(value, level, pretty=True):
+    """Teks JSON dari value yang bersarang level tingkat di dokumen export"""
+    if not pretty:
+        return json.dumps(value, ensure_ascii=False, default=str)
+    text = json.dumps(value, indent=2, ensure_ascii=False, default=str)
+    return text.replace("\n", "\n" + "  " * level)
+
+
+def write_rows(f, rows, output_format, table, columns, header=None, pretty=True):
+    """Tulis baris tabel ke f dalam output_format dan kembalikan jumlahnya
+
+    Baris json menjadi item list "data" tabel, masing-masing diawali baris
+    barunya sendiri dan dipisah koma; baris csv mengikuti header.
+    """
+    count = 0
+    if output_format == "json":
+        first, between = ("\n" + "  " * 4, ",\n" + "  " * 4) if pretty else ("", ", ")
+        for row in rows:
+            record = export_record(columns, row)
+            f.write((between if count else first) + encode_json(record, 4, pretty))
+            count += 1
+    elif output_format == "jsonl":
+        for row in rows:
+            record = {"table": table, "data": export_record(columns, row)}
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            count += 1
+    else:
+        writer = csv.writer(f)
+        for row in rows:
+            values = dict(zip(columns, row))
+            writer.writerow([table] + [values.get(col) for col in header[1:]])
+            count += 1
+    return count
+
+
+def csv_header(table_columns):
+    """Header CSV: "table", lalu semua nama kolom sesuai urutan kemunculannya"""
+    header = ["table"]
+    for columns in table_columns.values():
+        header.extend(col for col in columns if col not in header[1:])
+    return header
+
+
+def write_json_document(write, database_info, tables, write_data, pretty=True):
+    """Tulis dokumen JSON export di sekitar baris-baris tabelnya
+
+    tables berisi tiga nilai (nama, kolom, record_count) dan write_data(nama)
+    menulis baris tabel tersebut seperti write_rows(). Hasilnya sama persis
+    byte demi byte dengan json.dump() seluruh export sebelumnya.
+    """
+    item_separator = "," if pretty else ", "
+
+    def newline(level):
+        return "\n" + "  " * level if pretty else ""
+
+    write("{" + newline(1) + '"database_info": ' + encode_json(database_info, 1, pretty))
+    write(item_separator + newline(1) + '"tables": {')
+    for table_index, (table, columns, record_count) in enumerate(tables):
+        write((item_separator if table_index else "") + newline(2))
+        write(encode_json(table, 2, pretty) + ": {" + newline(3))
+        write('"columns": ' + encode_json(columns, 3, pretty) + item_separator + newline(3))
+        write(f'"record_count": {record_count}' + item_separator + newline(3))
+        write('"data": [')
+        write_data(table)
+        write((newline(3) if record_count else "") + "]" + newline(2) + "}")
+    write((newline(1) if tables else "") + "}" + newline(0) + "}")
+
+
+def export_shard(task):
+    """Export satu rentang rowid dari tabel ke file part
+
+    Berjalan di proses worker export paralel, dengan koneksi read-only
+    sendiri. Mengembalikan jumlah baris yang ditulis.
+    """
+    conditions, params = [], []
+    if task["low"] is not None:
+        conditions.append("rowid > ?")
+        params.append(task["low"])
+    if task["high"] is not None:
+        conditions.append("rowid <= ?")
+        params.append(task["high"])
+    if task["condition"]:
+        conditions.append(f"({task['condition']})")
+        params.extend(task["condition_params"])
+    query = f"SELECT * FROM {quote_identifier(task['table'])}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+
+    opener = COMPRESSORS[task["compress"]][0] if task["compress"] else open
+    newline = "" if task["output_format"] == "csv" else None
+    conn = connect_read_only(task["db_path"])
+    register_functions(conn)
+    try:
+        rows = fetch_rows(conn.execute(query, params))
+        with opener(task["part_path"], "wt", encoding="utf-8", newline=newline) as f:
+            return write_rows(
+                f,
+                rows,
+                task["output_format"],
+                task["table"],
+                task["columns"],
+                task["header"],
+                task["pretty"],
+            )
+    finally:
+        conn.close()
+
+
+@functools.lru_cache(maxsize=64)
+def compile_pattern(pattern):
+    """Compile regular expression sekali saja, berapa pun baris yang dicek"""
+    return re.compile(pattern)
+
+
+def regexp(pattern, value):
+    """Fungsi REGEXP SQLite: "value REGEXP pattern" memanggil regexp(pattern, value)"""
+    if value is None:
+        return False
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", "replace")
+    return compile_pattern(pattern).search(str(value)) is not None
+
+
+def register_functions(conn):
+    """Daftarkan fungsi SQL yang dipakai kondisi pencarian ke sebuah koneksi"""
+    conn.create_function("regexp", 2, regexp, deterministic=True)
+
+
+class SearchQuery:
+    """Yang dicari sebuah pencarian: substring, regular expression atau JSON path
+
+    term dicocokkan sebagai substring tanpa membedakan huruf besar/kecil
+    (LIKE) dan regex sebagai regular expression Python (re.search) lewat
+    fungsi REGEXP; jika keduanya diberikan, value harus cocok dengan
+    keduanya. Dengan jsonpath hanya value di path itu pada kolom JSON yang
+    dicocokkan (json_extract), dan tanpa term atau regex setiap baris yang
+    memiliki path itu cocok. Semuanya berjalan di dalam scan SQLite.
+    """
+
+    def __init__(self, term=None, regex=None, jsonpath=None):
+        self.term = term
+        self.regex = regex
+        self.jsonpath = jsonpath
+        if regex is not None:
+            compile_pattern(regex)
+
+    def __str__(self):
+        parts = []
+        if self.term:
+            parts.append(self.term)
+        if self.regex is not None:
+            parts.append(f"/{self.regex}/")
+        text = " ".join(parts)
+        if self.jsonpath:
+            return f"{self.jsonpath} {text}" if text else self.jsonpath
+        return text
+
+    def is_substring(self):
+        """True untuk pencarian substring biasa, satu-satunya yang dilayani index pencarian"""
+        return bool(self.term) and self.regex is None and not self.jsonpath
+
+    def condition(self, columns, case_sensitive=False):
+        """Kondisi WHERE yang cocok di salah satu columns, beserta parameternya"""
+        conditions, params = [], []
+        for col in columns:
+            target = col
+            target_params = []
+            if self.jsonpath:
+                # json_extract() gagal pada teks yang bukan JSON
+                target = f"json_extract(CASE WHEN json_valid({col}) THEN {col} END, ?)"
+                target_params = [self.jsonpath]
+
+            tests = []
+            if self.term:
+                if case_sensitive:
+                    tests.append(f"{target} LIKE ?")
+                else:
+                    tests.append(f"LOWER({target}) LIKE LOWER(?)")
+                params.extend(target_params + [f"%{self.term}%"])
+            if self.regex is not None:
+                tests.append(f"{target} REGEXP ?")
+                params.extend(target_params + [self.regex])
+            if not tests:
+                tests.append(f"json_type(CASE WHEN json_valid({col}) THEN {col} END, ?) IS NOT NULL")
+                params.append(self.jsonpath)
+            test = " AND ".join(tests)
+            conditions.append(test if len(tests) == 1 else f"({test})")
+        return " OR ".join(conditions), params
+
+
+def search_query(search_term):
+    """Ubah kata kunci biasa menjadi SearchQuery; SearchQuery dikembalikan apa adanya"""
+    if search_term is None or isinstance(search_term, SearchQuery):
+        return search_term
+    return SearchQuery(term=search_term)
+
+
+def search_index_path(db_path):
+    """Lokasi index pencarian sidecar sebuah database (direktori cache XDG)"""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    name = hashlib.sha256(os.path.abspath(db_path).encode("utf-8")).hexdigest()[:32]
+    return os.path.join(cache_home, "vscdb_converter", f"{name}.fts.sqlite")
+
+
+def database_fingerprint(db_path):
+    """Kembalikan (identity, fingerprint) database untuk index pencarian
+
+    identity adalah device dan inode file, yang berubah jika file diganti.
+    fingerprint menambahkan ukuran, mtime dan hash header database serta
+    file -wal-nya; header menyimpan change counter SQLite, sehingga commit
+    mengubahnya walaupun ukuran dan mtime tetap.
+    """
+    stat = os.stat(db_path)
+    parts = []
+    for path in (db_path, db_path + "-wal"):
+        try:
+            with open(path, "rb") as f:
+                header = f.read(100)
+                file_stat = os.fstat(f.fileno())
+        except FileNotFoundError:
+            parts.append(None)
+            continue
+        parts.append([file_stat.st_size, file_stat.st_mtime_ns, hashlib.sha256(header).hexdigest()])
+    return f"{stat.st_dev}:{stat.st_ino}", json.dumps(parts)
+
+
+def quote_identifier(name):
+    """Quote nama tabel atau kolom untuk SQL"""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def match_expression(search_term):
+    """Query FTS5 untuk baris yang mungkin cocok dengan LIKE '%search_term%'
+
+    Kata kunci dipecah di wildcard LIKE % dan _, dan setiap potongan literal
+    minimal tiga karakter (satu trigram) harus muncul. Mengembalikan None
+    jika tidak ada potongan seperti itu dan index tidak bisa mempersempit
+    pencarian.
+    """
+    runs = [run for run in re.split(r"[%_]", search_term) if len(run) >= 3]
+    if not runs:
+        return None
+    return " AND ".join('"' + run.replace('"', '""') + '"' for run in runs)
+
+
+class SearchIndex:
+    """Index FTS5 sidecar agar pencarian tidak perlu scan seluruh tabel
+
+    Disimpan di direktori cache (lihat search_index_path()) sebagai satu
+    tabel FTS5 trigram contentless per tabel database, sehingga index tidak
+    menyimpan salinan data. Index diperbarui jika fingerprint database
+    berubah: setiap baris yang diindex dicatat dengan rowid, ukuran serta
+    byte pertama dan terakhirnya (lihat update_table()), sehingga baris
+    baru, baris yang diubah di tempat dengan UPDATE dan rowid yang dipakai
+    ulang setelah dihapus diindex lagi, dan baris yang sudah tidak ada
+    dihapus dari daftar baris yang diindex. Posting dari baris yang berubah
+    dan terhapus tetap tertinggal sampai jumlah baris basi di tabel itu
+    sama dengan baris yang masih ada dan tabel dibangun ulang. Kandidat
+    dari index selalu dicek ke database dengan kondisi pencarian biasa,
+    sehingga posting basi tidak pernah muncul di hasil.
+    """
+
+    # Baris yang diindex beserta tanda perubahan saat diindex
+    ROWS_TABLE = (
+        "CREATE TABLE IF NOT EXISTS indexed_rows (table_id INTEGER, row INTEGER, "
+        "size INTEGER, edges BLOB, PRIMARY KEY (table_id, row)) WITHOUT ROWID"
+    )
+
+    def __init__(self, db_path, index_path=None):
+        self.db_path = db_path
+        self.index_path = index_path or search_index_path(db_path)
+        self.conn = None
+        # Nama tabel sumber -> nama tabel FTS5-nya
+        self.fts_tables = {}
+
+    def open(self, rebuild=False):
+        """Buka index, bangun atau perbarui jika perlu
+
+        Mengembalikan None jika index sudah terbaru, selain itu jumlah baris
+        yang ditambahkan dan dihapus serta lama prosesnya dalam detik.
+        """
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        if rebuild and os.path.exists(self.index_path):
+            os.remove(self.index_path)
+        self.conn = sqlite3.connect(f"file:{pathname2url(os.path.abspath(self.index_path))}", uri=True)
+        self.conn.execute(
+            "ATTACH DATABASE ? AS src",
+            (f"file:{pathname2url(os.path.abspath(self.db_path))}?mode=ro",),
+        )
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS indexed_tables (
+                id INTEGER PRIMARY KEY, name TEXT UNIQUE, columns TEXT, stale_rows INTEGER
+            );
+            """
+        )
+        self.conn.execute(self.ROWS_TABLE)
+        stats = self.refresh()
+        self.fts_tables = {
+            name: f"fts_{table_id}"
+            for table_id, name in self.conn.execute("SELECT id, name FROM indexed_tables")
+        }
+        return stats
+
+    def close(self):
+        """Tutup index"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def refresh(self):
+        """Samakan index dengan database, lihat open()"""
+        identity, fingerprint = database_fingerprint(self.db_path)
+        meta = dict(self.conn.execute("SELECT name, value FROM meta"))
+        rebuild = meta.get("version") != str(SEARCH_INDEX_VERSION) or meta.get("identity") != identity
+        if not rebuild and meta.get("fingerprint") == fingerprint:
+            return None
+
+        started = time.perf_counter()
+        stats = {"added": 0, "removed": 0}
+        self.conn.execute("BEGIN")
+        try:
+            indexed = {
+                name: (table_id, columns, stale_rows)
+                for table_id, name, columns, stale_rows in self.conn.execute(
+                    "SELECT id, name, columns, stale_rows FROM indexed_tables"
+                )
+            }
+            source_tables = [
+                row[0] for row in self.conn.execute("SELECT name FROM src.sqlite_master WHERE type='table'")
+            ]
+            # Tabel yang sudah tidak ada, atau semuanya untuk file atau versi index baru
+            dropped = set(indexed) if rebuild else set(indexed) - set(source_tables)
+            for name in dropped:
+                self.drop_table(indexed.pop(name)[0])
+            if rebuild:
+                # Index versi lain bisa punya susunan daftar baris yang berbeda
+                self.conn.execute("DROP TABLE indexed_rows")
+                self.conn.execute(self.ROWS_TABLE)
+
+            for name in source_tables:
+                columns = json.dumps(
+                    [col[1] for col in self.conn.execute(f"PRAGMA src.table_info({quote_identifier(name)})")]
+                )
+                try:
+                    self.conn.execute(f"SELECT rowid FROM src.{quote_identifier(name)} LIMIT 0")
+                except sqlite3.OperationalError:
+                    # Tabel WITHOUT ROWID, dicari tanpa index
+                    continue
+
+                table_id, indexed_columns, stale_rows = indexed.get(name, (None, None, 0))
+                live_rows = 0
+                if table_id is not None:
+                    live_rows = self.conn.execute(
+                        "SELECT COUNT(*) FROM indexed_rows WHERE table_id = ?", (table_id,)
+                    ).fetchone()[0]
+                if table_id is None or indexed_columns != columns or stale_rows > live_rows:
+                    if table_id is not None:
+                        self.drop_table(table_id)
+                    table_id = self.conn.execute(
+                        "INSERT INTO indexed_tables (name, columns, stale_rows) VALUES (?, ?, 0)",
+                        (name, columns),
+                    ).lastrowid
+                    self.conn.execute(
+                        f"CREATE VIRTUAL TABLE fts_{table_id} USING fts5(text, tokenize='trigram', content='')"
+                    )
+                added, removed = self.update_table(table_id, name, json.loads(columns))
+                stats["added"] += added
+                stats["removed"] += removed
+
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                [
+                    ("version", str(SEARCH_INDEX_VERSION)),
+                    ("identity", identity),
+                    ("fingerprint", fingerprint),
+                ],
+            )
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        stats["seconds"] = time.perf_counter() - started
+        return stats
+
+    def drop_table(self, table_id):
+        """Hapus index satu tabel"""
+        self.conn.execute(f"DROP TABLE IF EXISTS fts_{table_id}")
+        self.conn.execute("DELETE FROM indexed_rows WHERE table_id = ?", (table_id,))
+        self.conn.execute("DELETE FROM indexed_tables WHERE id = ?", (table_id,))
+
+    def update_table(self, table_id, name, columns):
+        """Index baris baru dan yang berubah sebuah tabel dan lupakan baris yang dihapus
+
+        Baris dibandingkan di dalam SQLite berdasarkan rowid dan tanda
+        perubahan: ukuran baris dalam byte serta SIGNATURE_EDGE_BYTES byte
+        pertama dan terakhir setiap kolom. Hanya baris baru dan yang berubah
+        yang teks lengkapnya dibaca dan diindex, sehingga refresh butuh satu
+        kali baca tabel dengan fungsi bawaan ditambah baris yang berubah:
+        sekitar 0,7 detik untuk 1 GB value 16 KB dan 3 detik untuk 1 juta
+        baris kecil. Perubahan
+        yang tidak mengubah ukuran value dan hanya menyentuh byte yang jauh
+        dari kedua ujungnya tidak terlihat; --rebuild-index menangkapnya.
+        Baris yang berubah dihitung sebagai dihapus lalu ditambahkan lagi.
+        Mengembalikan jumlah baris yang ditambahkan dan dihapus.
+        """
+        source = f"src.{quote_identifier(name)}"
+        text = " || char(10) || ".join(
+            f"COALESCE(CAST({quote_identifier(col)} AS TEXT), '')" for col in columns
+        )
+        values = [f"CAST({quote_identifier(col)} AS BLOB)" for col in columns]
+        size = " + ".join(f"COALESCE(length({value}), 0)" for value in values)
+        edges = " || ".join(
+            f"COALESCE(substr({value}, 1, {SIGNATURE_EDGE_BYTES}) || substr({value}, -{SIGNATURE_EDGE_BYTES}), X'')"
+            for value in values
+        )
+        self.conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS new_rows (row INTEGER PRIMARY KEY, size INTEGER, edges BLOB)"
+        )
+        self.conn.execute("DELETE FROM new_rows")
+        # Baris baru dan baris yang tandanya berubah, dalam satu kali baca tabel
+        added = self.conn.execute(
+            "INSERT INTO new_rows SELECT s.row, s.size, s.edges "
+            f"FROM (SELECT rowid AS row, {size} AS size, CAST({edges} AS BLOB) AS edges FROM {source}) AS s "
+            "LEFT JOIN indexed_rows AS i ON i.table_id = ? AND i.row = s.row "
+            "WHERE i.row IS NULL OR i.size <> s.size OR i.edges <> s.edges",
+            (table_id,),
+        ).rowcount
+
+        removed = self.conn.execute(
+            "DELETE FROM indexed_rows WHERE table_id = ? AND (row IN (SELECT row FROM new_rows) "
+            f"OR NOT EXISTS (SELECT 1 FROM {source} WHERE rowid = indexed_rows.row))",
+            (table_id,),
+        ).rowcount
+        self.conn.execute("UPDATE indexed_tables SET stale_rows = stale_rows + ? WHERE id = ?", (removed, table_id))
+        if added:
+            self.conn.execute(
+                f"INSERT INTO fts_{table_id} (rowid, text) SELECT rowid, {text} FROM {source} "
+                "WHERE rowid IN (SELECT row FROM new_rows)"
+            )
+            self.conn.execute("INSERT INTO indexed_rows SELECT ?, row, size, edges FROM new_rows", (table_id,))
+        return added, removed
+
+    def search(self, table_name, search_term, condition, params, select="*"):
+        """Baris table_name yang cocok dengan condition, dicari lewat index
+
+        condition dan params adalah kondisi pencarian biasa, yang dipakai
+        untuk mengecek setiap kandidat. Mengembalikan None jika index tidak
+        bisa membantu: tabel tidak diindex atau search_term tidak punya
+        potongan untuk dicari.
+        """
+        expression = match_expression(search_term)
+        fts_table = self.fts_tables.get(table_name)
+        if expression is None or fts_table is None:
+            return None
+        cursor = self.conn.execute(
+            f"SELECT {select} FROM src.{quote_identifier(table_name)} "
+            f"WHERE rowid IN (SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH ?) "
+            f"AND ({condition}) ORDER BY rowid",
+            [expression] + params,
+        )
+        return cursor.fetchall()
+
+
+def open_search_index(db_path, rebuild=False):
+    """Buka index pencarian database, atau kembalikan None jika tidak bisa dipakai
+
+    Membutuhkan SQLite dengan FTS5 dan tokenizer trigram (3.34 atau lebih
+    baru); tanpa itu, atau tanpa direktori cache yang bisa ditulis, pencarian
+    kembali scan tabel.
+    """
+    index = SearchIndex(db_path)
+    try:
+        stats = index.open(rebuild)
+    except (sqlite3.Error, OSError) as e:
+        index.close()
+        print(f"[WARNING] Index pencarian tidak tersedia, mencari tanpa index: {e}")
+        return None
+    if stats is None:
+        print(f"[INDEX] Index pencarian sudah terbaru: {index.index_path}")
+    else:
+        print(
+            f"[INDEX] Index pencarian diperbarui dalam {stats['seconds']:.2f}s: "
+            f"{stats['added']} baris ditambahkan, {stats['removed']} dihapus ({index.index_path})"
+        )
+    return index
+
+
+class HumanRenderer:
+    """Tampilkan hasil sebagai output konsol yang selama ini dicetak script ini
+
+    Record diformat per blok dan setiap blok ditulis dengan satu panggilan,
+    bukan satu print per baris. Ditulis ke sys.stdout kecuali stream
+    diberikan.
+    """
+
+    # Jumlah record yang diformat sebelum setiap penulisan
+    RECORDS_PER_WRITE = 500
+
+    # Value hanya ditampilkan sebagai preview, lihat preview_select()
+    PREVIEW_VALUES = True
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def write(self, lines):
+        if lines:
+            (self.stream or sys.stdout).write("\n".join(lines) + "\n")
+
+    def database_info(self, info):
+        lines = ["=" * 60, "[DATABASE INFO]", "=" * 60]
+        lines.append(f"[FILE] {info['file_path']}")
+        lines.append(f"[DATE] Diakses pada: {info['accessed_at'].strftime('%Y-%m-%d %H:%M:%S')}")
+        if info["file_size_bytes"] is not None:
+            file_size = info["file_size_bytes"]
+            lines.append(
+                f"[SIZE] Ukuran file: {file_size:,} bytes ({file_size / 1024 / 1024:.2f} MB)"
+            )
+        lines.append("\n[TABLES] DAFTAR TABEL:")
+        for table in info["tables"]:
+            lines.append(f"   - {table['name']}: {table['record_count']:,} record(s)")
+        lines.append("=" * 60)
+        self.write(lines)
+
+    def table_data(self, data):
+        shown = data["shown"]
+        lines = [f"\n[TABLE DATA] {data['table']}", "-" * 60]
+        lines.append(f"[COLUMNS] Struktur kolom: {', '.join(data['columns'])}")
+        if data["search_term"]:
+            lines.append(
+                f"[SEARCH] Mencari '{data['search_term']}' - Ditemukan {shown} hasil"
+            )
+        else:
+            lines.append(f"[SHOWING] Menampilkan {shown} dari {data['total_count']} record")
+        if data.get("key_column"):
+            page = f"[PAGE] Diurutkan berdasarkan {data['key_column']}"
+            if data["after_key"] is not None:
+                page += f", setelah '{data['after_key']}'"
+            lines.append(page)
+        lines.append("-" * 60)
+
+        if not shown:
+            lines.append("[NO DATA] Tidak ada data ditemukan")
+            self.write(lines)
+            return
+
+        for i, row in enumerate(data["rows"], 1):
+            lines.append(f"\n[RECORD #{i}]")
+            for col, value in zip(data["columns"], row):
+                lines.append(f"   {col}: {format_value(value)}")
+            lines.append("-" * 40)
+            if i % self.RECORDS_PER_WRITE == 0:
+                self.write(lines)
+                lines = []
+        if data.get("next_key") is not None:
+            lines.append(
+                f"[NEXT] Halaman berikutnya: --after-key {shlex.quote(str(data['next_key']))}"
+            )
+        self.write(lines)
+
+
+class JsonLinesRenderer:
+    """Tampilkan hasil sebagai JSON lines untuk program lain
+
+    Satu object "database" untuk --info, dan untuk setiap tabel satu object
+    "table" diikuti satu object "record" per baris.
+    """
+
+    RECORDS_PER_WRITE = 500
+
+    def __init__(self, stream=None):
+        self.stream = stream
+
+    def write(self, records):
+        (self.stream or sys.stdout).write(
+            "".join(
+                json.dumps(record, ensure_ascii=False, default=str) + "\n"
+                for record in records
+            )
+        )
+
+    def database_info(self, info):
+        self.write([dict(info, event="database", accessed_at=info["accessed_at"].isoformat())])
+
+    def table_data(self, data):
+        table = {
+            "event": "table",
+            "table": data["table"],
+            "columns": data["columns"],
+            "search_term": data["search_term"],
+            "total_count": data["total_count"],
+            "shown": data["shown"],
+        }
+        if data.get("key_column"):
+            table.update(
+                key_column=data["key_column"],
+                after_key=data["after_key"],
+                next_key=data["next_key"],
+            )
+        self.write([table])
+        rows = iter(data["rows"])
+        while True:
+            chunk = list(itertools.islice(rows, self.RECORDS_PER_WRITE))
+            if not chunk:
+                break
+            self.write(
+                {
+                    "event": "record",
+                    "table": data["table"],
+                    "record": dict(zip(data["columns"], row)),
+                }
+                for row in chunk
+            )
+
+
+class SilentRenderer:
+    """Tidak menampilkan apa pun; hasil hanya dikembalikan oleh method get_*"""
+
+    def database_info(self, info):
+        pass
+
+    def table_data(self, data):
+        pass
+
+
+# Renderer yang bisa dipilih dengan --output
+RENDERERS = {
+    "human": HumanRenderer,
+    "jsonl": JsonLinesRenderer,
+    "silent": SilentRenderer,
+}
+
+
 class VSCDBConverter:
-    def __init__(self, db_path):
+    def __init__(self, db_path, renderer=None):
         self.db_path = db_path
         self.conn = None
+        self.renderer = renderer or HumanRenderer()
+        # Index FTS5 sidecar yang dipakai search_data(), lihat open_search_index()
+        self.search_index = None
 
     def connect(self):
         """Koneksi ke database SQLite"""
         try:
             self.conn = sqlite3.connect(self.db_path)
+            register_functions(self.conn)
             return True
         except Exception as e:
             print(f"❌ Error koneksi ke database: {e}")
@@ -31,6 +940,8 @@ class VSCDBConverter:
         """Tutup koneksi database"""
         if self.conn:
             self.conn.close()
+        if self.search_index:
+            self.search_index.close()
 
     def get_tables(self):
         """Dapatkan daftar semua tabel dalam database"""
@@ -44,10 +955,14 @@ class VSCDBConverter:
         cursor.execute(f"PRAGMA table_info({table_name});")
         return cursor.fetchall()
 
-    def get_table_count(self, table_name):
-        """Dapatkan jumlah record dalam tabel"""
+    def get_table_count(self, table_name, search_term=None):
+        """Dapatkan jumlah record dalam tabel, atau yang cocok dengan search_term"""
         cursor = self.conn.cursor()
-        cursor.execute(f"SELECT COUNT(*) FROM {table_name};")
+        if search_term:
+            condition, params = self.search_condition(table_name, search_term)
+            cursor.execute(f"SELECT COUNT(*) FROM {table_name} WHERE {condition};", params)
+        else:
+            cursor.execute(f"SELECT COUNT(*) FROM {table_name};")
         return cursor.fetchone()[0]
 
     def get_all_data(self, table_name, limit=None):
@@ -59,163 +974,417 @@ class VSCDBConverter:
         cursor.execute(query)
         return cursor.fetchall()
 
-    def search_data(self, table_name, search_term, case_sensitive=False):
-        """Cari data berdasarkan kata kunci"""
+    def iter_rows(self, table_name, search_term=None):
+        """Hasilkan baris tabel (atau yang cocok dengan search_term)
+
+        Baris diambil EXPORT_CHUNK_ROWS sekaligus, bukan semuanya sekaligus.
+        """
+        cursor = self.conn.cursor()
+        query = f"SELECT * FROM {table_name}"
+        params = []
+        if search_term:
+            condition, params = self.search_condition(table_name, search_term)
+            query += f" WHERE {condition}"
+        cursor.execute(query, params)
+        yield from fetch_rows(cursor)
+
+    def get_key_column(self, table_name):
+        """Kolom untuk mengurutkan dan membagi halaman baris (keyset pagination)
+
+        Primary key jika terdiri dari satu kolom, jika tidak kolom dari unique
+        index satu kolom (key pada ItemTable), jika tidak rowid.
+        """
+        primary_key = [col[1] for col in self.get_table_info(table_name) if col[5]]
+        if len(primary_key) == 1:
+            return primary_key[0]
+
         cursor = self.conn.cursor()
+        cursor.execute(f"PRAGMA index_list({table_name});")
+        for _, index_name, unique, _, partial in cursor.fetchall():
+            if unique and not partial:
+                cursor.execute(f"PRAGMA index_info({quote_identifier(index_name)});")
+                index_columns = cursor.fetchall()
+                if len(index_columns) == 1 and index_columns[0][2] is not None:
+                    return index_columns[0][2]
+        return "rowid"
+
+    def page_condition(self, table_name, key_column, after_key=None, search_term=None):
+        """Kondisi WHERE dan parameter untuk baris setelah after_key"""
+        conditions, params = [], []
+        if search_term:
+            condition, params = self.search_condition(table_name, search_term)
+            conditions.append(f"({condition})")
+        if after_key is not None:
+            conditions.append(f"{key_column} > ?")
+            params.append(after_key)
+        return " AND ".join(conditions) or "1", params
+
+    def iter_page(
+        self, table_name, key_column, after_key=None, page_size=None, search_term=None, select="*"
+    ):
+        """Hasilkan maksimal page_size baris urut key, mulai setelah after_key
+
+        Keyset pagination: halaman dimulai dengan seek pada key, bukan
+        melewati baris dengan OFFSET, sehingga halaman belakang sama murahnya
+        dengan halaman pertama. Baris dialirkan langsung dari cursor.
+        """
+        condition, params = self.page_condition(table_name, key_column, after_key, search_term)
+        query = f"SELECT {select} FROM {table_name} WHERE {condition} ORDER BY {key_column}"
+        if page_size:
+            query += " LIMIT ?"
+            params.append(page_size)
+        cursor = self.conn.cursor()
+        cursor.execute(query, params)
+        yield from fetch_rows(cursor)
+
+    def get_page_info(
+        self, table_name, key_column, after_key=None, page_size=None, search_term=None
+    ):
+        """Hitung baris sebuah halaman dan cari key awal halaman berikutnya
+
+        Mengembalikan (shown, next_key); next_key bernilai None di halaman
+        terakhir. Hanya halaman itu dan satu baris setelahnya yang dibaca.
+        """
+        condition, params = self.page_condition(table_name, key_column, after_key, search_term)
+        cursor = self.conn.cursor()
+        if not page_size:
+            cursor.execute(f"SELECT COUNT(*) FROM {table_name} WHERE {condition};", params)
+            return cursor.fetchone()[0], None
+
+        cursor.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM {table_name} WHERE {condition} "
+            f"ORDER BY {key_column} LIMIT ?);",
+            params + [page_size + 1],
+        )
+        count = cursor.fetchone()[0]
+        if count <= page_size:
+            return count, None
+        cursor.execute(
+            f"SELECT {key_column} FROM {table_name} WHERE {condition} "
+            f"ORDER BY {key_column} LIMIT 1 OFFSET ?;",
+            params + [page_size - 1],
+        )
+        return page_size, cursor.fetchone()[0]
+
+    def plan_shards(self, table_name, shard_rows):
+        """Bagi tabel menjadi rentang rowid berisi shard_rows baris
+
+        Mengembalikan pasangan (low, high), low eksklusif dan high inklusif,
+        dengan None untuk ujung terbuka. Tabel tanpa rowid tetap satu rentang.
+        """
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(f"SELECT rowid FROM {quote_identifier(table_name)} ORDER BY rowid")
+        except sqlite3.OperationalError:
+            return [(None, None)]
+        bounds = [rowid for index, (rowid,) in enumerate(cursor, 1) if index % shard_rows == 0]
+        edges = [None] + bounds + [None]
+        return list(zip(edges, edges[1:]))
+
+    def search_condition(self, table_name, search_term, case_sensitive=False):
+        """Buat kondisi WHERE yang mencari search_term di semua kolom
 
+        search_term berupa kata kunci biasa atau SearchQuery. Mengembalikan
+        kondisi beserta parameternya; kata kunci dikirim sebagai parameter,
+        tidak pernah disisipkan ke SQL.
+        """
         # Dapatkan kolom-kolom dalam tabel
         info = self.get_table_info(table_name)
         columns = [col[1] for col in info]
+        return search_query(search_term).condition(columns, case_sensitive)
 
-        # Buat query pencarian untuk semua kolom
-        search_conditions = []
-        for col in columns:
-            if case_sensitive:
-                search_conditions.append(f"{col} LIKE '%{search_term}%'")
-            else:
-                search_conditions.append(f"LOWER({col}) LIKE LOWER('%{search_term}%')")
+    def search_data(self, table_name, search_term, case_sensitive=False, select="*"):
+        """Cari data berdasarkan kata kunci"""
+        query = search_query(search_term)
+        condition, params = self.search_condition(table_name, query, case_sensitive)
+        if self.search_index and query.is_substring():
+            rows = self.search_index.search(table_name, query.term, condition, params, select)
+            if rows is not None:
+                return rows
 
-        query = f"SELECT * FROM {table_name} WHERE {' OR '.join(search_conditions)}"
-        cursor.execute(query)
+        cursor = self.conn.cursor()
+        query = f"SELECT {select} FROM {table_name} WHERE {condition}"
+        cursor.execute(query, params)
         return cursor.fetchall()
 
+    def open_search_index(self, rebuild=False):
+        """Mulai sekarang cari lewat index FTS5 sidecar, lihat SearchIndex"""
+        self.search_index = open_search_index(self.db_path, rebuild)
+        return self.search_index is not None
+
     def format_value(self, value, max_length=100):
         """Format nilai untuk ditampilkan dengan lebih rapi"""
-        if value is None:
-            return "NULL"
-
-        value_str = str(value)
-
-        # Coba parse sebagai JSON untuk formatting yang lebih baik
-        try:
-            if value_str.strip().startswith(("{", "[")):
-                parsed = json.loads(value_str)
-                formatted = json.dumps(parsed, indent=2, ensure_ascii=False)
-                if len(formatted) > max_length:
-                    return formatted[:max_length] + "...\n[JSON DIPOTONG]"
-                return formatted
-        except:
-            pass
+        return format_value(value, max_length)
 
-        # Jika terlalu panjang, potong
-        if len(value_str) > max_length:
-            return value_str[:max_length] + "...[DIPOTONG]"
-
-        return value_str
+    def get_database_info(self):
+        """Kumpulkan informasi umum database"""
+        return {
+            "file_path": self.db_path,
+            "accessed_at": datetime.now(),
+            "file_size_bytes": (
+                os.path.getsize(self.db_path) if os.path.exists(self.db_path) else None
+            ),
+            "tables": [
+                {"name": table, "record_count": self.get_table_count(table)}
+                for table in self.get_tables()
+            ],
+        }
 
     def display_database_info(self):
         """Tampilkan informasi umum database"""
-        print("=" * 60)
-        print("[DATABASE INFO]")
-        print("=" * 60)
-        print(f"[FILE] {self.db_path}")
-        print(f"[DATE] Diakses pada: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-
-        if os.path.exists(self.db_path):
-            file_size = os.path.getsize(self.db_path)
-            print(
-                f"[SIZE] Ukuran file: {file_size:,} bytes ({file_size / 1024 / 1024:.2f} MB)"
-            )
+        self.renderer.database_info(self.get_database_info())
 
-        print("\n[TABLES] DAFTAR TABEL:")
-        tables = self.get_tables()
-        for table in tables:
-            count = self.get_table_count(table)
-            print(f"   - {table}: {count:,} record(s)")
+    def get_table_data(
+        self, table_name, limit=10, search_term=None, keyset=False, after_key=None, preview=False
+    ):
+        """Kumpulkan baris dari tabel, atau hanya yang cocok dengan search_term
 
-        print("=" * 60)
-
-    def display_table_data(self, table_name, limit=10, search_term=None):
-        """Tampilkan data dari tabel dengan format yang rapi"""
-        print(f"\n[TABLE DATA] {table_name}")
-        print("-" * 60)
-
-        # Dapatkan info struktur tabel
+        "rows" berupa iterator yang mengalir dari cursor (hasil pencarian
+        berupa list) dan "shown" menyatakan jumlahnya. Dengan keyset baris
+        diurutkan berdasarkan key, limit per halaman, mulai setelah
+        after_key; key awal halaman berikutnya ada di "next_key". Dengan
+        preview, value teks dipotong sebatas yang dibutuhkan format_value()
+        (lihat preview_select()).
+        """
         info = self.get_table_info(table_name)
         columns = [col[1] for col in info]
-        print(f"[COLUMNS] Struktur kolom: {', '.join(columns)}")
+        select = preview_select(columns) if preview and columns else "*"
+        data = {
+            "table": table_name,
+            "columns": columns,
+            "search_term": search_term,
+            "limit": limit,
+            "total_count": None,
+        }
+        if not search_term:
+            data["total_count"] = self.get_table_count(table_name)
 
-        # Dapatkan data
-        if search_term:
-            rows = self.search_data(table_name, search_term)
-            print(f"[SEARCH] Mencari '{search_term}' - Ditemukan {len(rows)} hasil")
-        else:
-            rows = self.get_all_data(table_name, limit)
-            total_count = self.get_table_count(table_name)
-            print(
-                f"[SHOWING] Menampilkan {min(len(rows), limit) if limit else len(rows)} dari {total_count} record"
+        if keyset:
+            key_column = self.get_key_column(table_name)
+            data["key_column"] = key_column
+            data["after_key"] = after_key
+            data["shown"], data["next_key"] = self.get_page_info(
+                table_name, key_column, after_key, limit, search_term
             )
+            data["rows"] = self.iter_page(
+                table_name, key_column, after_key, limit, search_term, select
+            )
+        elif search_term:
+            data["rows"] = self.search_data(table_name, search_term, select=select)
+            data["shown"] = len(data["rows"])
+        else:
+            total = data["total_count"]
+            data["shown"] = min(total, limit) if limit else total
+            query = f"SELECT {select} FROM {table_name}"
+            if limit:
+                query += f" LIMIT {limit}"
+            data["rows"] = fetch_rows(self.conn.execute(query))
+        return data
 
-        print("-" * 60)
+    def display_table_data(
+        self, table_name, limit=10, search_term=None, keyset=False, after_key=None
+    ):
+        """Tampilkan data dari tabel dengan format yang rapi"""
+        preview = getattr(self.renderer, "PREVIEW_VALUES", False)
+        self.renderer.table_data(
+            self.get_table_data(table_name, limit, search_term, keyset, after_key, preview)
+        )
 
-        if not rows:
-            print("[NO DATA] Tidak ada data ditemukan")
-            return
+    def export(
+        self,
+        output_file,
+        search_term=None,
+        output_format="json",
+        compress=None,
+        pretty=True,
+        workers=None,
+    ):
+        """Export data ke file json, jsonl atau csv, bisa dikompres
 
-        # Tampilkan data
-        for i, row in enumerate(rows, 1):
-            print(f"\n[RECORD #{i}]")
-            for j, (col, value) in enumerate(zip(columns, row)):
-                print(f"   {col}: {self.format_value(value)}")
-            print("-" * 40)
+        Baris dibaca per chunk dan langsung ditulis, sehingga memory tidak
+        bertambah seiring besarnya database, dengan atau tanpa kompresi.
+        Dengan lebih dari satu worker, tabel diexport secara paralel, lihat
+        export_parallel(). Mengembalikan path yang ditulis, yang diberi
+        suffix compressor jika belum ada.
+        """
+        opener = open
+        if compress:
+            opener, suffix = COMPRESSORS[compress]
+            if not output_file.endswith(suffix):
+                output_file += suffix
+        writer = {
+            "json": self.write_json,
+            "jsonl": self.write_jsonl,
+            "csv": self.write_csv,
+        }[output_format]
+
+        # Satu transaksi baca, agar jumlah record dan baris berasal dari
+        # snapshot yang sama walaupun editor menulis selama export
+        self.conn.execute("BEGIN")
+        try:
+            if workers and workers > 1:
+                self.export_parallel(output_file, search_term, output_format, compress, pretty, workers)
+            else:
+                # csv menulis akhir baris \r\n sendiri
+                newline = "" if output_format == "csv" else None
+                with opener(output_file, "wt", encoding="utf-8", newline=newline) as f:
+                    if output_format == "json":
+                        writer(f, search_term, pretty)
+                    else:
+                        writer(f, search_term)
+        finally:
+            self.conn.rollback()
+
+        print(f"[SUCCESS] Data berhasil diexport ke: {output_file}")
+        return output_file
 
     def export_to_json(self, output_file, search_term=None, pretty=True):
         """Export data ke file JSON"""
-        data = {
-            "database_info": {
-                "file_path": self.db_path,
-                "exported_at": datetime.now().isoformat(),
-                "file_size_bytes": (
-                    os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
-                ),
-            },
-            "tables": {},
+        return self.export(output_file, search_term, "json", pretty=pretty)
+
+    def export_database_info(self):
+        """Bagian "database_info" dari export JSON"""
+        return {
+            "file_path": self.db_path,
+            "exported_at": datetime.now().isoformat(),
+            "file_size_bytes": (
+                os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0
+            ),
         }
 
-        tables = self.get_tables()
+    def write_json(self, f, search_term=None, pretty=True):
+        """Tulis export sebagai satu dokumen JSON"""
+        columns = {table: [col[1] for col in self.get_table_info(table)] for table in self.get_tables()}
+        tables = [
+            (table, columns[table], self.get_table_count(table, search_term))
+            for table in columns
+        ]
 
-        for table in tables:
+        def write_data(table):
             print(f"[EXPORT] Mengexport tabel {table}...")
+            write_rows(f, self.iter_rows(table, search_term), "json", table, columns[table], pretty=pretty)
 
-            # Dapatkan struktur tabel
-            info = self.get_table_info(table)
-            columns = [col[1] for col in info]
+        write_json_document(f.write, self.export_database_info(), tables, write_data, pretty)
 
-            # Dapatkan data
-            if search_term:
-                rows = self.search_data(table, search_term)
-            else:
-                rows = self.get_all_data(table)
-
-            # Konversi ke format yang bisa di-serialize JSON
-            table_data = []
-            for row in rows:
-                record = {}
-                for col, value in zip(columns, row):
-                    # Coba parse JSON values
-                    if isinstance(value, str) and value.strip().startswith(("{", "[")):
-                        try:
-                            record[col] = json.loads(value)
-                        except:
-                            record[col] = value
-                    else:
-                        record[col] = value
-                table_data.append(record)
+    def write_jsonl(self, f, search_term=None):
+        """Tulis export sebagai JSON Lines, satu object {"table", "data"} per record"""
+        for table in self.get_tables():
+            print(f"[EXPORT] Mengexport tabel {table}...")
 
-            data["tables"][table] = {
-                "columns": columns,
-                "record_count": len(table_data),
-                "data": table_data,
-            }
+            columns = [col[1] for col in self.get_table_info(table)]
+            write_rows(f, self.iter_rows(table, search_term), "jsonl", table, columns)
 
-        # Simpan ke file
-        with open(output_file, "w", encoding="utf-8") as f:
-            if pretty:
-                json.dump(data, f, indent=2, ensure_ascii=False, default=str)
-            else:
-                json.dump(data, f, ensure_ascii=False, default=str)
+    def write_csv(self, f, search_term=None):
+        """Tulis export sebagai CSV
 
-        print(f"[SUCCESS] Data berhasil diexport ke: {output_file}")
+        Value ditulis apa adanya, tanpa parse JSON. Kolom pertama adalah nama
+        tabel, diikuti semua nama kolom dari semua tabel sesuai urutan
+        kemunculannya; kolom yang tidak dimiliki tabel dibiarkan kosong.
+        """
+        columns = {table: [col[1] for col in self.get_table_info(table)] for table in self.get_tables()}
+        header = csv_header(columns)
+
+        csv.writer(f).writerow(header)
+        for table in columns:
+            print(f"[EXPORT] Mengexport tabel {table}...")
+
+            write_rows(f, self.iter_rows(table, search_term), "csv", table, columns[table], header)
+
+    def export_parallel(self, output_file, search_term, output_format, compress, pretty, workers):
+        """Export dengan tabel dibagi menjadi rentang rowid ke beberapa proses worker
+
+        Setiap worker menulis rentangnya ke file part dengan koneksi read-only
+        sendiri. Part kemudian digabung sesuai urutan rowid, sehingga file
+        sama dengan export berurutan. Part yang dikompres adalah stream utuh,
+        dan gzip, xz serta bz2 semuanya bisa membaca stream yang digabung,
+        sehingga part cukup disalin, tidak dikompres ulang.
+
+        Berjalan di dalam transaksi baca export(). Pada mode rollback journal
+        default SQLite, transaksi itu menahan penulis sampai semua part
+        selesai ditulis, sehingga semua worker melihat data yang sama. Pada
+        mode WAL penulis tidak menunggu, dan baris yang berubah selama export
+        bisa terlewat atau muncul dua kali.
+        """
+        columns = {table: [col[1] for col in self.get_table_info(table)] for table in self.get_tables()}
+        header = csv_header(columns) if output_format == "csv" else None
+        total_rows = sum(self.get_table_count(table) for table in columns)
+        shard_rows = max(EXPORT_SHARD_MIN_ROWS, -(-total_rows // (workers * SHARDS_PER_WORKER)))
+
+        part_dir = tempfile.mkdtemp(prefix=".export-", dir=os.path.dirname(os.path.abspath(output_file)))
+        try:
+            tasks = []
+            for table in columns:
+                condition, condition_params = (
+                    self.search_condition(table, search_term) if search_term else (None, [])
+                )
+                for low, high in self.plan_shards(table, shard_rows):
+                    tasks.append(
+                        {
+                            "db_path": self.db_path,
+                            "table": table,
+                            "columns": columns[table],
+                            "low": low,
+                            "high": high,
+                            "condition": condition,
+                            "condition_params": condition_params,
+                            "output_format": output_format,
+                            "compress": compress,
+                            "header": header,
+                            "pretty": pretty,
+                            "part_path": os.path.join(part_dir, f"{len(tasks):06d}.part"),
+                        }
+                    )
+
+            workers = min(workers, len(tasks)) or 1
+            print(f"[EXPORT] Mengexport {len(columns)} tabel dalam {len(tasks)} part dengan {workers} worker...")
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                counts = list(executor.map(export_shard, tasks))
+
+            parts = {table: [] for table in columns}
+            for task, count in zip(tasks, counts):
+                parts[task["table"]].append((task["part_path"], count))
+
+            opener = COMPRESSORS[compress][0] if compress else open
+            newline = "" if output_format == "csv" else None
+            pending = []
+
+            # Teks di antara part dikumpulkan dan ditulis sekaligus (satu
+            # stream jika dikompres) tepat sebelum part berikutnya
+            def flush():
+                if pending:
+                    with opener(output_file, "at", encoding="utf-8", newline=newline) as f:
+                        f.write("".join(pending))
+                    pending.clear()
+
+            def write_parts(table):
+                written = False
+                for part_path, count in parts[table]:
+                    if not count:
+                        continue
+                    if written and output_format == "json":
+                        pending.append("," if pretty else ", ")
+                    flush()
+                    with open(output_file, "ab") as out, open(part_path, "rb") as part:
+                        shutil.copyfileobj(part, out, 1024 * 1024)
+                    os.remove(part_path)
+                    written = True
+
+            # Mulai dengan file kosong, atau stream kosong jika dikompres
+            with opener(output_file, "wt", encoding="utf-8", newline=newline):
+                pass
+            if output_format == "json":
+                tables = [(table, columns[table], sum(count for _, count in parts[table])) for table in columns]
+                write_json_document(pending.append, self.export_database_info(), tables, write_parts, pretty)
+            else:
+                if header:
+                    header_line = io.StringIO()
+                    csv.writer(header_line).writerow(header)
+                    pending.append(header_line.getvalue())
+                for table in columns:
+                    write_parts(table)
+            flush()
+        finally:
+            shutil.rmtree(part_dir, ignore_errors=True)
 
 
 def main():
@@ -226,8 +1395,14 @@ def main():
 Contoh penggunaan:
   python vscdb_converter.py -f state.vscdb --info
   python vscdb_converter.py -f state.vscdb --show ItemTable
+  python vscdb_converter.py -f state.vscdb --show ItemTable --page-size 50 --after-key workbench.panel
   python vscdb_converter.py -f state.vscdb --search blackbox
+  python vscdb_converter.py -f state.vscdb --search blackbox --index
+  python vscdb_converter.py -f state.vscdb --regex "blackbox(ai|app)"
+  python vscdb_converter.py -f state.vscdb --jsonpath '$.apiProvider' --regex '^openai$'
   python vscdb_converter.py -f state.vscdb --export output.json
+  python vscdb_converter.py -f state.vscdb --export output.jsonl --format jsonl --compress gzip
+  python vscdb_converter.py -f state.vscdb --export output.json --workers 0
         """,
     )
 
@@ -242,7 +1417,43 @@ Contoh penggunaan:
         "--search", metavar="TERM", help="Cari data berdasarkan kata kunci"
     )
     parser.add_argument(
-        "--export", metavar="OUTPUT_FILE", help="Export data ke file JSON"
+        "--regex",
+        metavar="PATTERN",
+        help="Cari dengan regular expression Python (dengan --search, value harus cocok dengan keduanya)",
+    )
+    parser.add_argument(
+        "--jsonpath",
+        metavar="PATH",
+        help="Hanya cocokkan value di JSON path ini, misalnya '$.apiProvider'; tanpa kriteria lain mencari baris yang memiliki path itu",
+    )
+    parser.add_argument(
+        "--index",
+        action="store_true",
+        help="Cari lewat index FTS5 sidecar di direktori cache, dibangun saat pertama dipakai dan diperbarui jika database berubah",
+    )
+    parser.add_argument(
+        "--rebuild-index",
+        action="store_true",
+        help="Bangun ulang index pencarian dari awal (termasuk --index)",
+    )
+    parser.add_argument(
+        "--export", metavar="OUTPUT_FILE", help="Export data ke file (lihat --format)"
+    )
+    parser.add_argument(
+        "--format",
+        choices=EXPORT_FORMATS,
+        default="json",
+        help="Format export: json (default), jsonl (satu record per baris) atau csv",
+    )
+    parser.add_argument(
+        "--compress",
+        choices=sorted(COMPRESSORS),
+        help="Kompres export; suffix (.gz, .xz, .bz2) ditambahkan ke nama file",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Export dengan proses worker sebanyak ini, masing-masing dengan koneksi read-only sendiri (0: jumlah CPU)",
     )
     parser.add_argument(
         "--limit",
@@ -253,8 +1464,57 @@ Contoh penggunaan:
     parser.add_argument(
         "--all", action="store_true", help="Tampilkan semua record (tanpa limit)"
     )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        metavar="N",
+        help="Dengan --show: telusuri tabel urut key, N record per halaman",
+    )
+    parser.add_argument(
+        "--after-key",
+        metavar="KEY",
+        help="Dengan --show: mulai halaman setelah key ini (dicetak sebagai halaman berikutnya di akhir halaman)",
+    )
+    parser.add_argument(
+        "--output",
+        choices=sorted(RENDERERS),
+        default="human",
+        help="Cara hasil ditampilkan: human (default), jsonl (JSON lines di stdout, log di stderr) atau silent",
+    )
 
     args = parser.parse_args()
+    if args.regex is not None:
+        try:
+            compile_pattern(args.regex)
+        except re.error as e:
+            parser.error(f"--regex tidak valid: {e}")
+    if (args.page_size is not None or args.after_key is not None) and not args.show:
+        parser.error("--page-size dan --after-key membutuhkan --show")
+    if args.page_size is not None and args.page_size < 1:
+        parser.error("--page-size minimal 1")
+    if args.jsonpath:
+        try:
+            sqlite3.connect(":memory:").execute("SELECT json_extract('{}', ?)", (args.jsonpath,))
+        except sqlite3.Error as e:
+            parser.error(f"--jsonpath tidak valid: {e}")
+
+    if args.output == "human":
+        run(args, HumanRenderer())
+        return
+
+    # stdout hanya berisi hasil; baris log masuk ke stderr, atau
+    # dibuang di mode silent
+    if args.output == "jsonl":
+        renderer = JsonLinesRenderer(sys.stdout)
+        with contextlib.redirect_stdout(sys.stderr):
+            run(args, renderer)
+    else:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            run(args, SilentRenderer())
+
+
+def run(args, renderer):
+    """Jalankan command line, hasil ditampilkan dengan renderer"""
 
     # Validasi file
     if not os.path.exists(args.file):
@@ -262,11 +1522,19 @@ Contoh penggunaan:
         sys.exit(1)
 
     # Inisialisasi converter
-    converter = VSCDBConverter(args.file)
+    converter = VSCDBConverter(args.file, renderer)
 
     if not converter.connect():
         sys.exit(1)
 
+    if args.index or args.rebuild_index:
+        converter.open_search_index(args.rebuild_index)
+
+    # --search biasa tetap string; --regex dan --jsonpath butuh SearchQuery
+    search = args.search
+    if args.regex is not None or args.jsonpath:
+        search = SearchQuery(args.search, args.regex, args.jsonpath)
+
     try:
         # Tampilkan info database jika diminta
         if args.info:
@@ -275,21 +1543,29 @@ Contoh penggunaan:
         # Tampilkan data tabel tertentu
         if args.show:
             limit = None if args.all else args.limit
-            converter.display_table_data(args.show, limit, args.search)
+            keyset = args.page_size is not None or args.after_key is not None
+            if args.page_size is not None:
+                limit = args.page_size
+            converter.display_table_data(args.show, limit, search, keyset, args.after_key)
 
         # Cari data
-        elif args.search:
-            print(f"\n[SEARCHING] MENCARI: '{args.search}'")
+        elif search:
+            print(f"\n[SEARCHING] MENCARI: '{search}'")
             tables = converter.get_tables()
             for table in tables:
-                converter.display_table_data(table, args.limit, args.search)
+                converter.display_table_data(table, args.limit, search)
 
-        # Export ke JSON
+        # Export ke file
         if args.export:
-            converter.export_to_json(args.export, args.search)
+            workers = args.workers
+            if workers == 0:
+                workers = os.cpu_count() or 1
+            converter.export(
+                args.export, search, args.format, args.compress, workers=workers
+            )
 
         # Jika tidak ada aksi spesifik, tampilkan info
-        if not any([args.info, args.show, args.search, args.export]):
+        if not any([args.info, args.show, search, args.export]):
             converter.display_database_info()
             print("\n[TIP] Gunakan --help untuk melihat opsi lainnya")
 